@@ -0,0 +1,210 @@
+"""
+Řízení přístupu k API pro více týmů na jednom nasazení
+
+- Limity velikosti uploadu se kontrolují během streamování těla požadavku:
+  celý požadavek (SPSS_MAX_UPLOAD_MB, Content-Length se odmítne ještě před
+  čtením), jednotlivý .sav (SPSS_MAX_SAV_MB) a .docx (SPSS_MAX_DOCX_MB).
+  Zipy se .sav mají navíc limit rozbaleného obsahu (SPSS_MAX_ZIP_TOTAL_MB)
+  a počtu .sav (SPSS_MAX_ZIP_MEMBERS), kontroluje se před rozbalením.
+- Klient se pozná podle hlavičky X-API-Key, jinak podle Origin, jinak podle
+  IP adresy. Klíče a Origin platí jen ty, které uvádí JSON v SPSS_CLIENTS
+  (viz load_clients) - neznámé hodnoty si může kdokoli vymyslet, a všichni
+  uživatelé veřejného frontendu posílají stejný Origin, takže ostatní se
+  rozlišují podle IP. X-Forwarded-For se bere v úvahu jen za důvěryhodnou
+  proxy (SPSS_TRUSTED_PROXIES = počet proxy před aplikací).
+- Sloty jsou zámky souborů (flock) ve sdíleném adresáři, takže platí napříč
+  gunicorn workery a po pádu workeru se uvolní samy.
+- Váha klienta určuje jeho podíl ve frontě úloh (vážená férová fronta v jobs.py).
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Dict, List, Optional
+
+from werkzeug.exceptions import RequestEntityTooLarge
+
+MB = 1024 * 1024
+
+
+def _env_mb(name: str, default: int) -> int:
+    return int(os.environ.get(name, default)) * MB
+
+
+def max_request_bytes() -> int:
+    return _env_mb('SPSS_MAX_UPLOAD_MB', 512)
+
+
+def max_file_bytes(filename: Optional[str]) -> int:
+    """Limit jednoho nahraného souboru podle přípony (.docx zvlášť, ostatní jako .sav nebo zip s .sav)."""
+    if (filename or '').lower().endswith('.docx'):
+        return _env_mb('SPSS_MAX_DOCX_MB', 32)
+    return _env_mb('SPSS_MAX_SAV_MB', 512)
+
+
+def max_extracted_bytes() -> int:
+    """Limit součtu rozbalených .sav ze všech zipů jednoho požadavku."""
+    return _env_mb('SPSS_MAX_ZIP_TOTAL_MB', 2048)
+
+
+def max_zip_members() -> int:
+    """Nejvyšší počet .sav rozbalených ze zipů jednoho požadavku."""
+    return int(os.environ.get('SPSS_MAX_ZIP_MEMBERS', 100))
+
+
+class UploadTooLarge(RequestEntityTooLarge):
+    """
+    413 pro nahraný soubor nad jeho limitem (limit v bajtech). Zip s příliš
+    mnoha .sav nese navíc max_members; description pak popisuje, co přetekl.
+    """
+
+    def __init__(self, filename: Optional[str], limit: int, description: Optional[str] = None,
+                 max_members: Optional[int] = None):
+        super().__init__(description or f'Soubor {filename or ""} je větší než povolených {limit // MB} MB')
+        self.limit = limit
+        self.max_members = max_members
+
+
+class LimitedUpload:
+    """
+    Soubor, do kterého werkzeug streamuje nahraná data; po překročení limitu
+    vyhodí UploadTooLarge (413), takže se zbytek těla už nezapisuje.
+    """
+
+    def __init__(self, file, limit: int, filename: Optional[str]):
+        self._file = file
+        self._limit = limit
+        self._filename = filename
+        self._written = 0
+
+    def write(self, data: bytes) -> int:
+        self._written += len(data)
+        if self._written > self._limit:
+            self._file.close()
+            raise UploadTooLarge(self._filename, self._limit)
+        return self._file.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+
+class Client:
+    """Identita klienta pro sloty a frontu; key se nikde nevypisuje, jen name."""
+
+    def __init__(self, key: str, name: str, weight: float = 1.0, slots: int = 1):
+        self.key = key
+        self.name = name
+        self.weight = weight
+        self.slots = slots
+
+
+def load_clients(path: Optional[str]) -> Dict:
+    """
+    Konfigurace klientů:
+
+        {"default": {"weight": 1, "slots": 1},
+         "clients": {"tym-a": {"api_keys": ["..."], "origins": ["https://..."],
+                               "weight": 3, "slots": 2}}}
+    """
+    if not path:
+        return {'default': {}, 'clients': {}}
+    with open(path, encoding='utf-8') as f:
+        config = json.load(f)
+    config.setdefault('default', {})
+    config.setdefault('clients', {})
+    return config
+
+
+class Admission:
+    """Identifikace klientů a jejich sloty pro souběžné generování."""
+
+    def __init__(self, slots_dir: str, config: Dict, retry_after: int = 10, trusted_proxies: int = 0):
+        self.slots_dir = slots_dir
+        self.retry_after = retry_after
+        self.trusted_proxies = trusted_proxies
+        self.clients = config['clients']
+        self.default_weight = float(config['default'].get('weight', 1))
+        self.default_slots = int(config['default'].get('slots', os.environ.get('SPSS_CLIENT_SLOTS', 1)))
+        self._by_api_key = {}
+        self._by_origin = {}
+        for name, client in self.clients.items():
+            for api_key in client.get('api_keys', ()):
+                self._by_api_key[api_key] = name
+            for origin in client.get('origins', ()):
+                self._by_origin[origin] = name
+        os.makedirs(slots_dir, exist_ok=True)
+
+    def _client(self, key: str, name: str, settings: Dict) -> Client:
+        return Client(
+            key, name,
+            weight=float(settings.get('weight', self.default_weight)),
+            slots=int(settings.get('slots', self.default_slots)),
+        )
+
+    def client_address(self, remote_addr: Optional[str], forwarded_for: List[str]) -> Optional[str]:
+        """
+        IP klienta: adresa, kterou do X-Forwarded-For připsala nejvzdálenější
+        důvěryhodná proxy. Hodnoty vlevo od ní může klient podvrhnout.
+        """
+        if self.trusted_proxies and forwarded_for:
+            return forwarded_for[max(len(forwarded_for) - self.trusted_proxies, 0)]
+        return remote_addr
+
+    def identify(self, api_key: Optional[str], origin: Optional[str], address: Optional[str]) -> Client:
+        """Klient podle nakonfigurovaného API klíče nebo Origin, jinak podle IP adresy."""
+        name = self._by_api_key.get(api_key) if api_key else None
+        if name is None and origin:
+            name = self._by_origin.get(origin)
+        if name is not None:
+            return self._client(f'client:{name}', name, self.clients[name])
+        return self._client(f'ip:{address}', address or 'unknown', {})
+
+    def acquire(self, client: Client) -> Optional['Slot']:
+        """Volný slot klienta, nebo None, pokud jsou všechny obsazené."""
+        prefix = hashlib.sha256(client.key.encode('utf-8')).hexdigest()[:16]
+        for i in range(client.slots):
+            fd = os.open(os.path.join(self.slots_dir, f'{prefix}.{i}.lock'), os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                continue
+            return Slot(fd)
+        return None
+
+
+class Slot:
+    """Obsazený slot; release() lze volat opakovaně."""
+
+    def __init__(self, fd: int):
+        self._fd = fd
+        self._lock = threading.Lock()
+
+    def release(self):
+        with self._lock:
+            if self._fd is None:
+                return
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+
+_admission = None
+_admission_lock = threading.Lock()
+
+
+def get_admission() -> Admission:
+    """Sdílená instance procesu, vytvořená až při prvním použití."""
+    global _admission
+    with _admission_lock:
+        if _admission is None:
+            _admission = Admission(
+                os.environ.get('SPSS_ADMISSION_DIR', os.path.join(tempfile.gettempdir(), 'spss-syntax-slots')),
+                load_clients(os.environ.get('SPSS_CLIENTS')),
+                retry_after=int(os.environ.get('SPSS_ADMISSION_RETRY_AFTER', 10)),
+                trusted_proxies=int(os.environ.get('SPSS_TRUSTED_PROXIES', 0)),
+            )
+        return _admission
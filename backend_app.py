@@ -4,34 +4,78 @@ Automatické generování SPSS syntax z dat a dotazníku
 S pokročilou podporou filtrovaných otázek
 """
 
-import pyreadstat
+import importlib
+import os
 import re
+import time
+import zipfile
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Tuple, Any
-import docx
+from typing import Dict, List, Optional, Tuple, Iterable, Iterator
+
+from cache import CACHE_VERSION, ContentCache, file_digest, get_cache
+from docx_stream import iter_docx_paragraph_texts
+from incremental import (
+    block_key, diff_blocks, diff_path_for, fingerprint, load_manifest, manifest_path_for, save_manifest,
+)
+from metrics import collect as collect_metrics, metrics, metrics_dir
+from sav_output import collect_labels, labels_from_syntax, write_labelled_sav
+
+# SPSS formáty, které pyreadstat při plném načtení převádí na datum/čas
+# (v DataFrame pak nejsou int64/float64, takže nepatří do MDGROUP).
+# DTIME mezi ně nepatří - pyreadstat ho nechává jako float64.
+SPSS_DATE_FORMATS = frozenset({
+    'DATE', 'ADATE', 'EDATE', 'JDATE', 'SDATE',
+    'DATETIME', 'YMDHMS', 'TIME',
+})
 
 # Import naší nové parsovací logiky
-def parse_questionnaire_from_docx(docx_path: str) -> Dict:
+from question_rules import CATEGORIES, METADATA, QUESTION, TYPE, QuestionRules, load_rules
+
+# Knihovny pro čtení .sav a python-docx se importují až při prvním použití,
+# aby worker nastartoval rychle a /api/health je vůbec nepotřeboval.
+# S preloadem (gunicorn.conf.py) je naimportuje master proces před forkem
+# a workery je sdílejí copy-on-write.
+PARSING_STACK = ('pyreadstat', 'pandas', 'docx', 'lxml.etree')
+
+
+def preload_parsing_stack() -> float:
+    """Naimportuje PARSING_STACK a zkompiluje pravidla dotazníku; vrací dobu v sekundách."""
+    t0 = time.perf_counter()
+    for module in PARSING_STACK:
+        importlib.import_module(module)
+    load_rules()
+    return time.perf_counter() - t0
+
+
+def iter_paragraph_texts(doc) -> Iterator[str]:
     """
-    Parsuje Word dokument s dotazníkem a extrahuje otázky.
-    Vrací strukturovaná data o otázkách.
+    Prochází odstavce těla dokumentu jeden po druhém a vrací neprázdné texty.
+    Nepoužívá doc.paragraphs, které při každém přístupu sestavuje celý seznam znovu.
     """
-    doc = docx.Document(docx_path)
+    from docx.oxml.ns import qn
+    from docx.text.paragraph import Paragraph
     
+    body = doc.element.body
+    for p in body.iterchildren(qn('w:p')):
+        text = Paragraph(p, doc._body).text.strip()
+        if text:
+            yield text
+
+
+def parse_questions(texts: Iterable[str], question_rules: QuestionRules = None) -> List[Dict]:
+    """Jedním průchodem sestaví z textů odstavců seznam otázek s položkami."""
+    question_rules = question_rules or load_rules()
     questions = []
     current_q = None
     collecting_items = False
     
-    i = 0
-    while i < len(doc.paragraphs):
-        text = doc.paragraphs[i].text.strip()
-        
-        if not text:
-            i += 1
-            continue
+    for text in texts:
+        kind = question_rules.classify(text)
         
         # Detekce nové otázky - kód s tečkou a otázka
-        if re.match(r'^[A-Z0-9][A-Za-z0-9_]*\.', text) and ('?' in text or ':' in text):
+        if kind == QUESTION:
             # Uložit předchozí otázku
             if current_q:
                 questions.append(current_q)
@@ -47,111 +91,447 @@ def parse_questionnaire_from_docx(docx_path: str) -> Dict:
             collecting_items = True
         
         # Detekce typu otázky
-        elif 'Vyberte typ otázky::' in text:
+        elif kind == TYPE:
             if current_q:
-                qtype = text.replace('Vyberte typ otázky::', '').strip()
+                qtype = question_rules.question_type(text)
                 # Pokud ještě nemá typ, nebo je to relevantnější typ
-                if current_q['type'] is None or qtype in ['BATERIE OTÁZEK - JEDNA MOŽNÁ ODPOVĚĎ', 'VÍCE MOŽNÝCH ODPOVĚDÍ', 'FILTRACE ODPOVĚDÍ', 'FILTRACE ODPOVĚDÍ BATERIE - JEDNA MOŽNÁ ODPOVĚĎ', 'FILTRACE ODPOVĚDÍ BATERIE MULTIPLE']:
+                if current_q['type'] is None or qtype in question_rules.types:
                     current_q['type'] = qtype
                 collecting_items = False
         
         # Přeskakujeme metadata
-        elif any(keyword in text for keyword in [
-            'Nastavení otázky', 'Povinná', 'Zvolených minimálně',
-            'Pravidla', 'IF (', 'THEN', 'Min.', 'Max.', 
-            'Délka textu', 'Minimální hodnota', 'Jdi na', 'Pokud uživatel'
-        ]):
+        elif kind == METADATA:
             collecting_items = False
         
         # Sbíráme položky a stupnice
-        elif current_q and collecting_items and text and not text.startswith('<img') and not text.startswith('#'):
+        elif current_q and collecting_items and question_rules.is_item(text):
             current_q['items'].append(text)
-        
-        i += 1
     
     # Uložit poslední otázku
     if current_q:
         questions.append(current_q)
     
-    # Rozdělit položky a stupnice u baterií
+    return questions
+
+
+def split_battery_scales(question: Dict, question_rules: QuestionRules = None):
+    """Rozdělí položky baterie na výroky a body stupnice."""
+    question_rules = question_rules or load_rules()
+    potential_scales = []
+    potential_items = []
+    
+    for item in question['items']:
+        if question_rules.is_scale(item):
+            potential_scales.append(item)
+        else:
+            potential_items.append(item)
+    
+    if question_rules.scale_count_ok(len(potential_scales)):
+        question['items'] = potential_items
+        question['scales'] = potential_scales
+
+
+# Explicitní odkaz na rodiče v textu otázky, např. "(filtrováno z A1)" nebo "filtered from QA1"
+# Klíčová slova bez ohledu na velikost písmen, kód otázky jen velkými (jako začátek otázky)
+EXPLICIT_PARENT_RE = re.compile(
+    r'\b(?i:filtrován[aoéý]?|filtrace|filtered)\s+(?i:z|ze|from)\s+(?i:otázky\s+|question\s+)?'
+    r'([A-Z0-9][A-Za-z0-9_]*)\b'
+)
+
+
+def explicit_reference_parent(question: Dict, seen: Dict[str, Dict], last_multiple: Dict) -> Dict:
+    """
+    Rodič uvedený přímo v textu otázky (jen pokud už byl v dotazníku dříve).
+    "z Q5" znamená otázku Q5, nebo otázku 5, pokud Q5 v dotazníku není.
+    """
+    match = EXPLICIT_PARENT_RE.search(question['text'])
+    if match is None:
+        return None
+    code = match.group(1)
+    parent = seen.get(code)
+    if parent is None and code.startswith('Q') and len(code) > 1:
+        parent = seen.get(code[1:])
+    return parent
+
+
+def nearest_multiple_response_parent(question: Dict, seen: Dict[str, Dict], last_multiple: Dict) -> Dict:
+    """Nejbližší předchozí otázka typu VÍCE MOŽNÝCH ODPOVĚDÍ."""
+    return last_multiple
+
+
+# Pravidla pro určení rodičovské otázky - použije se první, které rodiče najde
+PARENT_RULES = (explicit_reference_parent, nearest_multiple_response_parent)
+
+
+def resolve_parents(questions: List[Dict], rules=PARENT_RULES,
+                    question_rules: QuestionRules = None) -> Dict[str, Dict]:
+    """
+    Jedním průchodem sestaví mapu kód otázky -> rodičovská otázka.
+    Při duplicitních kódech platí první výskyt (stejně jako find_parent_question).
+    """
+    question_rules = question_rules or load_rules()
+    parents = {}
+    seen = {}
+    last_multiple = None
+    
     for q in questions:
-        if q['type'] == 'BATERIE OTÁZEK - JEDNA MOŽNÁ ODPOVĚĎ':
-            all_items = q['items']
-            potential_scales = []
-            potential_items = []
-            
-            for item in all_items:
-                if len(item) < 30 and (
-                    any(word in item.lower() for word in ['ano', 'ne', 'rozhodně', 'celkem', 'spíše', 'vůbec', 'moc'])
-                ):
-                    potential_scales.append(item)
-                else:
-                    potential_items.append(item)
-            
-            if 2 <= len(potential_scales) <= 6:
-                q['items'] = potential_items
-                q['scales'] = potential_scales
+        code = q['code']
+        if code not in seen:
+            for rule in rules:
+                parent = rule(q, seen, last_multiple)
+                if parent is not None:
+                    parents[code] = parent
+                    break
+            seen[code] = q
+        
+        if question_rules.category(q['type']) == 'multiple_response':
+            last_multiple = q
     
-    # Kategorizace otázek
-    multiple_response = []
-    batteries = []
-    filtered_multiple = []
-    filtered_batteries = []
-    filtered_batteries_multiple = []
+    return parents
+
+
+def parse_questionnaire_from_docx(docx_path: str, parent_rules=PARENT_RULES, backend: str = 'stream',
+                                  question_rules: QuestionRules = None) -> Dict:
+    """
+    Parsuje Word dokument s dotazníkem a extrahuje otázky.
+    Vrací strukturovaná data o otázkách včetně mapy rodičovských otázek ('parents').
     
+    backend='stream' čte odstavce přímo z XML v zipu (docx_stream.py),
+    backend='python-docx' staví celý objektový model dokumentu. Pokud proudové
+    čtení selže, použije se python-docx.
+    question_rules určují klasifikaci odstavců (výchozí viz load_rules).
+    """
+    question_rules = question_rules or load_rules()
+    if backend == 'stream':
+        try:
+            questions = parse_questions(iter_docx_paragraph_texts(docx_path), question_rules)
+        except (zipfile.BadZipFile, KeyError, ET.ParseError) as e:
+            print(f"   ⚠️ Proudové čtení dokumentu selhalo ({e}), používám python-docx")
+            backend = 'python-docx'
+            if hasattr(docx_path, 'seek'):
+                docx_path.seek(0)
+    if backend == 'python-docx':
+        import docx
+        doc = docx.Document(docx_path)
+        questions = parse_questions(iter_paragraph_texts(doc), question_rules)
+    elif backend != 'stream':
+        raise ValueError(f'Neznámý backend pro čtení dotazníku: {backend}')
+    
+    # Rozdělení baterií a kategorizace otázek
+    result = {category: [] for category in CATEGORIES}
     for q in questions:
-        if q['type'] == 'VÍCE MOŽNÝCH ODPOVĚDÍ' and len(q['items']) > 0:
-            multiple_response.append(q)
-        elif q['type'] == 'BATERIE OTÁZEK - JEDNA MOŽNÁ ODPOVĚĎ' and len(q['items']) > 0:
-            batteries.append(q)
-        elif q['type'] == 'FILTRACE ODPOVĚDÍ' and len(q['items']) > 0:
-            filtered_multiple.append(q)
-        elif q['type'] == 'FILTRACE ODPOVĚDÍ BATERIE - JEDNA MOŽNÁ ODPOVĚĎ' and len(q['items']) > 0:
-            filtered_batteries.append(q)
-        elif q['type'] == 'FILTRACE ODPOVĚDÍ BATERIE MULTIPLE' and len(q['items']) > 0:
-            filtered_batteries_multiple.append(q)
+        category = question_rules.category(q['type'])
+        if category == 'batteries':
+            split_battery_scales(q, question_rules)
+        
+        if category and len(q['items']) > 0:
+            result[category].append(q)
     
-    return {
-        'multiple_response': multiple_response,
-        'batteries': batteries,
-        'filtered_multiple': filtered_multiple,
-        'filtered_batteries': filtered_batteries,
-        'filtered_batteries_multiple': filtered_batteries_multiple,
-        'all_questions': questions
-    }
+    result['all_questions'] = questions
+    result['parents'] = resolve_parents(questions, parent_rules, question_rules)
+    return result
 
 
-def find_parent_question(question_code: str, all_questions: List[Dict]) -> Dict:
-    """Najde rodičovskou otázku pro filtrovanou otázku."""
-    for i, q in enumerate(all_questions):
-        if q['code'] == question_code:
-            for j in range(i-1, -1, -1):
-                if all_questions[j]['type'] == 'VÍCE MOŽNÝCH ODPOVĚDÍ':
-                    return all_questions[j]
+# Znaky řádku baterie multiple v názvu Q{code}__{row}column{col}
+MATRIX_ROW_CHARS = frozenset('ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_')
+
+
+def _position(text: str) -> Optional[int]:
+    """Pořadí položky/sloupce, jak ho export zapisuje (1, 2, ... bez úvodních nul), jinak None."""
+    if text.isdigit() and text[0] != '0':
+        return int(text)
     return None
 
 
+def question_code_candidates(column: str) -> Iterator[str]:
+    """
+    Vrací všechny kódy otázek, pro které platí column.startswith(f'Q{code}__').
+    Obvykle je to jediný kód, víc jich je jen pokud kód sám obsahuje '_'.
+    """
+    if not column.startswith('Q'):
+        return
+    pos = column.find('__', 1)
+    while pos != -1:
+        yield column[1:pos]
+        pos = column.find('__', pos + 1)
+
+
+class ColumnName:
+    """
+    Název proměnné exportu Q{code}__{zbytek} rozložený na části:
+    
+        Q{code}__{row}                     položka baterie / MR otázky
+        Q{code}__{parent}_{row}            položka filtrovaná z rodičovské otázky
+        Q{code}__{parent}_{row}column{col} buňka baterie multiple (matrix_row = '{parent}_{row}')
+        Q{code}__{suffix}                  cokoli jiného, např. _jina (row je vyplněný u '{row}_{suffix}')
+    """
+    
+    __slots__ = ('name', 'code', 'parent', 'row', 'column', 'suffix', 'matrix_row')
+    
+    def __init__(self, name: str, code: str, parent: Optional[str] = None, row: Optional[int] = None,
+                 column: Optional[int] = None, suffix: Optional[str] = None, matrix_row: Optional[str] = None):
+        self.name = name
+        self.code = code
+        self.parent = parent
+        self.row = row
+        self.column = column
+        self.suffix = suffix
+        self.matrix_row = matrix_row
+    
+    @classmethod
+    def parse(cls, name: str, code: str) -> 'ColumnName':
+        """Rozloží name pro kód otázky code (name musí začínat Q{code}__)."""
+        rest = name[len(code) + 3:]
+        
+        matrix_row, marker, column = rest.partition('column')
+        if marker:
+            col = _position(column)
+            if col is not None and matrix_row and MATRIX_ROW_CHARS.issuperset(matrix_row):
+                parent, sep, row = matrix_row.rpartition('_')
+                has_row = bool(sep) and row.isdigit()
+                return cls(name, code, parent=parent if has_row else None, row=int(row) if has_row else None,
+                           column=col, matrix_row=matrix_row)
+        
+        row = _position(rest)
+        if row is not None:
+            return cls(name, code, row=row)
+        
+        head, sep, tail = rest.rpartition('_')
+        row = _position(tail)
+        if sep and head and row is not None:
+            return cls(name, code, parent=head, row=row)
+        
+        head, sep, tail = rest.partition('_')
+        return cls(name, code, row=_position(head) if sep else None, suffix=tail if sep else rest)
+
+
+class ColumnIndex:
+    """
+    Jednorázový index názvů proměnných z .sav podle kódu otázky.
+    Každý název se rozloží jen jednou (ColumnName) a generátory pak procházejí
+    jen proměnné, které v .sav opravdu jsou, místo skládání a hledání názvů.
+    """
+    
+    def __init__(self, columns: Iterable[str]):
+        self.columns = list(columns)
+        self.names = set(self.columns)
+        self.by_code: Dict[str, List[str]] = {}
+        # kód -> {pořadí položky: proměnná}
+        self._items: Dict[str, Dict[int, str]] = {}
+        # (kód, kód rodiče) -> {pořadí položky rodiče: proměnná}
+        self._filtered: Dict[Tuple[str, str], Dict[int, str]] = {}
+        # kód -> {řádek: (pořadí položky rodiče nebo None, {sloupec: proměnná})}
+        self._matrix: Dict[str, Dict[str, Tuple[Optional[int], Dict[int, str]]]] = {}
+        
+        for col in self.columns:
+            for code in question_code_candidates(col):
+                self.by_code.setdefault(code, []).append(col)
+                self._add(ColumnName.parse(col, code))
+    
+    def _add(self, column: ColumnName):
+        if column.column is not None:
+            rows = self._matrix.setdefault(column.code, {})
+            if column.matrix_row not in rows:
+                rows[column.matrix_row] = (column.row, {})
+            rows[column.matrix_row][1][column.column] = column.name
+        elif column.suffix is not None:
+            return
+        elif column.parent is not None:
+            self._filtered.setdefault((column.code, column.parent), {})[column.row] = column.name
+        else:
+            self._items.setdefault(column.code, {})[column.row] = column.name
+    
+    def __contains__(self, var_name: str) -> bool:
+        return var_name in self.names
+    
+    def variables(self, question_code: str) -> List[str]:
+        """Proměnné otázky v pořadí, v jakém jsou v .sav."""
+        return self.by_code.get(question_code, [])
+    
+    def items(self, question_code: str) -> Dict[int, str]:
+        """Proměnné Q{code}__{i} podle pořadí položky."""
+        return self._items.get(question_code, {})
+    
+    def filtered_items(self, question_code: str, parent_code: str) -> Dict[int, str]:
+        """Proměnné Q{code}__{parent}_{i} podle pořadí položky rodiče."""
+        return self._filtered.get((question_code, parent_code), {})
+    
+    def matrix(self, question_code: str) -> Dict[str, Tuple[Optional[int], Dict[int, str]]]:
+        """Řádky baterie multiple: řádek -> (pořadí položky rodiče, {sloupec: proměnná})."""
+        return self._matrix.get(question_code, {})
+
+
+# VALUE pro MRSETS, pokud žádný value label proměnné nezní jako "ano"
+DEFAULT_SELECTED_CODE = 2
+
+
+class VariableIndex:
+    """
+    Typ a kód zaškrtnuté odpovědi každé proměnné .sav, spočítané jednou
+    z metadat (bez DataFrame). MRSETS pak jen vyhledává v slovnících.
+    """
+    
+    def __init__(self, meta, question_rules: QuestionRules):
+        self.numeric = frozenset(var for var in meta.column_names if is_numeric_variable(meta, var))
+        # Proměnná -> hodnota prvního value labelu, který question_rules uznají za "ano"
+        self.selected = {}
+        for var, labels in meta.variable_value_labels.items():
+            if var not in self.numeric:
+                continue
+            for value, label in labels.items():
+                if question_rules.is_affirmative(label):
+                    self.selected[var] = value
+                    break
+    
+    def selected_code(self, var: str):
+        return self.selected.get(var, DEFAULT_SELECTED_CODE)
+
+
+def is_numeric_variable(meta, var_name: str) -> bool:
+    """Numerická proměnná podle metadat (odpovídá dtype int64/float64 po plném načtení)."""
+    if meta.readstat_variable_types.get(var_name) != 'double':
+        return False
+    fmt = meta.original_variable_types.get(var_name, '')
+    fmt_name = re.match(r'[A-Z]*', fmt.upper()).group()
+    return fmt_name not in SPSS_DATE_FORMATS
+
+
+def find_parent_question(question_code: str, all_questions: List[Dict]) -> Dict:
+    """
+    Najde rodičovskou otázku pro filtrovanou otázku.
+    Pro opakované dotazy použijte mapu 'parents' z parse_questionnaire_from_docx.
+    """
+    return resolve_parents(all_questions).get(question_code)
+
+
+# Fáze SPSSSyntaxGenerator.build v pořadí, v jakém se hlásí do progress callbacku
+RUN_STAGES = ('load_data', 'load_questionnaire', 'generate_syntax')
+
+# Sekce syntaxe v pořadí výstupu (metody _generate_*)
+GENERATE_SECTIONS = (
+    'generate_batteries',                   # Baterie otázek
+    'generate_multiple_response',           # Multiple Response
+    'generate_filtered_multiple',           # Filtrované Multiple Response
+    'generate_filtered_batteries',          # Filtrované Baterie
+    'generate_filtered_batteries_multiple', # Filtrované Baterie Multiple
+    'generate_mrsets',                      # MRSETS
+)
+
+# Sekce, jejichž bloky závisí i na rodičovské otázce
+FILTERED_SECTIONS = frozenset({
+    'generate_filtered_multiple',
+    'generate_filtered_batteries',
+    'generate_filtered_batteries_multiple',
+})
+
+# Pole otázky, ze kterých se skládá blok syntaxe (a jeho otisk pro inkrementální režim)
+BLOCK_QUESTION_FIELDS = ('code', 'type', 'text', 'items')
+
+
 class SPSSSyntaxGenerator:
     """Generátor SPSS syntax z exportovaných dat a dotazníku - UPGRADED"""
     
-    def __init__(self, data_path: str, questionnaire_path: str):
+    def __init__(self, data_path: str, questionnaire_path: str, metadata_only: bool = True,
+                 cache: ContentCache = None, questionnaire_data: Dict = None,
+                 concurrent_load: bool = True, question_rules: QuestionRules = None):
         self.data_path = data_path
         self.questionnaire_path = questionnaire_path
+        # Generování syntaxe potřebuje jen hlavičku .sav (názvy, typy, labely),
+        # řádky respondentů se načítají pouze při metadata_only=False
+        self.metadata_only = metadata_only
+        # Volitelná cache podle obsahu vstupů (viz cache.py)
+        self.cache = cache
+        self._digests = {}
         self.df = None
         self.meta = None
-        self.questionnaire_data = None
-        self.syntax_parts = []
+        self.columns = []
+        self.column_index = ColumnIndex([])
+        self.variable_index = None
+        self.numeric_vars = frozenset()
+        # Předem rozparsovaný dotazník (dávkové zpracování) - pak se questionnaire_path nečte
+        self.questionnaire_data = questionnaire_data
+        # .sav a .docx jsou nezávislé vstupy - load_inputs je načítá souběžně
+        self.concurrent_load = concurrent_load
+        # Klasifikace odstavců dotazníku (viz question_rules.py)
+        self.question_rules = question_rules or load_rules()
+        # Inkrementální režim (viz incremental.py): bloky tohoto a předchozího běhu
+        self._blocks = None
+        self._previous_blocks = {}
+        self._block_occurrences = {}
+        self._rebuilt_blocks = 0
+        # Souhrn změn posledního inkrementálního save_syntax
+        self.block_changes = None
         
     def load_data(self):
-        """Načtení SPSS dat"""
-        print("📂 Načítám SPSS data...")
-        self.df, self.meta = pyreadstat.read_sav(self.data_path)
-        print(f"   ✓ Načteno {len(self.df)} respondentů, {len(self.df.columns)} proměnných")
+        """Načtení SPSS dat (ve výchozím stavu jen metadata z hlavičky)"""
+        if self.metadata_only:
+            print("📂 Načítám SPSS metadata...")
+        else:
+            print("📂 Načítám SPSS data...")
+        t0 = time.perf_counter()
+        with metrics.timer('spss_stage_seconds', stage='load_data'):
+            cached = None
+            if self.cache and self.metadata_only:
+                cached = self.cache.get('sav_meta', self._digest(self.data_path))
+            if cached is not None:
+                print("   ⚡ Metadata z cache")
+                self.df, self.meta = cached
+            else:
+                import pyreadstat
+                self.df, self.meta = pyreadstat.read_sav(self.data_path, metadataonly=self.metadata_only)
+                if self.cache and self.metadata_only:
+                    self.cache.put('sav_meta', self._digest(self.data_path), (self.df, self.meta))
+            self.columns = list(self.meta.column_names)
+            self.column_index = ColumnIndex(self.columns)
+            self.variable_index = VariableIndex(self.meta, self.question_rules)
+            self.numeric_vars = self.variable_index.numeric
+        metrics.observe('spss_sav_columns', len(self.columns))
         
+        n_rows = self.meta.number_rows if self.metadata_only else len(self.df)
+        print(f"   ✓ Načteno {n_rows if n_rows is not None else '?'} respondentů, {len(self.columns)} proměnných "
+              f"({time.perf_counter() - t0:.2f} s)")
+    
+    def _digest(self, path) -> str:
+        """SHA-256 vstupního souboru (cesta nebo stream), počítá se nejvýš jednou."""
+        if path not in self._digests:
+            self._digests[path] = file_digest(path)
+        return self._digests[path]
+    
+    def _questionnaire_cache_key(self) -> Optional[str]:
+        """Klíč dotazníku v cache; None, pokud byl předán už rozparsovaný (necachuje se)."""
+        if self.questionnaire_path is None:
+            return None
+        # Jiná pravidla klasifikace dávají z téhož .docx jiný výsledek
+        return f'{self._digest(self.questionnaire_path)}:{self.question_rules.fingerprint}'
+    
+    def _syntax_cache_key(self) -> Optional[str]:
+        """Klíč hotové syntaxe; None, pokud cache není zapnutá nebo dotazník nemá soubor."""
+        questionnaire_key = self._questionnaire_cache_key() if self.cache else None
+        if questionnaire_key is None:
+            return None
+        return f'{self._digest(self.data_path)}:{questionnaire_key}'
+    
     def load_questionnaire(self):
         """Načtení dotazníku - UPGRADED s novou logikou"""
         print("📋 Načítám dotazník (UPGRADED parsing)...")
-        self.questionnaire_data = parse_questionnaire_from_docx(self.questionnaire_path)
+        t0 = time.perf_counter()
+        with metrics.timer('spss_stage_seconds', stage='parse_questionnaire'):
+            cached = None
+            if self.questionnaire_path is None and self.questionnaire_data is not None:
+                print("   ⚡ Dotazník už je rozparsovaný")
+                cached = self.questionnaire_data
+            elif self.cache and self.questionnaire_path is not None:
+                cached = self.cache.get('questionnaire', self._questionnaire_cache_key())
+                if cached is not None:
+                    print("   ⚡ Dotazník z cache")
+            if cached is not None:
+                self.questionnaire_data = cached
+            else:
+                self.questionnaire_data = parse_questionnaire_from_docx(
+                    self.questionnaire_path, question_rules=self.question_rules)
+                if self.cache and self.questionnaire_path is not None:
+                    self.cache.put('questionnaire', self._questionnaire_cache_key(), self.questionnaire_data)
+        metrics.observe('spss_questionnaire_questions', len(self.questionnaire_data['all_questions']))
         
         total = (len(self.questionnaire_data['multiple_response']) + 
                 len(self.questionnaire_data['batteries']) +
@@ -164,12 +544,36 @@ class SPSSSyntaxGenerator:
         print(f"   ✓ Filtrované Multiple: {len(self.questionnaire_data['filtered_multiple'])}")
         print(f"   ✓ Filtrované Baterie: {len(self.questionnaire_data['filtered_batteries'])}")
         print(f"   ✓ Filt. Bat. Multiple: {len(self.questionnaire_data['filtered_batteries_multiple'])}")
-        print(f"   ✓ CELKEM: {total} otázek")
+        print(f"   ✓ CELKEM: {total} otázek ({time.perf_counter() - t0:.2f} s)")
+        
+    def load_inputs(self, progress=None):
+        """
+        Načte data i dotazník. S concurrent_load běží parsování dotazníku ve
+        vedlejším vlákně, zatímco hlavní vlákno čte .sav; obě fáze se spojí
+        před generováním a chyba kterékoli z nich se vyhodí tady.
+        """
+        def report(stage):
+            if progress:
+                progress(stage, RUN_STAGES.index(stage) / len(RUN_STAGES))
         
+        if not self.concurrent_load or self.questionnaire_path is None:
+            report('load_data')
+            self.load_data()
+            report('load_questionnaire')
+            self.load_questionnaire()
+            return
+        
+        report('load_data')
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix='spss-load') as pool:
+            questionnaire = pool.submit(self.load_questionnaire)
+            self.load_data()
+            # Data jsou načtená, zbývá počkat na dotazník
+            report('load_questionnaire')
+            questionnaire.result()
+    
     def get_variables_for_question(self, question_code: str) -> List[str]:
         """Získá všechny proměnné pro daný kód otázky."""
-        prefix = f'Q{question_code}__'
-        return [col for col in self.df.columns if col.startswith(prefix)]
+        return self.column_index.variables(question_code)
     
     def get_item_text_from_label(self, label: str) -> str:
         """Extrahuje text položky z variable labelu."""
@@ -182,311 +586,598 @@ class SPSSSyntaxGenerator:
     
     def generate_syntax(self) -> str:
         """Hlavní metoda pro generování syntax - UPGRADED"""
+        syntax = '\n'.join(self.iter_syntax())
+        self._syntax_done(syntax.count('\n') + 1)
+        return syntax
+    
+    def iter_syntax(self) -> Iterator[str]:
+        """Řádky syntaxe jeden po druhém, bez skládání celého výstupu v paměti"""
         print("\n🔧 Generuji SPSS syntax (UPGRADED)...")
         
-        self.syntax_parts = []
-        
         # 1. Filtr na dokončené respondenty
-        self.syntax_parts.append("* OMEZENÍ DAT NA RESPONDENTY, KTEŘÍ DOKONČILI DOTAZNÍK.")
-        self.syntax_parts.append("SELECT IF resstatus = 2.")
-        self.syntax_parts.append("EXECUTE.")
-        self.syntax_parts.append("FREQUENCIES resstatus.")
-        self.syntax_parts.append("")
+        yield "* OMEZENÍ DAT NA RESPONDENTY, KTEŘÍ DOKONČILI DOTAZNÍK."
+        yield "SELECT IF resstatus = 2."
+        yield "EXECUTE."
+        yield "FREQUENCIES resstatus."
+        yield ""
         
-        # 2. Baterie otázek
-        self._generate_batteries()
-        
-        # 3. Multiple Response  
-        self._generate_multiple_response()
-        
-        # 4. Filtrované Multiple Response
-        self._generate_filtered_multiple()
-        
-        # 5. Filtrované Baterie
-        self._generate_filtered_batteries()
-        
-        # 6. Filtrované Baterie Multiple
-        self._generate_filtered_batteries_multiple()
+        # 2.-7. Baterie, Multiple Response, filtrované otázky, MRSETS
+        for section in GENERATE_SECTIONS:
+            yield from self._timed_section(section)
+    
+    def _timed_section(self, section: str) -> Iterator[str]:
+        """Řádky sekce _{section}; do metrik se počítá jen čas strávený v generátoru."""
+        lines = getattr(self, f'_{section}')()
+        elapsed = 0.0
+        while True:
+            t0 = time.perf_counter()
+            try:
+                line = next(lines)
+            except StopIteration:
+                elapsed += time.perf_counter() - t0
+                break
+            elapsed += time.perf_counter() - t0
+            yield line
+        metrics.observe('spss_stage_seconds', elapsed, stage=section)
+    
+    def stream_syntax(self, labels: Dict[str, str] = None) -> 'SyntaxStream':
+        """
+        Proud bajtů .sps s průběžným počtem řádků a bajtů (viz SyntaxStream).
+        Po dočtení se hotová syntax uloží do cache, je-li zapnutá a nepřesáhne
+        max_entry_bytes cache - delší syntax se pro cache přestane sbírat. Se slovníkem
+        labels se do něj během čtení sbírají popisky z VAR LAB (pro save_labelled_sav).
+        """
+        cache_key = self._syntax_cache_key()
         
-        # 7. MRSETS
-        self._generate_mrsets()
+        def on_complete(stream):
+            self._syntax_done(stream.lines)
+            text = stream.text
+            if text is not None:
+                self.cache.put('syntax', cache_key, text)
         
-        syntax = '\n'.join(self.syntax_parts)
-        print(f"✅ Vygenerováno {len(syntax.split(chr(10)))} řádků syntaxu")
-        return syntax
+        lines = self.iter_syntax()
+        if labels is not None:
+            lines = collect_labels(lines, labels)
+        collect = self.cache.max_entry_bytes if cache_key is not None else None
+        return SyntaxStream(lines, collect=collect, on_complete=on_complete)
+    
+    def _syntax_done(self, n_lines: int):
+        metrics.observe('spss_syntax_lines', n_lines)
+        print(f"✅ Vygenerováno {n_lines} řádků syntaxu")
     
     def _generate_batteries(self):
         """Generuje VAR LAB pro baterie otázek"""
         if not self.questionnaire_data['batteries']:
             return
             
-        section = ["* ÚPRAVA LABELŮ PRO BATERIE OTÁZEK - v tabulkách zobrazí jen text položky.", ""]
+        yield "* ÚPRAVA LABELŮ PRO BATERIE OTÁZEK - v tabulkách zobrazí jen text položky."
+        yield ""
         
         for battery in self.questionnaire_data['batteries']:
-            code = battery['code']
-            vars_list = self.get_variables_for_question(code)
-            
-            if not vars_list:
-                continue
-            
-            section.append(f"* {code} - {battery['text'][:80]}...")
-            for i, item_text in enumerate(battery['items'], 1):
-                var_name = f'Q{code}__{i}'
-                if var_name in vars_list:
-                    section.append(f'VAR LAB {var_name} "{item_text}".')
-            section.append("EXECUTE.")
-            section.append("")
+            yield from self._block('generate_batteries', battery, self._battery_block)
+    
+    def _battery_block(self, battery: Dict) -> Iterator[str]:
+        code = battery['code']
+        vars_list = self.get_variables_for_question(code)
         
-        self.syntax_parts.extend(section)
+        if not vars_list:
+            return
+        
+        yield f"* {code} - {battery['text'][:80]}..."
+        yield from self._item_labels(self.column_index.items(code), battery['items'])
+        yield "EXECUTE."
+        yield ""
     
     def _generate_multiple_response(self):
         """Generuje VAR LAB pro multiple response"""
         if not self.questionnaire_data['multiple_response']:
             return
             
-        section = ["* PŘÍPRAVA MULTIPLE RESPONSE SETŮ - DICHOTOMICKÉ OTÁZKY.", ""]
+        yield "* PŘÍPRAVA MULTIPLE RESPONSE SETŮ - DICHOTOMICKÉ OTÁZKY."
+        yield ""
         
         for mr_q in self.questionnaire_data['multiple_response']:
-            code = mr_q['code']
-            vars_list = self.get_variables_for_question(code)
-            
-            if not vars_list:
-                continue
-            
-            # DŮLEŽITÉ: Odstranit všechny \n aby se text nezalomil bez hvězdičky
-            question_text = mr_q['text'].replace('\n', ' ').strip()
-            # Omezit délku
-            if len(question_text) > 200:
-                question_text = question_text[:197] + "..."
-            
-            section.append(f"* {code} - {question_text}")
-            section.append(f"* Úprava labelů na názvy jednotlivých položek.")
-            
-            for i, item_text in enumerate(mr_q['items'], 1):
-                var_name = f'Q{code}__{i}'
-                if var_name in vars_list:
-                    section.append(f'VAR LAB {var_name} "{item_text}".')
-            
-            section.append("EXECUTE.")
-            section.append("")
+            yield from self._block('generate_multiple_response', mr_q, self._multiple_response_block)
+    
+    def _multiple_response_block(self, mr_q: Dict) -> Iterator[str]:
+        code = mr_q['code']
+        vars_list = self.get_variables_for_question(code)
+        
+        if not vars_list:
+            return
+        
+        # DŮLEŽITÉ: Odstranit všechny \n aby se text nezalomil bez hvězdičky
+        question_text = mr_q['text'].replace('\n', ' ').strip()
+        # Omezit délku
+        if len(question_text) > 200:
+            question_text = question_text[:197] + "..."
         
-        self.syntax_parts.extend(section)
+        yield f"* {code} - {question_text}"
+        yield f"* Úprava labelů na názvy jednotlivých položek."
+        
+        yield from self._item_labels(self.column_index.items(code), mr_q['items'])
+        
+        yield "EXECUTE."
+        yield ""
     
     def _generate_filtered_multiple(self):
         """Generuje VAR LAB pro filtrované multiple response"""
         if not self.questionnaire_data['filtered_multiple']:
             return
             
-        section = ["* FILTROVANÉ MULTIPLE RESPONSE OTÁZKY.", ""]
+        yield "* FILTROVANÉ MULTIPLE RESPONSE OTÁZKY."
+        yield ""
         
         for mr_q in self.questionnaire_data['filtered_multiple']:
-            code = mr_q['code']
-            vars_list = self.get_variables_for_question(code)
-            
-            if not vars_list:
-                continue
-            
-            # Najdeme rodičovskou otázku
-            parent = find_parent_question(code, self.questionnaire_data['all_questions'])
-            if not parent:
-                continue
-            
-            section.append(f"* {code} - {mr_q['text'][:80]}...")
-            section.append(f"* Používá odpovědi z {parent['code']}")
-            
-            # Použijeme položky z rodiče
-            for i, item_text in enumerate(parent['items'], 1):
-                var_name = f'Q{code}__{parent["code"]}_{i}'
-                if var_name in vars_list:
-                    section.append(f'VAR LAB {var_name} "{item_text}".')
-            
-            # Přidáme extra odpověď
-            if mr_q['items']:
-                extra_var = f'Q{code}__1'
-                if extra_var in vars_list:
-                    section.append(f'VAR LAB {extra_var} "{mr_q["items"][0]}".')
-            
-            section.append("EXECUTE.")
-            section.append("")
+            yield from self._block('generate_filtered_multiple', mr_q, self._filtered_multiple_block)
+    
+    def _filtered_multiple_block(self, mr_q: Dict) -> Iterator[str]:
+        code = mr_q['code']
+        vars_list = self.get_variables_for_question(code)
+        
+        if not vars_list:
+            return
+        
+        # Najdeme rodičovskou otázku
+        parent = self.questionnaire_data['parents'].get(code)
+        if not parent:
+            return
+        
+        yield f"* {code} - {mr_q['text'][:80]}..."
+        yield f"* Používá odpovědi z {parent['code']}"
+        
+        # Použijeme položky z rodiče
+        yield from self._item_labels(self.column_index.filtered_items(code, parent['code']), parent['items'])
         
-        self.syntax_parts.extend(section)
+        # Přidáme extra odpověď
+        if mr_q['items']:
+            extra_var = self.column_index.items(code).get(1)
+            if extra_var is not None:
+                yield f'VAR LAB {extra_var} "{mr_q["items"][0]}".'
+        
+        yield "EXECUTE."
+        yield ""
     
     def _generate_filtered_batteries(self):
         """Generuje VAR LAB pro filtrované baterie"""
         if not self.questionnaire_data['filtered_batteries']:
             return
             
-        section = ["* FILTROVANÉ BATERIE OTÁZEK.", ""]
+        yield "* FILTROVANÉ BATERIE OTÁZEK."
+        yield ""
         
         for battery in self.questionnaire_data['filtered_batteries']:
-            code = battery['code']
-            vars_list = self.get_variables_for_question(code)
-            
-            if not vars_list:
-                continue
-            
-            parent = find_parent_question(code, self.questionnaire_data['all_questions'])
-            if not parent:
-                continue
-            
-            section.append(f"* {code} - {battery['text'][:80]}...")
-            section.append(f"* Položky jsou filtrovány z {parent['code']}")
-            
-            for i, item_text in enumerate(parent['items'], 1):
-                var_name = f'Q{code}__{parent["code"]}_{i}'
-                if var_name in vars_list:
-                    section.append(f'VAR LAB {var_name} "{item_text}".')
-            
-            section.append("EXECUTE.")
-            section.append("")
+            yield from self._block('generate_filtered_batteries', battery, self._filtered_battery_block)
+    
+    def _filtered_battery_block(self, battery: Dict) -> Iterator[str]:
+        code = battery['code']
+        vars_list = self.get_variables_for_question(code)
+        
+        if not vars_list:
+            return
         
-        self.syntax_parts.extend(section)
+        parent = self.questionnaire_data['parents'].get(code)
+        if not parent:
+            return
+        
+        yield f"* {code} - {battery['text'][:80]}..."
+        yield f"* Položky jsou filtrovány z {parent['code']}"
+        
+        yield from self._item_labels(self.column_index.filtered_items(code, parent['code']), parent['items'])
+        
+        yield "EXECUTE."
+        yield ""
     
     def _generate_filtered_batteries_multiple(self):
         """Generuje VAR LAB pro filtrované baterie multiple"""
         if not self.questionnaire_data['filtered_batteries_multiple']:
             return
             
-        section = ["* FILTROVANÉ BATERIE MULTIPLE.", ""]
+        yield "* FILTROVANÉ BATERIE MULTIPLE."
+        yield ""
         
         for battery in self.questionnaire_data['filtered_batteries_multiple']:
-            code = battery['code']
-            all_vars = [col for col in self.df.columns if col.startswith(f'Q{code}__')]
-            
-            if not all_vars:
-                continue
-            
-            parent = find_parent_question(code, self.questionnaire_data['all_questions'])
-            if not parent:
-                continue
-            
-            section.append(f"* {code} - {battery['text'][:80]}...")
-            section.append(f"* Baterie multiple filtrovaná z {parent['code']}")
-            
-            # Extrahujeme unique row identifiers
-            rows = set()
-            for var in all_vars:
-                match = re.search(r'__([A-Z0-9_]+)column', var)
-                if match:
-                    rows.add(match.group(1))
-            
-            # Pro každý řádek
-            for row in sorted(rows):
-                match = re.search(r'_(\d+)$', row)
-                if match:
-                    idx = int(match.group(1))
-                    if idx <= len(parent['items']):
-                        item_text = parent['items'][idx - 1]
-                        
-                        for col_idx, col_text in enumerate(battery['items'], 1):
-                            var_name = f'Q{code}__{row}column{col_idx}'
-                            if var_name in all_vars:
-                                full_label = f"{item_text}|{col_text}"
-                                section.append(f'VAR LAB {var_name} "{full_label}".')
-            
-            section.append("EXECUTE.")
-            section.append("")
+            yield from self._block('generate_filtered_batteries_multiple', battery,
+                                   self._filtered_battery_multiple_block)
+    
+    def _filtered_battery_multiple_block(self, battery: Dict) -> Iterator[str]:
+        code = battery['code']
+        all_vars = self.get_variables_for_question(code)
+        
+        if not all_vars:
+            return
+        
+        parent = self.questionnaire_data['parents'].get(code)
+        if not parent:
+            return
+        
+        yield f"* {code} - {battery['text'][:80]}..."
+        yield f"* Baterie multiple filtrovaná z {parent['code']}"
         
-        self.syntax_parts.extend(section)
+        # Řádky a jejich existující buňky jsou předpočítané v indexu sloupců
+        rows = self.column_index.matrix(code)
+        n_columns = len(battery['items'])
+        
+        # Pro každý řádek
+        for row in sorted(rows):
+            idx, cells = rows[row]
+            if idx is not None and 0 < idx <= len(parent['items']):
+                item_text = parent['items'][idx - 1]
+                
+                for col_idx in sorted(cells):
+                    if col_idx <= n_columns:
+                        full_label = f"{item_text}|{battery['items'][col_idx - 1]}"
+                        yield f'VAR LAB {cells[col_idx]} "{full_label}".'
+        
+        yield "EXECUTE."
+        yield ""
+    
+    def _item_labels(self, variables: Dict[int, str], items: List[str]) -> Iterator[str]:
+        """VAR LAB pro existující proměnné {pořadí položky: proměnná} s textem položky."""
+        for i in sorted(variables):
+            if i <= len(items):
+                yield f'VAR LAB {variables[i]} "{items[i - 1]}".'
     
     def _generate_mrsets(self):
         """Vytvoří MRSETS pro všechny MR otázky"""
-        section = [""]
+        yield ""
         
         # MR sety pro standardní multiple response
         for mr_q in self.questionnaire_data['multiple_response']:
-            code = mr_q['code']
-            vars_list = self.get_variables_for_question(code)
-            
-            if not vars_list:
-                continue
-            
-            # DŮLEŽITÉ: Vyfiltrovat JEN numerické proměnné (stringové jako _jina NEPATŘÍ do MDGROUP)
-            numeric_vars = [v for v in vars_list if v in self.df.columns and self.df[v].dtype in ['int64', 'float64']]
-            
-            if not numeric_vars:
-                continue
-            
-            # Určíme VALUE z první numerické proměnné
-            sample_var = numeric_vars[0]
-            value_to_use = 2
-            if sample_var in self.meta.variable_value_labels:
-                val_labels = self.meta.variable_value_labels[sample_var]
-                for val, label in val_labels.items():
-                    if 'ano' in label.lower() or 'yes' in label.lower():
-                        value_to_use = val
-                        break
-            
-            vars_string = ' '.join(numeric_vars)
-            section.append(f"* Vytvoření MR setu pro {code}.")
-            section.append(f"MRSETS")
-            section.append(f"  /MDGROUP NAME=${code.lower()} CATEGORYLABELS=VARLABELS ")
-            section.append(f"  VARIABLES={vars_string} VALUE={value_to_use}")
-            section.append(f"  /DISPLAY NAME=[${code.lower()}].")
-            section.append("")
+            yield from self._block('generate_mrsets', mr_q, self._mrset_block)
         
         # MR sety pro filtrované multiple response
         for mr_q in self.questionnaire_data['filtered_multiple']:
-            code = mr_q['code']
-            vars_list = self.get_variables_for_question(code)
-            
-            if not vars_list:
-                continue
-            
-            # DŮLEŽITÉ: Vyfiltrovat JEN numerické proměnné
-            numeric_vars = [v for v in vars_list if v in self.df.columns and self.df[v].dtype in ['int64', 'float64']]
-            
-            if not numeric_vars:
-                continue
-            
-            value_to_use = 2
-            if numeric_vars and numeric_vars[0] in self.meta.variable_value_labels:
-                val_labels = self.meta.variable_value_labels[numeric_vars[0]]
-                for val, label in val_labels.items():
-                    if 'ano' in label.lower():
-                        value_to_use = val
-                        break
-            
-            vars_string = ' '.join(numeric_vars)
-            section.append(f"* Vytvoření MR setu pro {code}.")
-            section.append(f"MRSETS")
-            section.append(f"  /MDGROUP NAME=${code.lower()} CATEGORYLABELS=VARLABELS ")
-            section.append(f"  VARIABLES={vars_string} VALUE={value_to_use}")
-            section.append(f"  /DISPLAY NAME=[${code.lower()}].")
-            section.append("")
-        
-        self.syntax_parts.extend(section)
-    
-    def save_syntax(self, output_path: str):
-        """Uloží vygenerovanou syntax do souboru"""
-        syntax = self.generate_syntax()
-        
-        # Použití UTF-8 s BOM pro kompatibilitu se SPSS i Linuxem
-        with open(output_path, 'w', encoding='utf-8-sig', newline='\r\n') as f:
-            f.write(syntax)
+            yield from self._block('generate_mrsets', mr_q, self._mrset_block)
+    
+    def _mrset_block(self, mr_q: Dict) -> Iterator[str]:
+        code = mr_q['code']
+        vars_list = self.get_variables_for_question(code)
+        
+        if not vars_list:
+            return
+        
+        # DŮLEŽITÉ: Vyfiltrovat JEN numerické proměnné (stringové jako _jina NEPATŘÍ do MDGROUP)
+        numeric_vars = [v for v in vars_list if v in self.variable_index.numeric]
+        
+        if not numeric_vars:
+            return
+        
+        # Určíme VALUE z první numerické proměnné
+        value_to_use = self.variable_index.selected_code(numeric_vars[0])
+        
+        yield from self._mrset_lines(code, numeric_vars, value_to_use)
+    
+    def _mrset_lines(self, code: str, numeric_vars: List[str], value_to_use) -> Iterator[str]:
+        vars_string = ' '.join(numeric_vars)
+        yield f"* Vytvoření MR setu pro {code}."
+        yield f"MRSETS"
+        yield f"  /MDGROUP NAME=${code.lower()} CATEGORYLABELS=VARLABELS "
+        yield f"  VARIABLES={vars_string} VALUE={value_to_use}"
+        yield f"  /DISPLAY NAME=[${code.lower()}]."
+        yield ""
+    
+    def _block(self, section: str, question: Dict, build) -> Iterator[str]:
+        """
+        Řádky syntaxe jedné otázky v sekci. V inkrementálním režimu
+        (save_syntax(..., incremental=True)) se blok se stejným otiskem
+        vstupů převezme z předchozího výstupu a build se nevolá.
+        """
+        if self._blocks is None:
+            yield from build(question)
+            return
+        
+        code = question['code']
+        occurrence = self._block_occurrences.get((section, code), 0)
+        self._block_occurrences[(section, code)] = occurrence + 1
+        key = block_key(section, code, occurrence)
+        
+        fingerprint = self._block_fingerprint(section, question)
+        previous = self._previous_blocks.get(key)
+        if previous is not None and previous['fingerprint'] == fingerprint:
+            lines = previous['lines']
+        else:
+            lines = list(build(question))
+            self._rebuilt_blocks += 1
+        self._blocks.append({'key': key, 'fingerprint': fingerprint, 'lines': lines})
+        yield from lines
+    
+    def _block_fingerprint(self, section: str, question: Dict) -> str:
+        """
+        Otisk všeho, z čeho blok otázky vzniká: otázka, u filtrovaných sekcí
+        rodičovská otázka, proměnné .sav otázky a u MRSETS i jejich typ a kód "ano".
+        """
+        parent = None
+        if section in FILTERED_SECTIONS:
+            parent = self.questionnaire_data['parents'].get(question['code'])
+        variables = self.get_variables_for_question(question['code'])
+        if section == 'generate_mrsets':
+            index = self.variable_index
+            variables = [(var, var in index.numeric, index.selected_code(var)) for var in variables]
+        return fingerprint((
+            section,
+            [question[key] for key in BLOCK_QUESTION_FIELDS],
+            parent and [parent['code'], parent['items']],
+            variables,
+        ))
+    
+    def save_syntax(self, output_path: str, incremental: bool = False,
+                    sav_output_path: str = None) -> 'SyntaxStream':
+        """
+        Zapíše syntax do souboru průběžně, jak vzniká; vrací proud s počty řádků a bajtů.
+        S incremental=True převezme nezměněné bloky z předchozího výstupu
+        (manifest vedle output_path) a změny zapíše jako diff, viz block_changes.
+        Se sav_output_path zapíše navíc .sav s popisky ze syntaxe (save_labelled_sav).
+        """
+        if incremental:
+            previous = self._start_incremental(output_path)
+        labels = {} if sav_output_path else None
+        stream = self.stream_syntax(labels)
+        with open(output_path, 'wb') as f:
+            stream.write_to(f)
+        print(f"\n💾 Syntax uložena do: {output_path}")
+        if incremental:
+            self._finish_incremental(output_path, previous)
+        if sav_output_path:
+            self.save_labelled_sav(sav_output_path, labels)
+        return stream
+    
+    def save_labelled_sav(self, output_path: str, labels: Dict[str, str]):
+        """
+        Zapíše kopii vstupního .sav s popisky proměnných labels (viz sav_output.py),
+        takže se VAR LAB nemusí spouštět v SPSS. MRSETS zůstávají jen v syntaxi.
+        """
+        # Vlastní čtení hlavičky: self.meta je bez user_missing, chybějící hodnoty by se ztratily
+        with metrics.timer('spss_stage_seconds', stage='write_sav'):
+            write_labelled_sav(self.data_path, output_path, labels)
+        print(f"💾 .sav s popisky ({len(labels)} proměnných) uložen do: {output_path}")
+    
+    def _start_incremental(self, output_path: str) -> Optional[Dict]:
+        previous = load_manifest(manifest_path_for(output_path))
+        # Otisky platí jen pro stejnou verzi generátoru, jinak se sestaví všechny bloky
+        reusable = previous is not None and previous.get('version') == CACHE_VERSION
+        self._previous_blocks = {block['key']: block for block in previous['blocks']} if reusable else {}
+        self._blocks = []
+        self._block_occurrences = {}
+        self._rebuilt_blocks = 0
+        return previous
+    
+    def _finish_incremental(self, output_path: str, previous: Optional[Dict]):
+        blocks, self._blocks = self._blocks, None
+        self._previous_blocks = {}
+        save_manifest(manifest_path_for(output_path), CACHE_VERSION, blocks)
+        
+        diff_path = diff_path_for(output_path)
+        self.block_changes = {'blocks': len(blocks), 'rebuilt': self._rebuilt_blocks, 'first_run': previous is None,
+                              'added': [], 'changed': [], 'removed': [], 'diff': None}
+        if previous is None:
+            print(f"📝 Inkrementální režim: první běh, {len(blocks)} bloků uloženo do manifestu")
+            return
+        
+        diff, changes = diff_blocks(previous['blocks'], blocks)
+        self.block_changes.update(changes)
+        if diff:
+            with open(diff_path, 'w', encoding='utf-8') as f:
+                f.write(diff)
+            self.block_changes['diff'] = diff_path
+        elif os.path.exists(diff_path):
+            # Diff z dřívějšího běhu by už neodpovídal výstupu
+            os.remove(diff_path)
+        print(f"📝 Znovu sestaveno {self._rebuilt_blocks} z {len(blocks)} bloků; "
+              f"přidáno {len(changes['added'])}, změněno {len(changes['changed'])}, "
+              f"odebráno {len(changes['removed'])}" + (f" (diff: {diff_path})" if diff else ''))
+    
+    def _write_syntax(self, output_path: str, syntax: str):
+        with open(output_path, 'wb') as f:
+            f.write(encode_syntax(syntax))
         print(f"\n💾 Syntax uložena do: {output_path}")
     
-    def run(self, output_path: str):
-        """Spustí celý proces"""
+    def prepare(self, progress=None) -> Optional[str]:
+        """
+        Načte vstupy před generováním. Pokud už je stejná dvojice vstupů
+        v cache, nic nenačítá a vrátí hotovou syntax, jinak vrací None.
+        progress(stage, fraction) se volá před každou fází (viz RUN_STAGES).
+        """
         print("="*80)
         print("SPSS SYNTAX GENERATOR 2.0 - UPGRADED")
         print("="*80)
         
-        self.load_data()
-        self.load_questionnaire()
-        self.save_syntax(output_path)
+        # Stejná dvojice vstupů už byla zpracována - nic se neparsuje
+        cache_key = self._syntax_cache_key()
+        if cache_key is not None:
+            syntax = self.cache.get('syntax', cache_key)
+            if syntax is not None:
+                print("⚡ Syntax nalezena v cache")
+                return syntax
         
+        self.load_inputs(progress)
+        if progress:
+            progress('generate_syntax', RUN_STAGES.index('generate_syntax') / len(RUN_STAGES))
+        return None
+    
+    def build(self, progress=None) -> str:
+        """Načte vstupy a vrátí vygenerovanou syntax (bez zápisu na disk)."""
+        syntax = self.prepare(progress)
+        if syntax is None:
+            syntax = self.generate_syntax()
+            cache_key = self._syntax_cache_key()
+            if cache_key is not None:
+                self.cache.put('syntax', cache_key, syntax)
+        return syntax
+    
+    def run(self, output_path: str, progress=None, sav_output_path: str = None):
+        """Spustí celý proces a uloží syntax do output_path (a případně .sav do sav_output_path)"""
+        syntax = self.prepare(progress)
+        if syntax is None:
+            self.save_syntax(output_path, sav_output_path=sav_output_path)
+        else:
+            self._write_syntax(output_path, syntax)
+            if sav_output_path:
+                self.save_labelled_sav(sav_output_path, labels_from_syntax(syntax.split('\n')))
         print("\n✅ HOTOVO!")
         return output_path
+    
+    async def arun(self, output_path: str, progress=None, sav_output_path: str = None):
+        """
+        run() pro asyncio služby: celé generování běží ve výchozím executoru
+        smyčky, takže neblokuje event loop. progress se volá z toho vlákna.
+        """
+        import asyncio  # běží-li korutina, je asyncio už naimportované
+        
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.run, output_path, progress, sav_output_path)
+
+
+def encode_syntax(syntax: str) -> bytes:
+    """Syntax jako obsah .sps souboru: UTF-8 s BOM a CRLF pro kompatibilitu se SPSS i Linuxem."""
+    return syntax.replace('\n', '\r\n').encode('utf-8-sig')
+
+
+class SyntaxStream:
+    """
+    Obsah .sps (stejné bajty jako encode_syntax) skládaný po blocích z řádků syntaxe.
+    
+    Během iterace počítá řádky a bajty; s collect (počet znaků) si řádky drží
+    i jako text pro uložení do cache, dokud jejich délka nepřesáhne collect -
+    pak je zahodí a text je None. on_complete(stream) se zavolá po posledním bloku.
+    """
+    
+    CHUNK_CHARS = 64 * 1024
+    
+    def __init__(self, lines: Iterable[str], collect: Optional[int] = None, on_complete=None):
+        self._lines = lines
+        self._collected = [] if collect is not None else None
+        self._collect_left = collect
+        self._on_complete = on_complete
+        self.lines = 0
+        self.bytes = 0
+        self.complete = False
+    
+    def __iter__(self) -> Iterator[bytes]:
+        buffer = ['\ufeff']
+        buffered = 0
+        for line in self._lines:
+            if self.lines:
+                buffer.append('\n')
+            buffer.append(line)
+            buffered += len(line) + 1
+            self.lines += line.count('\n') + 1
+            if self._collected is not None:
+                self._collect_left -= len(line) + 1
+                if self._collect_left < 0:
+                    self._collected = None
+                else:
+                    self._collected.append(line)
+            if buffered >= self.CHUNK_CHARS:
+                yield self._encode(buffer)
+                buffer = []
+                buffered = 0
+        if buffer:
+            yield self._encode(buffer)
+        self.complete = True
+        if self._on_complete:
+            self._on_complete(self)
+    
+    def _encode(self, buffer: List[str]) -> bytes:
+        chunk = ''.join(buffer).replace('\n', '\r\n').encode('utf-8')
+        self.bytes += len(chunk)
+        return chunk
+    
+    def write_to(self, f):
+        for chunk in self:
+            f.write(chunk)
+    
+    @property
+    def text(self) -> Optional[str]:
+        """Celá syntax jako text po dočtení proudu; None bez collect nebo nad jeho limit"""
+        if self._collected is None:
+            return None
+        return '\n'.join(self._collected)
 
 
 # Flask API
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Request, Response, g, request, jsonify, make_response, send_file, url_for
 from flask_cors import CORS
-import os
+from contextlib import contextmanager
+from functools import partial, wraps
+from itertools import chain
+from urllib.parse import quote
+import gzip
+import io
+import shutil
 import tempfile
+import unicodedata
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.wsgi import ClosingIterator
+
+from admission import MB, LimitedUpload, UploadTooLarge, get_admission, max_file_bytes, max_request_bytes
+from jobs import QueueFullError, get_job_queue
+from profiling import get_profiler
+
+# Výstupy menší než tohle se posílají nekomprimované
+COMPRESS_MIN_BYTES = int(os.environ.get('SPSS_COMPRESS_MIN_BYTES', 64 * 1024))
+
+
+# Nahraný soubor větší než tohle se přesune z paměti na disk
+UPLOAD_MEMORY_BYTES = int(os.environ.get('SPSS_UPLOAD_MEMORY_MB', 64)) * MB
+
+
+class SpooledMemfd:
+    """
+    Nahrávaná data v anonymním souboru v paměti (memfd); po překročení max_memory
+    se obsah přesune do nepojmenovaného dočasného souboru na disku. V obou
+    případech se na soubor dá odkázat přes /proc/self/fd/N (viz upload_path).
+    """
+    
+    fd_path = True
+    
+    def __init__(self, max_memory: int):
+        self._file = os.fdopen(os.memfd_create('upload', os.MFD_CLOEXEC), 'w+b')
+        self._max_memory = max_memory
+        self.in_memory = True
+    
+    def write(self, data: bytes) -> int:
+        if self.in_memory and self._file.tell() + len(data) > self._max_memory:
+            disk = tempfile.TemporaryFile()
+            self._file.seek(0)
+            shutil.copyfileobj(self._file, disk)
+            self._file.close()
+            self._file = disk
+            self.in_memory = False
+        return self._file.write(data)
+    
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+
+def memory_upload_file():
+    """Soubor pro nahrávaná data: SpooledMemfd, mimo Linux SpooledTemporaryFile (se stejným limitem paměti)."""
+    if hasattr(os, 'memfd_create') and os.path.isdir('/proc/self/fd'):
+        return SpooledMemfd(UPLOAD_MEMORY_BYTES)
+    return tempfile.SpooledTemporaryFile(max_size=UPLOAD_MEMORY_BYTES)
+
+
+class MemoryUploadRequest(Request):
+    """
+    Nahrávané soubory se streamují rovnou do paměti, ne do dočasných souborů na disku.
+    Limit velikosti souboru se hlídá už během zápisu (viz admission.py).
+    """
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return LimitedUpload(memory_upload_file(), max_file_bytes(filename), filename)
+
 
 app = Flask(__name__)
+app.request_class = MemoryUploadRequest
+# Celý požadavek; větší Content-Length se odmítne před čtením těla
+app.config['MAX_CONTENT_LENGTH'] = max_request_bytes()
 
 # CORS konfigurace - povolit pouze z Netlify frontendu
 CORS(app, resources={
@@ -496,13 +1187,329 @@ CORS(app, resources={
             "http://localhost:8000",  # pro lokální testování
             "http://127.0.0.1:8000"
         ],
-        "expose_headers": ["Content-Disposition"]  # Povolit čtení tohoto headeru z JavaScriptu
+        "expose_headers": ["Content-Disposition", "Retry-After", "X-SPSS-Profile-Id"]  # Povolit čtení těchto headerů z JavaScriptu
     }
 })
 
+@app.before_request
+def _start_request_timer():
+    g.request_t0 = time.perf_counter()
+
+
+@app.after_request
+def _record_request_metrics(response):
+    """Doba a počet požadavků; odeslání těla odpovědi se měří až po jeho dokončení"""
+    if request.path == '/api/metrics' or 'request_t0' not in g:
+        return response
+    
+    endpoint = request.url_rule.rule if request.url_rule else 'unknown'
+    metrics.observe('spss_request_seconds', time.perf_counter() - g.request_t0, endpoint=endpoint)
+    metrics.inc('spss_requests_total', endpoint=endpoint, status=response.status_code)
+    
+    send_t0 = time.perf_counter()
+    
+    def _on_close():
+        metrics.observe('spss_stage_seconds', time.perf_counter() - send_t0, stage='send_response')
+        metrics.flush(metrics_dir())
+    
+    if response.direct_passthrough:
+        # send_file: werkzeug vrací tělo serveru přímo a call_on_close nevolá;
+        # server ale zavře iterátor těla po odeslání, tam se čas zaznamená
+        response.response = ClosingIterator(response.response, _on_close)
+    else:
+        response.call_on_close(_on_close)
+    return response
+
+
+def _record_upload(kind: str, size: int):
+    metrics.observe('spss_upload_bytes', size, kind=kind)
+
+
+@app.errorhandler(RequestEntityTooLarge)
+def _upload_too_large(e):
+    """413 s limitem, který byl překročen (jeden soubor, nebo celý požadavek)."""
+    metrics.inc('spss_admission_rejected_total', reason='size')
+    if isinstance(e, UploadTooLarge):
+        body = {'error': e.description, 'max_bytes': e.limit}
+        if e.max_members is not None:
+            body['max_members'] = e.max_members
+        return jsonify(body), 413
+    limit = app.config['MAX_CONTENT_LENGTH']
+    return jsonify({'error': f'Požadavek je větší než povolených {limit // MB} MB', 'max_bytes': limit}), 413
+
+
+def current_client():
+    """Klient požadavku podle X-API-Key, Origin nebo IP adresy (viz admission.py)."""
+    admission = get_admission()
+    forwarded_for = [value.strip() for value in request.headers.get('X-Forwarded-For', '').split(',') if value.strip()]
+    address = admission.client_address(request.remote_addr, forwarded_for)
+    return admission.identify(request.headers.get('X-API-Key'), request.headers.get('Origin'), address)
+
+
+def _too_many_requests(error: str, retry_after: int, **details):
+    response = jsonify({'error': error, 'retry_after': retry_after, **details})
+    response.headers['Retry-After'] = str(retry_after)
+    return response, 429
+
+
+def admission_controlled(view):
+    """
+    Synchronní generování jen ve volném slotu klienta, jinak hned 429.
+    Slot se drží i během streamování odpovědi a uvolní se až po jejím odeslání.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        admission = get_admission()
+        client = current_client()
+        slot = admission.acquire(client)
+        if slot is None:
+            metrics.inc('spss_admission_rejected_total', reason='slots')
+            return _too_many_requests(
+                f'Klient {client.name} už generuje ({client.slots} souběžně); '
+                f'počkejte, nebo úlohu zařaďte do fronty',
+                admission.retry_after, client=client.name, slots=client.slots, jobs_url=url_for('submit_job'),
+            )
+        try:
+            request.files  # tělo se načte tady, limity velikosti platí během čtení
+            response = make_response(view(*args, **kwargs))
+        except BaseException:
+            slot.release()
+            raise
+        if response.direct_passthrough:
+            # send_file: tělo je hotové a WSGI server zavírací callbacky odpovědi nevolá
+            slot.release()
+        else:
+            response.call_on_close(slot.release)
+        return response
+    return wrapper
+
+
+def _profile_trigger():
+    """Důvod profilování požadavku (hlavička X-SPSS-Profile od admina, nebo vzorkování), nebo None."""
+    return get_profiler().trigger(request.headers.get('X-SPSS-Profile'), request.headers.get('X-Admin-Token'))
+
+
+def _profile_details(generator: 'SPSSSyntaxGenerator') -> Dict:
+    """Velikost úlohy k uloženému profilu; u syntaxe z cache se vstupy nenačítají."""
+    if generator.meta is None:
+        return {'cached': True}
+    questions = {category: len(generator.questionnaire_data.get(category, ())) for category in CATEGORIES}
+    return {
+        'cached': False,
+        'variables': len(generator.columns),
+        'respondents': generator.meta.number_rows,
+        'questions': sum(questions.values()),
+        'questions_by_category': questions,
+    }
+
+
+def _profile_note(**details):
+    """Údaje k profilu aktuálního požadavku (bez profilování nic nedělá)."""
+    capture = g.get('profile')
+    if capture is not None:
+        capture.details.update(details)
+
+
+def profiled(view):
+    """
+    Požadavek vybraný k profilování (viz profiling.py) běží pod vzorkovačem až
+    do odeslání odpovědi - syntax se generuje i během streamování. ID profilu
+    vrací hlavička X-SPSS-Profile-Id. Ostatní požadavky jdou rovnou do view.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        trigger = _profile_trigger()
+        if trigger is None:
+            return view(*args, **kwargs)
+        
+        profiler = get_profiler()
+        g.profile = capture = profiler.start(trigger, request.url_rule.rule)
+        try:
+            response = make_response(view(*args, **kwargs))
+        except BaseException:
+            capture.details['status'] = 500
+            profiler.save(capture)
+            raise
+        capture.details['status'] = response.status_code
+        response.headers['X-SPSS-Profile-Id'] = capture.id
+        if response.direct_passthrough:
+            profiler.save(capture)
+        else:
+            response.call_on_close(partial(profiler.save, capture))
+        return response
+    return wrapper
+
+
+def admin_only(view):
+    """Jen s hlavičkou X-Admin-Token rovnou SPSS_ADMIN_TOKEN, jinak 403."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not get_profiler().is_admin(request.headers.get('X-Admin-Token')):
+            return jsonify({'error': 'Vyžaduje platný X-Admin-Token (SPSS_ADMIN_TOKEN)'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def upload_size(file_storage) -> int:
+    stream = file_storage.stream
+    pos = stream.tell()
+    size = stream.seek(0, os.SEEK_END)
+    stream.seek(pos)
+    return size
+
+
+@contextmanager
+def upload_path(file_storage):
+    """
+    Cesta, přes kterou může pyreadstat (C knihovna, umí jen cesty) číst nahraný soubor.
+    U uploadu ve SpooledMemfd je to /proc/self/fd/N, jinak se soubor zapíše do dočasného adresáře.
+    """
+    stream = file_storage.stream
+    if getattr(stream, 'fd_path', False):
+        stream.flush()
+        yield f'/proc/self/fd/{stream.fileno()}'
+        return
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'upload')
+        file_storage.save(path)
+        yield path
+
+
+def syntax_response(body: bytes, download_name: str) -> Response:
+    """
+    .sps ke stažení přímo z paměti; velké výstupy se komprimují (br, pokud je
+    k dispozici modul brotli a klient ho přijímá, jinak gzip).
+    """
+    encoding = None
+    if len(body) >= COMPRESS_MIN_BYTES:
+        if brotli is not None and request.accept_encodings['br']:
+            body, encoding = brotli.compress(body), 'br'
+        elif request.accept_encodings['gzip']:
+            body, encoding = gzip.compress(body, compresslevel=6), 'gzip'
+    
+    response = send_file(
+        io.BytesIO(body),
+        mimetype='text/plain',
+        as_attachment=True,
+        download_name=download_name
+    )
+    response.content_length = len(body)
+    response.vary.add('Accept-Encoding')
+    if encoding:
+        response.content_encoding = encoding
+    return response
+
+
+def _attachment_options(download_name: str) -> Dict[str, str]:
+    """Parametry Content-Disposition jako u send_file (ne-ASCII název přes filename*)."""
+    try:
+        download_name.encode('ascii')
+        return {'filename': download_name}
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize('NFKD', download_name).encode('ascii', 'ignore').decode('ascii')
+        return {'filename': simple, 'filename*': f"UTF-8''{quote(download_name, safe='!#$&+^`|~')}"}
+
+
+def _gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _brotli_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = brotli.Compressor()
+    for chunk in chunks:
+        data = compressor.process(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def streaming_syntax_response(stream: SyntaxStream, download_name: str) -> Response:
+    """
+    .sps odesílaný průběžně, jak se generuje (chunked, bez Content-Length).
+    Malé výstupy, které se vejdou pod COMPRESS_MIN_BYTES, jdou celé přes syntax_response.
+    """
+    chunks = iter(stream)
+    head = []
+    head_bytes = 0
+    for chunk in chunks:
+        head.append(chunk)
+        head_bytes += len(chunk)
+        if head_bytes >= COMPRESS_MIN_BYTES:
+            break
+    if head_bytes < COMPRESS_MIN_BYTES:
+        return syntax_response(b''.join(head), download_name)
+    
+    body = chain(head, chunks)
+    encoding = None
+    if brotli is not None and request.accept_encodings['br']:
+        body, encoding = _brotli_chunks(body), 'br'
+    elif request.accept_encodings['gzip']:
+        body, encoding = _gzip_chunks(body), 'gzip'
+    
+    response = Response(body, mimetype='text/plain')
+    response.headers.set('Content-Disposition', 'attachment', **_attachment_options(download_name))
+    response.vary.add('Accept-Encoding')
+    if encoding:
+        response.content_encoding = encoding
+    return response
+
+
+OUTPUT_PREFIX = 'generated_syntax_'
+
+
+def output_filename_for(sav_filename: str) -> str:
+    """Název staženého .sps podle názvu SAV souboru bez přípony."""
+    sav_basename = os.path.splitext(sav_filename)[0]
+    return f'{OUTPUT_PREFIX}{sav_basename}.sps'
+
+
+def sav_output_path_for(syntax_path: str) -> str:
+    """.sav s popisky vedle .sps se stejným názvem (generated_syntax_X.sps -> generated_syntax_X.sav)."""
+    return os.path.splitext(syntax_path)[0] + '.sav'
+
+
+def labelled_sav_response(generator: 'SPSSSyntaxGenerator', syntax: Optional[str], syntax_filename: str) -> Response:
+    """
+    Zip se .sps (ke kontrole a pro MRSETS) a kopií nahraného .sav s popisky
+    ze syntaxe. syntax je hotová syntax z cache, nebo None - pak se generuje.
+    .sav se do zipu jen ukládá, komprese velkého souboru by odpověď zdržela.
+    """
+    sav_filename = sav_output_path_for(syntax_filename)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        sav_path = os.path.join(tmpdir, sav_filename)
+        zip_path = os.path.join(tmpdir, 'output.zip')
+        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+            if syntax is None:
+                labels = {}
+                with zf.open(syntax_filename, 'w') as f:
+                    generator.stream_syntax(labels).write_to(f)
+            else:
+                labels = labels_from_syntax(syntax.split('\n'))
+                zf.writestr(syntax_filename, encode_syntax(syntax))
+            generator.save_labelled_sav(sav_path, labels)
+            zf.write(sav_path, sav_filename, compress_type=zipfile.ZIP_STORED)
+        # send_file soubor hned otevře, adresář se pak může smazat
+        return send_file(
+            zip_path,
+            mimetype='application/zip',
+            as_attachment=True,
+            download_name=os.path.splitext(syntax_filename)[0] + '.zip'
+        )
+
+
 @app.route('/api/generate', methods=['POST'])
+@admission_controlled
+@profiled
 def generate_syntax():
-    """API endpoint pro generování syntax"""
+    """
+    API endpoint pro generování syntax - vstupy i výstup zůstávají v paměti.
+    S output=sav (pole formuláře nebo parametr) vrací zip se .sps a .sav s popisky.
+    """
     try:
         print("📥 Přijat požadavek na generování syntax")
         
@@ -516,30 +1523,31 @@ def generate_syntax():
         print(f"✓ SAV soubor: {sav_file.filename}")
         print(f"✓ DOCX soubor: {docx_file.filename}")
         
-        # Získat název SAV souboru bez přípony
-        sav_basename = os.path.splitext(sav_file.filename)[0]
-        output_filename = f'generated_syntax_{sav_basename}.sps'
+        output_filename = output_filename_for(sav_file.filename)
+        sav_bytes = upload_size(sav_file)
+        docx_bytes = upload_size(docx_file)
+        _record_upload('sav', sav_bytes)
+        _record_upload('docx', docx_bytes)
+        _profile_note(sav_bytes=sav_bytes, docx_bytes=docx_bytes)
         
-        with tempfile.TemporaryDirectory() as tmpdir:
-            sav_path = os.path.join(tmpdir, 'data.sav')
-            docx_path = os.path.join(tmpdir, 'questionnaire.docx')
-            output_path = os.path.join(tmpdir, 'syntax.sps')
-            
-            print("💾 Ukládám soubory...")
-            sav_file.save(sav_path)
-            docx_file.save(docx_path)
-            
+        # Vstupy se načtou celé uvnitř požadavku (chyby tak vrací 500 s JSON),
+        # syntax se pak generuje až během odesílání odpovědi
+        with upload_path(sav_file) as sav_path:
             print("🔧 Generuji syntax...")
-            generator = SPSSSyntaxGenerator(sav_path, docx_path)
-            generator.run(output_path)
-            
-            print(f"✅ Odesílám soubor: {output_filename}")
-            return send_file(
-                output_path,
-                mimetype='text/plain',
-                as_attachment=True,
-                download_name=output_filename
-            )
+            # Při profilování se vstupy načítají v tomto vlákně, aby byly vidět v profilu
+            generator = SPSSSyntaxGenerator(sav_path, docx_file.stream, cache=get_cache(),
+                                            concurrent_load='profile' not in g)
+            syntax = generator.prepare()
+            _profile_note(**_profile_details(generator))
+            # .sav s popisky se zapisuje z nahraného souboru, takže ještě uvnitř with
+            if request.values.get('output') == 'sav':
+                print(f"✅ Odesílám zip se syntaxí a .sav: {output_filename}")
+                return labelled_sav_response(generator, syntax, output_filename)
+        
+        print(f"✅ Odesílám soubor: {output_filename}")
+        if syntax is not None:
+            return syntax_response(encode_syntax(syntax), output_filename)
+        return streaming_syntax_response(generator.stream_syntax(), output_filename)
     
     except Exception as e:
         import traceback
@@ -547,6 +1555,166 @@ def generate_syntax():
         print(f"❌ ERROR: {error_detail}")
         return jsonify({'error': str(e), 'detail': error_detail}), 500
 
+@app.route('/api/batch', methods=['POST'])
+@admission_controlled
+def generate_batch_syntax():
+    """Jeden dotazník + více .sav (sav_files, případně zip) -> zip se .sps a summary.json"""
+    from batch import generate_batch
+    from werkzeug.utils import secure_filename
+    
+    sav_files = request.files.getlist('sav_files')
+    if 'docx_file' not in request.files or not sav_files:
+        return jsonify({'error': 'Chybí soubory'}), 400
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        docx_path = os.path.join(tmpdir, 'questionnaire.docx')
+        request.files['docx_file'].save(docx_path)
+        _record_upload('docx', os.path.getsize(docx_path))
+        
+        # Každý soubor ve vlastním adresáři, aby zůstal původní název (a z něj název .sps)
+        sav_paths = []
+        for i, sav_file in enumerate(sav_files):
+            file_dir = os.path.join(tmpdir, str(i))
+            os.makedirs(file_dir)
+            sav_path = os.path.join(file_dir, secure_filename(sav_file.filename) or 'data.sav')
+            sav_file.save(sav_path)
+            _record_upload('sav', os.path.getsize(sav_path))
+            sav_paths.append(sav_path)
+        
+        print(f"📥 Dávka: {len(sav_paths)} souborů")
+        output_path = os.path.join(tmpdir, 'syntax_batch.zip')
+        generate_batch(docx_path, sav_paths, output_path,
+                       workers=int(os.environ.get('SPSS_BATCH_WORKERS', 2)))
+        
+        return send_file(
+            output_path,
+            mimetype='application/zip',
+            as_attachment=True,
+            download_name='syntax_batch.zip'
+        )
+
+
+def _run_generation_job(job, profile_trigger: str = None):
+    """Úloha z fronty - vstupy i výstup jsou v adresáři úlohy. S profile_trigger se run() profiluje."""
+    sav_bytes = os.path.getsize(job.path('data.sav'))
+    docx_bytes = os.path.getsize(job.path('questionnaire.docx'))
+    _record_upload('sav', sav_bytes)
+    _record_upload('docx', docx_bytes)
+    capture = get_profiler().start(profile_trigger, '/api/jobs') if profile_trigger else None
+    generator = SPSSSyntaxGenerator(job.path('data.sav'), job.path('questionnaire.docx'), cache=get_cache(),
+                                    concurrent_load=capture is None)
+    status = 'failed'
+    try:
+        generator.run(job.path('syntax.sps'), progress=job.progress)
+        status = 'done'
+    finally:
+        if capture is not None:
+            capture.details.update(job_id=job.id, status=status, sav_bytes=sav_bytes, docx_bytes=docx_bytes,
+                                   **_profile_details(generator))
+            get_profiler().save(capture)
+        metrics.flush(metrics_dir())
+
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """Zařadí generování do fronty a hned vrátí ID úlohy (202)"""
+    if 'sav_file' not in request.files or 'docx_file' not in request.files:
+        return jsonify({'error': 'Chybí soubory'}), 400
+    
+    sav_file = request.files['sav_file']
+    docx_file = request.files['docx_file']
+    client = current_client()
+    queue = get_job_queue()
+    trigger = _profile_trigger()
+    
+    try:
+        job = queue.submit(
+            partial(_run_generation_job, profile_trigger=trigger) if trigger else _run_generation_job,
+            {'data.sav': sav_file, 'questionnaire.docx': docx_file},
+            output_filename_for(sav_file.filename),
+            client=client.name,
+            weight=client.weight,
+        )
+    except QueueFullError as e:
+        metrics.inc('spss_admission_rejected_total', reason='queue')
+        return _too_many_requests(str(e), e.retry_after, client=client.name)
+    
+    status = queue.status(job.id)
+    print(f"📥 Úloha {job.id} zařazena do fronty ({client.name}: {sav_file.filename}, {docx_file.filename})")
+    return jsonify({
+        'job_id': job.id,
+        'client': client.name,
+        'status': status['status'],
+        'queue_position': status.get('queue_position', 0),
+        'status_url': url_for('job_status', job_id=job.id),
+        'result_url': url_for('job_result', job_id=job.id),
+    }), 202
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Stav úlohy: queued / running / done / failed, aktuální fáze a průběh"""
+    status = get_job_queue().status(job_id)
+    if status is None:
+        return jsonify({'error': 'Úloha nenalezena'}), 404
+    return jsonify(status)
+
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    """Stažení hotového .sps (409 dokud úloha neskončila)"""
+    queue = get_job_queue()
+    status = queue.status(job_id)
+    if status is None:
+        return jsonify({'error': 'Úloha nenalezena'}), 404
+    if status['status'] == 'failed':
+        return jsonify({'error': status['error'], 'status': status['status']}), 500
+    if status['status'] != 'done':
+        return jsonify({'error': 'Úloha ještě není hotová', 'status': status['status']}), 409
+    
+    return send_file(
+        queue.get(job_id).path('syntax.sps'),
+        mimetype='text/plain',
+        as_attachment=True,
+        download_name=status['output_name']
+    )
+
+
+@app.route('/api/cache', methods=['GET'])
+def cache_stats():
+    """Statistiky cache (zásahy/výpadky, obsazené místo)"""
+    cache = get_cache()
+    if cache is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **cache.stats()})
+
+
+@app.route('/api/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Metriky všech workerů ve formátu Prometheus"""
+    return Response(collect_metrics(metrics_dir()), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/api/admin/profiles', methods=['GET'])
+@admin_only
+def list_profiles():
+    """Uložené profily (od nejnovějšího) s velikostí vstupů a počty otázek"""
+    profiler = get_profiler()
+    return jsonify({'sample_rate': profiler.sample_rate, 'profiles': [
+        {**info, 'download_url': url_for('download_profile', profile_id=info['id'])} for info in profiler.list()
+    ]})
+
+
+@app.route('/api/admin/profiles/<profile_id>', methods=['GET'])
+@admin_only
+def download_profile(profile_id):
+    """Profil jako collapsed stacks pro flamegraph.pl, speedscope nebo inferno"""
+    path = get_profiler().folded_path(profile_id)
+    if path is None:
+        return jsonify({'error': 'Profil nenalezen'}), 404
+    return send_file(path, mimetype='text/plain', as_attachment=True, download_name=f'profile_{profile_id}.folded')
+
+
 @app.route('/api/health', methods=['GET'])
 def health():
     return jsonify({'status': 'ok', 'version': '2.0.6-cors-headers-fix'})
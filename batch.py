@@ -0,0 +1,196 @@
+"""
+Dávkové generování: jeden dotazník, mnoho .sav souborů (vlny, země)
+
+Dotazník se rozparsuje jednou, jednotlivé .sav se zpracují paralelně
+v poolu procesů a výsledkem je zip se .sps soubory a souhrnem.
+
+    python -m batch dotaznik.docx vlna1.sav vlna2.sav vlny.zip -o syntaxe.zip -j 4
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+
+from admission import MB, UploadTooLarge, max_extracted_bytes, max_file_bytes, max_zip_members
+from backend_app import SPSSSyntaxGenerator, output_filename_for, parse_questionnaire_from_docx
+
+# Dotazník předaný každému procesu poolu jednou, při jeho startu
+_questionnaire_data = None
+
+
+def _init_worker(questionnaire_data: Dict):
+    global _questionnaire_data
+    _questionnaire_data = questionnaire_data
+
+
+def generate_one(sav_path: str, output_path: str, questionnaire_data: Dict = None,
+                 questionnaire_path: str = None, incremental: bool = False, sav_output_path: str = None) -> Dict:
+    """
+    Vygeneruje syntax pro jeden .sav a vrátí řádek souhrnu (chyby nevyhazuje).
+    Dotazník je buď předaný rozparsovaný, nebo se načte z questionnaire_path.
+    S incremental=True obsahuje souhrn i 'changes' (viz SPSSSyntaxGenerator.block_changes).
+    Se sav_output_path se zapíše i .sav s popisky (souhrn pak má 'labelled_sav').
+    """
+    summary = {
+        'sav_file': os.path.basename(sav_path),
+        'output_file': os.path.basename(output_path),
+        'status': 'ok',
+    }
+    t0 = time.perf_counter()
+    try:
+        if questionnaire_path is None:
+            questionnaire_data = questionnaire_data or _questionnaire_data
+        generator = SPSSSyntaxGenerator(sav_path, questionnaire_path, questionnaire_data=questionnaire_data)
+        # Výpisy jednotlivých souborů by se mezi procesy prolínaly
+        with contextlib.redirect_stdout(io.StringIO()):
+            generator.load_inputs()
+            stream = generator.save_syntax(output_path, incremental=incremental, sav_output_path=sav_output_path)
+        summary['respondents'] = generator.meta.number_rows
+        summary['variables'] = len(generator.columns)
+        summary['lines'] = stream.lines
+        if incremental:
+            summary['changes'] = generator.block_changes
+        if sav_output_path:
+            summary['labelled_sav'] = os.path.basename(sav_output_path)
+    except Exception as e:
+        summary['status'] = 'error'
+        summary['error'] = str(e)
+    summary['seconds'] = round(time.perf_counter() - t0, 3)
+    return summary
+
+
+def collect_sav_files(inputs: List[str], extract_dir: str) -> List[str]:
+    """
+    Cesty k .sav souborům; zipy se rozbalí do extract_dir (jen .sav, bez podadresářů).
+    Limit uploadu platí jen pro komprimovaný zip, proto se před rozbalením
+    kontroluje každý .sav (max_file_bytes), součet rozbalených .sav ze všech
+    zipů (max_extracted_bytes) a jejich počet (max_zip_members) - jinak UploadTooLarge.
+    """
+    sav_paths = []
+    max_bytes, max_members = max_extracted_bytes(), max_zip_members()
+    extracted_bytes = 0
+    extracted_members = 0
+    for path in inputs:
+        if not path.lower().endswith('.sav') and zipfile.is_zipfile(path):
+            with zipfile.ZipFile(path) as zf:
+                members = [
+                    member for member in zf.infolist()
+                    if not member.is_dir() and member.filename.lower().endswith('.sav')
+                ]
+                zip_name = os.path.basename(path)
+                extracted_members += len(members)
+                if extracted_members > max_members:
+                    raise UploadTooLarge(
+                        zip_name, max_bytes, max_members=max_members,
+                        description=f'Zip {zip_name} obsahuje víc než povolených {max_members} souborů .sav')
+                # ZipExtFile nepřečte víc než deklarovaných file_size bajtů
+                for member in members:
+                    limit = max_file_bytes(member.filename)
+                    if member.file_size > limit:
+                        raise UploadTooLarge(os.path.basename(member.filename), limit)
+                extracted_bytes += sum(member.file_size for member in members)
+                if extracted_bytes > max_bytes:
+                    raise UploadTooLarge(
+                        zip_name, max_bytes,
+                        description=f'Rozbalené .sav ze zipu {zip_name} přesahují povolených {max_bytes // MB} MB')
+                for member in members:
+                    name = os.path.basename(member.filename)
+                    target = os.path.join(extract_dir, f'{len(sav_paths)}_{name}')
+                    with zf.open(member) as src, open(target, 'wb') as dst:
+                        shutil.copyfileobj(src, dst)
+                    sav_paths.append(target)
+        else:
+            sav_paths.append(path)
+    return sav_paths
+
+
+def _display_name(sav_path: str, extract_dir: str) -> str:
+    """Název .sav bez prefixu přidaného při rozbalení zipu."""
+    name = os.path.basename(sav_path)
+    if os.path.dirname(sav_path) == extract_dir:
+        name = name.split('_', 1)[1]
+    return name
+
+
+def generate_batch(questionnaire_path: str, inputs: List[str], output_zip: str, workers: int = None) -> List[Dict]:
+    """
+    Rozparsuje dotazník, vygeneruje syntax pro každý .sav (nebo .sav ze zipu)
+    a zapíše zip se .sps soubory a summary.json. Vrací souhrn po souborech.
+    """
+    workers = workers or os.cpu_count() or 1
+    t0 = time.perf_counter()
+    questionnaire_data = parse_questionnaire_from_docx(questionnaire_path)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        extract_dir = os.path.join(tmpdir, 'sav')
+        output_dir = os.path.join(tmpdir, 'sps')
+        os.makedirs(extract_dir)
+        os.makedirs(output_dir)
+        sav_paths = collect_sav_files(inputs, extract_dir)
+
+        # Unikátní názvy výstupů i pro stejně pojmenované .sav z různých zdrojů
+        output_names = []
+        for sav_path in sav_paths:
+            name = output_filename_for(_display_name(sav_path, extract_dir))
+            base, ext = os.path.splitext(name)
+            i = 2
+            while name in output_names:
+                name = f'{base}_{i}{ext}'
+                i += 1
+            output_names.append(name)
+        output_paths = [os.path.join(output_dir, name) for name in output_names]
+
+        if workers == 1 or len(sav_paths) <= 1:
+            summaries = [generate_one(sav, out, questionnaire_data) for sav, out in zip(sav_paths, output_paths)]
+        else:
+            # spawn: bezpečné i uvnitř gunicorn workeru s běžícími vlákny
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(sav_paths)),
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(questionnaire_data,),
+            ) as pool:
+                summaries = list(pool.map(generate_one, sav_paths, output_paths))
+
+        for sav_path, summary in zip(sav_paths, summaries):
+            summary['sav_file'] = _display_name(sav_path, extract_dir)
+
+        with zipfile.ZipFile(output_zip, 'w', zipfile.ZIP_DEFLATED) as zf:
+            for summary, output_path in zip(summaries, output_paths):
+                if summary['status'] == 'ok':
+                    zf.write(output_path, summary['output_file'])
+            zf.writestr('summary.json', json.dumps(summaries, ensure_ascii=False, indent=2))
+
+    elapsed = time.perf_counter() - t0
+    ok = sum(1 for s in summaries if s['status'] == 'ok')
+    print(f"✅ Dávka: {ok}/{len(summaries)} souborů za {elapsed:.2f} s "
+          f"({len(summaries) / max(elapsed, 1e-9):.1f} souborů/s, {workers} procesů)")
+    return summaries
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Dávkové generování SPSS syntaxe pro více .sav souborů')
+    parser.add_argument('questionnaire', help='dotazník .docx')
+    parser.add_argument('inputs', nargs='+', help='.sav soubory nebo zip s .sav soubory')
+    parser.add_argument('-o', '--output', default='syntax_batch.zip', help='výstupní zip')
+    parser.add_argument('-j', '--workers', type=int, default=None, help='počet procesů (výchozí: počet jader)')
+    args = parser.parse_args()
+
+    summaries = generate_batch(args.questionnaire, args.inputs, args.output, args.workers)
+    for s in summaries:
+        detail = f"{s['lines']} řádků" if s['status'] == 'ok' else s['error']
+        print(f"   {'✓' if s['status'] == 'ok' else '✗'} {s['sav_file']} -> {s['output_file']} ({detail})")
+    print(f"💾 {args.output}")
+
+
+if __name__ == '__main__':
+    main()
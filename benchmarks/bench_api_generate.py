@@ -0,0 +1,94 @@
+"""
+Benchmark: latence /api/generate - původní cesta přes dočasné soubory vs. paměť
+
+Původní handler (uložení obou uploadů do TemporaryDirectory, zápis syntax.sps
+a send_file) je zde zopakovaný na samostatné Flask aplikaci; obě varianty
+běží přes Flask test client se stejnými soubory a vypnutou cache.
+
+    python -m benchmarks.bench_api_generate --rows 20000 --questions 200 --repeat 5
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import tempfile
+import time
+
+os.environ['SPSS_CACHE'] = '0'
+
+from flask import Flask, request, send_file
+
+import backend_app
+from benchmarks.synthetic import synthetic_questionnaire, write_synthetic_docx, write_synthetic_sav
+
+legacy_app = Flask('legacy')
+
+
+@legacy_app.route('/api/generate', methods=['POST'])
+def legacy_generate():
+    sav_file = request.files['sav_file']
+    docx_file = request.files['docx_file']
+    with tempfile.TemporaryDirectory() as tmpdir:
+        sav_path = os.path.join(tmpdir, 'data.sav')
+        docx_path = os.path.join(tmpdir, 'questionnaire.docx')
+        output_path = os.path.join(tmpdir, 'syntax.sps')
+        sav_file.save(sav_path)
+        docx_file.save(docx_path)
+        backend_app.SPSSSyntaxGenerator(sav_path, docx_path).run(output_path)
+        return send_file(output_path, mimetype='text/plain', as_attachment=True,
+                         download_name='syntax.sps')
+
+
+def _time_requests(app: Flask, sav_bytes: bytes, docx_bytes: bytes, repeat: int, headers=None) -> list:
+    client = app.test_client()
+    timings = []
+    for _ in range(repeat):
+        data = {
+            'sav_file': (io.BytesIO(sav_bytes), 'data.sav'),
+            'docx_file': (io.BytesIO(docx_bytes), 'questionnaire.docx'),
+        }
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            response = client.post('/api/generate', data=data, content_type='multipart/form-data',
+                                   headers=headers or {})
+            body = response.data
+            response.close()
+        timings.append(time.perf_counter() - t0)
+        assert response.status_code == 200, body[:200]
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--questions', type=int, default=200)
+    parser.add_argument('--blocks', type=int, default=200, help='bloků otázek v dotazníku')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        sav_path = os.path.join(tmpdir, 'data.sav')
+        docx_path = os.path.join(tmpdir, 'q.docx')
+        write_synthetic_sav(sav_path, args.rows, args.questions)
+        write_synthetic_docx(docx_path, synthetic_questionnaire(args.blocks))
+        with open(sav_path, 'rb') as f:
+            sav_bytes = f.read()
+        with open(docx_path, 'rb') as f:
+            docx_bytes = f.read()
+
+    print(f".sav {len(sav_bytes) / 1024 / 1024:.1f} MB, .docx {len(docx_bytes) / 1024:.0f} kB, {args.repeat}× každá varianta")
+    variants = [
+        ('dočasné soubory', legacy_app, None),
+        ('v paměti', backend_app.app, None),
+        ('v paměti + gzip', backend_app.app, {'Accept-Encoding': 'gzip'}),
+    ]
+    print(f"{'varianta':<18}{'medián [s]':>12}{'min [s]':>10}")
+    for name, app, headers in variants:
+        timings = _time_requests(app, sav_bytes, docx_bytes, args.repeat, headers)
+        print(f"{name:<18}{statistics.median(timings):>12.3f}{min(timings):>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""
+Benchmark: propustnost dávkového generování podle počtu procesů
+
+    python -m benchmarks.bench_batch --files 24 --workers 1 2 4
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from batch import generate_batch
+from benchmarks.synthetic import synthetic_questionnaire, write_synthetic_docx, write_synthetic_sav
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--files', type=int, default=24)
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--questions', type=int, default=200)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        docx_path = os.path.join(tmpdir, 'q.docx')
+        write_synthetic_docx(docx_path, synthetic_questionnaire(40))
+        template = os.path.join(tmpdir, 'wave.sav')
+        write_synthetic_sav(template, args.rows, args.questions)
+        sav_paths = []
+        for i in range(args.files):
+            path = os.path.join(tmpdir, f'wave_{i}.sav')
+            os.link(template, path)
+            sav_paths.append(path)
+
+        print(f"{'procesů':>8}{'čas [s]':>10}{'souborů/s':>12}")
+        for workers in args.workers:
+            t0 = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                generate_batch(docx_path, sav_paths, os.path.join(tmpdir, 'out.zip'), workers)
+            elapsed = time.perf_counter() - t0
+            print(f"{workers:>8}{elapsed:>10.2f}{args.files / elapsed:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark: načtení vstupů postupně vs. souběžně (SPSSSyntaxGenerator.load_inputs)
+
+Porovnává postupné načtení, souběh ve vlákně (výchozí load_inputs) a souběh
+v procesu - dotazník se parsuje ve spawn poolu a výsledek se vrací picklovaný,
+jednou s poolem spouštěným pro každé načtení, jednou s předem nahřátým poolem.
+
+    python -m benchmarks.bench_concurrent_load --rows 20000 --blocks 2000 --repeat 5
+"""
+
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+os.environ['SPSS_CACHE'] = '0'
+
+from backend_app import SPSSSyntaxGenerator, parse_questionnaire_from_docx
+from benchmarks.synthetic import synthetic_questionnaire, write_synthetic_docx, write_synthetic_sav
+
+
+def _load_sequential(sav_path: str, docx_path: str, pool=None):
+    gen = SPSSSyntaxGenerator(sav_path, docx_path, concurrent_load=False)
+    gen.load_inputs()
+    return gen
+
+
+def _load_thread(sav_path: str, docx_path: str, pool=None):
+    gen = SPSSSyntaxGenerator(sav_path, docx_path)
+    gen.load_inputs()
+    return gen
+
+
+def _load_process(sav_path: str, docx_path: str, pool=None):
+    own_pool = pool is None
+    if own_pool:
+        pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+    try:
+        questionnaire = pool.submit(parse_questionnaire_from_docx, docx_path)
+        gen = SPSSSyntaxGenerator(sav_path, None)
+        gen.load_data()
+        gen.questionnaire_data = questionnaire.result()
+        gen.load_questionnaire()
+    finally:
+        if own_pool:
+            pool.shutdown()
+    return gen
+
+
+def _time(loader, sav_path: str, docx_path: str, repeat: int, pool=None) -> float:
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            loader(sav_path, docx_path, pool)
+        timings.append(time.perf_counter() - t0)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--questions', type=int, default=200)
+    parser.add_argument('--blocks', type=int, default=2000, help='bloků otázek v dotazníku (6 otázek na blok)')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        sav_path = os.path.join(tmpdir, 'data.sav')
+        docx_path = os.path.join(tmpdir, 'questionnaire.docx')
+        write_synthetic_sav(sav_path, args.rows, args.questions, 10)
+        n_paragraphs = write_synthetic_docx(docx_path, synthetic_questionnaire(args.blocks))
+        print(f"Vstupy: .sav {os.path.getsize(sav_path) / 1024 / 1024:.1f} MB, "
+              f".docx {n_paragraphs} odstavců, {os.cpu_count()} CPU")
+
+        # Kontrola, že všechny režimy načtou totéž
+        with contextlib.redirect_stdout(io.StringIO()):
+            reference = _load_sequential(sav_path, docx_path)
+            for loader in (_load_thread, _load_process):
+                gen = loader(sav_path, docx_path)
+                assert gen.questionnaire_data == reference.questionnaire_data
+                assert gen.columns == reference.columns
+
+        results = [
+            ('postupně', _time(_load_sequential, sav_path, docx_path, args.repeat)),
+            ('vlákno', _time(_load_thread, sav_path, docx_path, args.repeat)),
+            ('proces (nový pool)', _time(_load_process, sav_path, docx_path, args.repeat)),
+        ]
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+            pool.submit(int).result()
+            results.append(('proces (nahřátý)', _time(_load_process, sav_path, docx_path, args.repeat, pool)))
+
+    baseline = results[0][1]
+    print(f"{'režim':<22}{'medián [s]':>12}{'vs. postupně':>14}")
+    for name, seconds in results:
+        print(f"{name:<22}{seconds:>12.3f}{baseline / max(seconds, 1e-9):>13.2f}×")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark: proudový OOXML parser vs. python-docx v parse_questionnaire_from_docx
+
+Nejdřív ověří shodu obou backendů na měřených syntetických dotaznících,
+potom měří čas a špičkovou RSS. Shodu na korpusu okrajových případů
+(hypertextové odkazy, tabulky, sledované změny...) hlídá tests/test_docx_backends.py.
+
+    python -m benchmarks.bench_docx_backends --sizes 10000 50000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+import docx
+
+from backend_app import iter_paragraph_texts, parse_questionnaire_from_docx
+from benchmarks.harness import measure_in_subprocess
+from benchmarks.synthetic import (
+    questionnaire_paragraphs, synthetic_questionnaire, write_synthetic_docx,
+)
+from docx_stream import iter_docx_paragraph_texts
+
+BACKENDS = ('stream', 'python-docx')
+
+
+def check_parity(path: str) -> bool:
+    """Shodné texty odstavců i výsledek parsování pro oba backendy."""
+    texts_docx = list(iter_paragraph_texts(docx.Document(path)))
+    texts_stream = list(iter_docx_paragraph_texts(path))
+    if texts_docx != texts_stream:
+        for i, (a, b) in enumerate(zip(texts_docx, texts_stream)):
+            if a != b:
+                print(f"   ✗ odstavec {i}: python-docx={a!r} stream={b!r}")
+                break
+        else:
+            print(f"   ✗ počet odstavců: python-docx={len(texts_docx)} stream={len(texts_stream)}")
+        return False
+    return parse_questionnaire_from_docx(path, backend='stream') == \
+        parse_questionnaire_from_docx(path, backend='python-docx')
+
+
+def _measure(path: str, backend: str) -> dict:
+    code = (
+        "import sys, time\n"
+        "t0 = time.perf_counter()\n"
+        "from backend_app import parse_questionnaire_from_docx\n"
+        "t_import = time.perf_counter()\n"
+        "parse_questionnaire_from_docx(sys.argv[1], backend=sys.argv[2])\n"
+        "elapsed = time.perf_counter() - t_import\n"
+    )
+    return measure_in_subprocess(code, path, backend)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 50000])
+    args = parser.parse_args()
+
+    block_size = len(questionnaire_paragraphs(synthetic_questionnaire(1))) - 1
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        print("Shoda backendů:")
+        corpus = []
+        for size in args.sizes:
+            path = os.path.join(tmpdir, f'q_{size}.docx')
+            write_synthetic_docx(path, synthetic_questionnaire(max(1, size // block_size)))
+            corpus.append(path)
+
+        ok = True
+        for path in corpus:
+            same = check_parity(path)
+            ok = ok and same
+            print(f"   {'✓' if same else '✗'} {os.path.basename(path)}")
+        if not ok:
+            sys.exit(1)
+
+        print(f"\n{'odstavců':>10}{'backend':>14}{'čas [s]':>10}{'peak RSS [MB]':>16}")
+        for size, path in zip(args.sizes, corpus):
+            for backend in BACKENDS:
+                result = _measure(path, backend)
+                print(f"{size:>10}{backend:>14}{result['seconds']:>10.3f}{result['peak_rss_mb']:>16.1f}")
+
+
+if __name__ == '__main__':
+    main()
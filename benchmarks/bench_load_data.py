@@ -0,0 +1,56 @@
+"""
+Benchmark: plné načtení .sav vs. načtení jen metadat (SPSSSyntaxGenerator.load_data)
+
+Každá varianta běží v samostatném procesu, aby šla změřit špičková RSS.
+
+    python -m benchmarks.bench_load_data --rows 50000 --questions 200
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.harness import measure_in_subprocess
+from benchmarks.synthetic import write_synthetic_sav
+
+
+def _measure(sav_path: str, metadata_only: bool) -> dict:
+    """Spustí load_data v podprocesu a vrátí čas a špičkovou RSS."""
+    code = (
+        "import sys, time\n"
+        "from backend_app import SPSSSyntaxGenerator\n"
+        "gen = SPSSSyntaxGenerator(sys.argv[1], None, metadata_only=sys.argv[2] == '1')\n"
+        "t0 = time.perf_counter()\n"
+        "gen.load_data()\n"
+        "elapsed = time.perf_counter() - t0\n"
+    )
+    return measure_in_subprocess(code, sav_path, '1' if metadata_only else '0')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--questions', type=int, default=200)
+    parser.add_argument('--items', type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        sav_path = os.path.join(tmpdir, 'wide.sav')
+        t0 = time.perf_counter()
+        write_synthetic_sav(sav_path, args.rows, args.questions, args.items)
+        size_mb = os.path.getsize(sav_path) / 1024 / 1024
+        print(f"Syntetický .sav: {args.rows} řádků, {args.questions * (args.items + 1) + 1} proměnných, "
+              f"{size_mb:.1f} MB (vytvořeno za {time.perf_counter() - t0:.1f} s)")
+
+        full = _measure(sav_path, metadata_only=False)
+        meta = _measure(sav_path, metadata_only=True)
+
+    print(f"{'režim':<16}{'čas [s]':>12}{'peak RSS [MB]':>16}")
+    print(f"{'plná data':<16}{full['seconds']:>12.3f}{full['peak_rss_mb']:>16.1f}")
+    print(f"{'jen metadata':<16}{meta['seconds']:>12.3f}{meta['peak_rss_mb']:>16.1f}")
+    print(f"zrychlení: {full['seconds'] / max(meta['seconds'], 1e-9):.1f}×")
+
+
+if __name__ == '__main__':
+    main()
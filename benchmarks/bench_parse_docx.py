@@ -0,0 +1,64 @@
+"""
+Benchmark: škálování parse_questionnaire_from_docx s délkou dokumentu
+
+Měří parsování pro 1k, 10k a 50k odstavců a čas na odstavec – při lineárním
+chování zůstává přibližně konstantní. Pro srovnání měří i původní průchod
+přes doc.paragraphs[i] (kvadratický, proto jen do --legacy-max odstavců).
+
+    python -m benchmarks.bench_parse_docx --sizes 1000 10000 50000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import docx
+
+from backend_app import parse_questionnaire_from_docx
+from benchmarks.synthetic import questionnaire_paragraphs, synthetic_questionnaire, write_synthetic_docx
+
+
+def _legacy_scan(docx_path: str) -> int:
+    """Původní smyčka: doc.paragraphs se sestavuje znovu při každé iteraci."""
+    doc = docx.Document(docx_path)
+    count = 0
+    i = 0
+    while i < len(doc.paragraphs):
+        if doc.paragraphs[i].text.strip():
+            count += 1
+        i += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--legacy-max', type=int, default=2000,
+                        help='největší dokument, na kterém se měří původní průchod')
+    args = parser.parse_args()
+
+    block_size = len(questionnaire_paragraphs(synthetic_questionnaire(1))) - 1
+    print(f"{'odstavců':>10}{'otázek':>10}{'parse [s]':>12}{'µs/odstavec':>14}{'původní [s]':>14}")
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for size in args.sizes:
+            path = os.path.join(tmpdir, f'q_{size}.docx')
+            n_paragraphs = write_synthetic_docx(path, synthetic_questionnaire(max(1, size // block_size)))
+
+            t0 = time.perf_counter()
+            result = parse_questionnaire_from_docx(path)
+            elapsed = time.perf_counter() - t0
+
+            legacy = '-'
+            if n_paragraphs <= args.legacy_max:
+                t0 = time.perf_counter()
+                _legacy_scan(path)
+                legacy = f'{time.perf_counter() - t0:.3f}'
+
+            print(f"{n_paragraphs:>10}{len(result['all_questions']):>10}{elapsed:>12.3f}"
+                  f"{elapsed / n_paragraphs * 1e6:>14.1f}{legacy:>14}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+Benchmark: klasifikace odstavců - původní smyčky přes klíčová slova vs. QuestionRules
+
+Původní parsování (any(keyword in text ...) pro metadata, seznam typů,
+any(word in item.lower() ...) pro stupnice baterií) je zde zopakované nad
+stejnými texty odstavců. Obě varianty čtou texty z paměti, měří se tedy jen
+klasifikace a sestavení otázek, ne čtení .docx. Před měřením se ověří shodný
+výsledek na syntetických dotaznících i na náhodně poskládaných odstavcích.
+
+    python -m benchmarks.bench_question_rules --sizes 10000 100000 500000
+"""
+
+import argparse
+import random
+import re
+import statistics
+import time
+from typing import Dict, List
+
+from backend_app import parse_questions, split_battery_scales
+from benchmarks.synthetic import QUESTION_METADATA, SCALE, questionnaire_paragraphs, synthetic_questionnaire
+from question_rules import load_rules
+
+LEGACY_TYPES = [
+    'BATERIE OTÁZEK - JEDNA MOŽNÁ ODPOVĚĎ', 'VÍCE MOŽNÝCH ODPOVĚDÍ', 'FILTRACE ODPOVĚDÍ',
+    'FILTRACE ODPOVĚDÍ BATERIE - JEDNA MOŽNÁ ODPOVĚĎ', 'FILTRACE ODPOVĚDÍ BATERIE MULTIPLE',
+]
+LEGACY_METADATA = [
+    'Nastavení otázky', 'Povinná', 'Zvolených minimálně',
+    'Pravidla', 'IF (', 'THEN', 'Min.', 'Max.',
+    'Délka textu', 'Minimální hodnota', 'Jdi na', 'Pokud uživatel',
+]
+LEGACY_SCALE_WORDS = ['ano', 'ne', 'rozhodně', 'celkem', 'spíše', 'vůbec', 'moc']
+
+
+def legacy_parse(texts: List[str]) -> List[Dict]:
+    """Parsování a rozdělení baterií tak, jak bylo před zavedením QuestionRules."""
+    questions = []
+    current_q = None
+    collecting_items = False
+    for text in texts:
+        if re.match(r'^[A-Z0-9][A-Za-z0-9_]*\.', text) and ('?' in text or ':' in text):
+            if current_q:
+                questions.append(current_q)
+            current_q = {'code': text.split('.')[0].strip(), 'text': text, 'type': None, 'items': [], 'scales': []}
+            collecting_items = True
+        elif 'Vyberte typ otázky::' in text:
+            if current_q:
+                qtype = text.replace('Vyberte typ otázky::', '').strip()
+                if current_q['type'] is None or qtype in LEGACY_TYPES:
+                    current_q['type'] = qtype
+                collecting_items = False
+        elif any(keyword in text for keyword in LEGACY_METADATA):
+            collecting_items = False
+        elif current_q and collecting_items and text and not text.startswith('<img') and not text.startswith('#'):
+            current_q['items'].append(text)
+    if current_q:
+        questions.append(current_q)
+
+    for q in questions:
+        if q['type'] == 'BATERIE OTÁZEK - JEDNA MOŽNÁ ODPOVĚĎ':
+            scales = [item for item in q['items']
+                      if len(item) < 30 and any(word in item.lower() for word in LEGACY_SCALE_WORDS)]
+            if 2 <= len(scales) <= 6:
+                q['items'] = [item for item in q['items'] if item not in scales]
+                q['scales'] = scales
+    return questions
+
+
+def rules_parse(texts: List[str]) -> List[Dict]:
+    rules = load_rules()
+    questions = parse_questions(texts, rules)
+    for q in questions:
+        if rules.category(q['type']) == 'batteries':
+            split_battery_scales(q, rules)
+    return questions
+
+
+def random_paragraphs(n: int, seed: int = 0) -> List[str]:
+    """Náhodně poskládané odstavce z fragmentů, které spouštějí různá pravidla najednou."""
+    rng = random.Random(seed)
+    fragments = (
+        ['A1.', 'Q_2.', 'x3.', '?', ':', 'Vyberte typ otázky::', '\n', ' ', '<img', '#', 'Text', 'Ano', 'NE']
+        + LEGACY_TYPES + LEGACY_METADATA + SCALE + QUESTION_METADATA + LEGACY_SCALE_WORDS
+    )
+    texts = []
+    for _ in range(n):
+        text = ''.join(rng.choice(fragments) for _ in range(rng.randint(1, 5))).strip()
+        if text:
+            texts.append(text)
+    return texts
+
+
+def _time(parse, texts: List[str], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        parse(texts)
+        timings.append(time.perf_counter() - t0)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 500000], help='počty odstavců')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    fuzz = random_paragraphs(50000)
+    assert legacy_parse(fuzz) == rules_parse(fuzz), 'náhodné odstavce: výsledky se liší'
+    print(f"✓ Shoda na {len(fuzz)} náhodných odstavcích")
+
+    block_size = len(questionnaire_paragraphs(synthetic_questionnaire(1)))
+    print(f"{'odstavců':>10}{'smyčky [s]':>14}{'pravidla [s]':>14}{'zrychlení':>12}")
+    for size in args.sizes:
+        texts = questionnaire_paragraphs(synthetic_questionnaire(max(1, size // block_size)))
+        texts = [t.strip() for t in texts if t.strip()]
+        assert legacy_parse(texts) == rules_parse(texts), f'{size}: výsledky se liší'
+        legacy = _time(legacy_parse, texts, args.repeat)
+        rules = _time(rules_parse, texts, args.repeat)
+        print(f"{len(texts):>10}{legacy:>14.3f}{rules:>14.3f}{legacy / max(rules, 1e-9):>11.2f}×")
+
+
+if __name__ == '__main__':
+    main()
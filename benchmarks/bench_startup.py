@@ -0,0 +1,235 @@
+"""
+Benchmark: start aplikace - import backend_app a čas do první odpovědi
+
+Import se měří v novém interpretu; profil z -X importtime ukáže nejdražší
+moduly importované backend_app a ověří, že se při importu nenačetla žádná
+knihovna z PARSING_STACK (pyreadstat, pandas, python-docx, lxml).
+
+Pak se spustí gunicorn s gunicorn.conf.py s preloadem i bez něj a měří se
+čas od spuštění do první odpovědi /api/health a do první vygenerované syntaxe
+(malý syntetický .sav a dotazník). U zdravotní kontroly se zapíše i PSS
+master procesu a workerů (sdílené stránky se počítají poměrně).
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --save-baseline
+    python -m benchmarks.bench_startup --compare       # při regresi exit 1
+"""
+
+import argparse
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+import uuid
+from typing import Dict, List
+
+from backend_app import PARSING_STACK
+from benchmarks.harness import ROOT, measure_in_subprocess
+from benchmarks.suite import compare
+from benchmarks.synthetic import synthetic_questionnaire, write_matching_sav, write_synthetic_docx
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'startup_baseline.json')
+
+_IMPORT = (
+    "import time\n"
+    "t0 = time.perf_counter()\n"
+    "import backend_app\n"
+    "elapsed = time.perf_counter() - t0\n"
+)
+
+
+def import_profile(top: int = 10) -> Dict:
+    """
+    Nejdražší přímé importy backend_app podle -X importtime (kumulativně, v sekundách)
+    a moduly z PARSING_STACK, které se při importu načetly.
+    """
+    out = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import backend_app'],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    heavy_roots = {module.split('.')[0] for module in PARSING_STACK}
+    direct, heavy, collected = [], set(), []
+    for line in out.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line.split('|')
+        if not cumulative.strip().isdigit():
+            continue  # hlavička
+        module = name.strip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if module.split('.')[0] in heavy_roots:
+            heavy.add(module.split('.')[0])
+        if depth == 1:
+            collected.append((module, int(cumulative) / 1e6))
+        elif depth == 0:
+            if module == 'backend_app':
+                direct = collected
+            collected = []
+    direct.sort(key=lambda item: item[1], reverse=True)
+    return {'imports': direct[:top], 'heavy_loaded': sorted(heavy)}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _multipart(files: Dict[str, str]):
+    """Tělo multipart/form-data požadavku se soubory {pole: cesta}."""
+    boundary = uuid.uuid4().hex
+    body = b''
+    for field, path in files.items():
+        with open(path, 'rb') as f:
+            content = f.read()
+        body += (f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; '
+                 f'filename="{os.path.basename(path)}"\r\n'
+                 'Content-Type: application/octet-stream\r\n\r\n').encode() + content + b'\r\n'
+    return body + f'--{boundary}--\r\n'.encode(), f'multipart/form-data; boundary={boundary}'
+
+
+def _process_tree_pss_mb(pid: int) -> float:
+    """PSS procesu a jeho přímých potomků (gunicorn master + workery)."""
+    pids = [pid]
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            pids += [int(child) for child in f.read().split()]
+    except OSError:
+        pass
+    total_kb = 0
+    for p in pids:
+        try:
+            with open(f'/proc/{p}/smaps_rollup') as f:
+                total_kb += next(int(line.split()[1]) for line in f if line.startswith('Pss:'))
+        except (OSError, StopIteration):
+            continue
+    return total_kb / 1024
+
+
+def measure_server(preload: bool, workers: int, sav_path: str, docx_path: str, timeout: float = 60) -> Dict:
+    """Spustí gunicorn a změří čas do první odpovědi /api/health a do první syntaxe."""
+    port = _free_port()
+    base_url = f'http://127.0.0.1:{port}'
+    env = dict(os.environ, PORT=str(port), WEB_CONCURRENCY=str(workers),
+               SPSS_PRELOAD='1' if preload else '0', SPSS_CACHE='0')
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'backend_app:app', '-c', 'gunicorn.conf.py'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while True:
+            if proc.poll() is not None:
+                raise RuntimeError(f'gunicorn skončil s kódem {proc.returncode}')
+            if time.perf_counter() - t0 > timeout:
+                raise RuntimeError('gunicorn neodpověděl včas')
+            try:
+                with urllib.request.urlopen(f'{base_url}/api/health', timeout=1) as response:
+                    if response.status == 200:
+                        break
+            except OSError:
+                time.sleep(0.01)
+        health = time.perf_counter() - t0
+        pss = _process_tree_pss_mb(proc.pid)
+
+        body, content_type = _multipart({'sav_file': sav_path, 'docx_file': docx_path})
+        request = urllib.request.Request(f'{base_url}/api/generate', data=body,
+                                         headers={'Content-Type': content_type})
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+        first_generate = time.perf_counter() - t0
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+    return {'health': health, 'health_pss_mb': pss, 'first_generate': first_generate}
+
+
+def measure_startup(repeat: int, workers: int) -> Dict[str, Dict[str, float]]:
+    imports = [measure_in_subprocess(_IMPORT) for _ in range(repeat)]
+    stages = {'import_backend_app': {
+        'seconds': statistics.median(run['seconds'] for run in imports),
+        'peak_rss_mb': max(run['peak_rss_mb'] for run in imports),
+    }}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        questions = synthetic_questionnaire(5)
+        sav_path = os.path.join(tmpdir, 'data.sav')
+        docx_path = os.path.join(tmpdir, 'q.docx')
+        write_matching_sav(sav_path, questions, n_rows=100)
+        write_synthetic_docx(docx_path, questions)
+        for mode, preload in (('preload', True), ('lazy', False)):
+            runs = [measure_server(preload, workers, sav_path, docx_path) for _ in range(repeat)]
+            stages[f'health_{mode}'] = {
+                'seconds': statistics.median(run['health'] for run in runs),
+                'pss_mb': max(run['health_pss_mb'] for run in runs),
+            }
+            stages[f'first_generate_{mode}'] = {
+                'seconds': statistics.median(run['first_generate'] for run in runs),
+            }
+    return stages
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='soubor s baseline (JSON)')
+    parser.add_argument('--save-baseline', action='store_true', help='uložit výsledky jako novou baseline')
+    parser.add_argument('--compare', action='store_true', help='porovnat s baseline a hlásit regrese')
+    parser.add_argument('--threshold', type=float, default=0.2, help='povolené zhoršení (0.2 = 20 %%)')
+    args = parser.parse_args(argv)
+
+    profile = import_profile()
+    print('Nejdražší importy backend_app (kumulativně):')
+    for module, seconds in profile['imports']:
+        print(f"   {module:<32}{seconds * 1000:>8.1f} ms")
+    if profile['heavy_loaded']:
+        print(f"❌ Import backend_app načítá knihovny parsování: {', '.join(profile['heavy_loaded'])}")
+        return 1
+    print('✓ Import backend_app nenačítá knihovny parsování')
+
+    results = {
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'repeat': args.repeat,
+        'cases': {'startup': {'params': {'workers': args.workers}, 'stages': measure_startup(args.repeat, args.workers)}},
+    }
+
+    print(f"\n   {'fáze':<28}{'čas [s]':>10}{'paměť [MB]':>14}")
+    for stage, current in results['cases']['startup']['stages'].items():
+        memory = current.get('peak_rss_mb', current.get('pss_mb'))
+        print(f"   {stage:<28}{current['seconds']:>10.3f}{'' if memory is None else f'{memory:.1f}':>14}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Výsledky uloženy do {args.baseline}")
+
+    if args.compare:
+        try:
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        except OSError:
+            print(f"❌ Baseline {args.baseline} neexistuje (vytvoř ji přes --save-baseline)")
+            return 2
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ Regrese nad {args.threshold * 100:.0f} %:")
+            for line in regressions:
+                print(f"   {line}")
+            return 1
+        print(f"\n✅ Bez regresí nad {args.threshold * 100:.0f} % proti {args.baseline}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""
+Společné měření pro benchmarky - čas a špičková RSS v samostatném procesu
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Kód připojený za měřený úsek - vypíše výsledek jako poslední řádek JSON.
+# VmHWM se na rozdíl od ru_maxrss po exec nedědí z rodičovského procesu.
+_REPORT = (
+    "import json as _json, resource as _resource\n"
+    "try:\n"
+    "    _rss_kb = next(int(l.split()[1]) for l in open('/proc/self/status') if l.startswith('VmHWM'))\n"
+    "except OSError:\n"
+    "    _rss_kb = _resource.getrusage(_resource.RUSAGE_SELF).ru_maxrss\n"
+    "print(_json.dumps({'seconds': elapsed, 'peak_rss_mb': _rss_kb / 1024}))\n"
+)
+
+
+def run_in_subprocess(code: str, *args: str):
+    """
+    Spustí code v novém interpretu (s kořenem repozitáře jako cwd, argumenty v sys.argv[1:])
+    a vrátí poslední řádek jeho výstupu načtený jako JSON.
+    """
+    out = subprocess.run(
+        [sys.executable, '-c', code, *args],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def measure_in_subprocess(code: str, *args: str) -> dict:
+    """
+    Jako run_in_subprocess, kód ale musí nastavit proměnnou elapsed;
+    vrací {'seconds', 'peak_rss_mb'}.
+    """
+    return run_in_subprocess(code + '\n' + _REPORT, *args)
+
+
+def reset_peak_rss() -> bool:
+    """Vynuluje VmHWM aktuálního procesu (Linux); False, pokud to systém neumí."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb() -> float:
+    """Špičková RSS aktuálního procesu od startu nebo od posledního reset_peak_rss."""
+    try:
+        with open('/proc/self/status') as f:
+            rss_kb = next(int(line.split()[1]) for line in f if line.startswith('VmHWM'))
+    except OSError:
+        import resource
+        rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss_kb / 1024
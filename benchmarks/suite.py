@@ -0,0 +1,193 @@
+"""
+Sada benchmarků celé pipeline s uloženou baseline a hlídáním regresí
+
+Pro každý případ vygeneruje syntetický dotazník se všemi typy otázek
+(baterie, multiple response, tři varianty FILTRACE) a odpovídající .sav
+a v samostatném procesu změří čas a špičkovou RSS každé fáze: načtení .sav,
+parsování dotazníku, jednotlivé sekce generování a zápis .sps.
+
+    python -m benchmarks.suite                        # změří a vypíše
+    python -m benchmarks.suite --save-baseline        # uloží benchmarks/baseline.json
+    python -m benchmarks.suite --compare              # porovná s baseline, při regresi exit 1
+    python -m benchmarks.suite --cases small --repeat 10 --threshold 0.1 --compare
+
+Baseline je svázaná se strojem, na kterém vznikla - porovnávat má smysl jen
+výsledky ze stejného prostředí.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+os.environ['SPSS_CACHE'] = '0'
+
+from backend_app import GENERATE_SECTIONS, SPSSSyntaxGenerator
+from benchmarks.harness import peak_rss_mb, reset_peak_rss, run_in_subprocess
+from benchmarks.synthetic import synthetic_questionnaire, write_matching_sav, write_synthetic_docx
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# blocks: bloků otázek v dotazníku (6 otázek na blok), items: položek MR otázky/baterie,
+# rows: respondentů v .sav, extra_columns: proměnných .sav mimo dotazník.
+# Generátor čte z .sav jen hlavičku, takže o čase rozhoduje hlavně počet proměnných;
+# počty řádků jsou malé, aby se .sav dal vytvořit v paměti.
+CASES = {
+    'small': {'blocks': 50, 'items': 5, 'rows': 1000, 'extra_columns': 0},
+    'medium': {'blocks': 200, 'items': 6, 'rows': 2000, 'extra_columns': 1000},
+    'large': {'blocks': 1000, 'items': 6, 'rows': 200, 'extra_columns': 5000},
+}
+
+STAGES = ('load_data', 'parse_questionnaire') + GENERATE_SECTIONS + ('write_syntax',)
+
+# Rozdíly pod touto hranicí jsou šum, ne regrese
+MIN_DELTA_SECONDS = 0.005
+MIN_DELTA_MB = 2.0
+
+
+def measure_stages(sav_path: str, docx_path: str, repeat: int) -> Dict[str, Dict[str, float]]:
+    """
+    Projde pipeline repeat-krát a vrátí pro každou fázi medián času
+    a nejvyšší špičkovou RSS naměřenou během fáze.
+    """
+    timings = {stage: [] for stage in STAGES}
+    peaks = {stage: 0.0 for stage in STAGES}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        output_path = os.path.join(tmpdir, 'syntax.sps')
+        for _ in range(repeat):
+            gen = SPSSSyntaxGenerator(sav_path, docx_path)
+            steps = {
+                'load_data': gen.load_data,
+                'parse_questionnaire': gen.load_questionnaire,
+                'write_syntax': lambda: gen.save_syntax(output_path),
+            }
+            for section in GENERATE_SECTIONS:
+                steps[section] = lambda section=section: list(getattr(gen, f'_{section}')())
+            for stage in STAGES:
+                reset_peak_rss()
+                t0 = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    steps[stage]()
+                timings[stage].append(time.perf_counter() - t0)
+                peaks[stage] = max(peaks[stage], peak_rss_mb())
+    return {
+        stage: {'seconds': statistics.median(timings[stage]), 'peak_rss_mb': peaks[stage]}
+        for stage in STAGES
+    }
+
+
+_WORKER = (
+    "import json, sys\n"
+    "from benchmarks.suite import measure_stages\n"
+    "print(json.dumps(measure_stages(sys.argv[1], sys.argv[2], int(sys.argv[3]))))\n"
+)
+
+
+def run_case(name: str, params: Dict, repeat: int, tmpdir: str) -> Dict:
+    """Vygeneruje vstupy případu a změří je v novém procesu."""
+    questions = synthetic_questionnaire(params['blocks'], params['items'])
+    docx_path = os.path.join(tmpdir, f'{name}.docx')
+    sav_path = os.path.join(tmpdir, f'{name}.sav')
+    n_paragraphs = write_synthetic_docx(docx_path, questions)
+    n_columns = write_matching_sav(sav_path, questions, params['rows'], params['extra_columns'])
+    print(f"▶ {name}: {len(questions)} otázek ({n_paragraphs} odstavců), "
+          f"{params['rows']} respondentů × {n_columns} proměnných")
+    return {
+        'params': params,
+        'stages': run_in_subprocess(_WORKER, sav_path, docx_path, str(repeat)),
+    }
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Fáze, které jsou proti baseline pomalejší nebo paměťově náročnější o víc než threshold."""
+    regressions = []
+    for case, result in results['cases'].items():
+        base_case = baseline['cases'].get(case)
+        if base_case is None or base_case['params'] != result['params']:
+            continue
+        for stage, current in result['stages'].items():
+            base = base_case['stages'].get(stage)
+            if base is None:
+                continue
+            for key, unit, min_delta in (('seconds', 's', MIN_DELTA_SECONDS), ('peak_rss_mb', 'MB', MIN_DELTA_MB)):
+                if key not in current or key not in base:
+                    continue
+                if current[key] > base[key] * (1 + threshold) and current[key] - base[key] > min_delta:
+                    regressions.append(f"{case}/{stage}: {key} {base[key]:.3f} -> {current[key]:.3f} {unit} "
+                                       f"(+{(current[key] / max(base[key], 1e-9) - 1) * 100:.0f} %)")
+    return regressions
+
+
+def print_table(results: Dict, baseline: Dict = None):
+    for case, result in results['cases'].items():
+        base_case = (baseline or {}).get('cases', {}).get(case)
+        print(f"\n{case}")
+        print(f"   {'fáze':<40}{'čas [s]':>10}{'peak RSS [MB]':>16}{'vs. baseline':>14}")
+        for stage, current in result['stages'].items():
+            ratio = ''
+            if base_case and stage in base_case['stages']:
+                ratio = f"{current['seconds'] / max(base_case['stages'][stage]['seconds'], 1e-9):.2f}×"
+            print(f"   {stage:<40}{current['seconds']:>10.4f}{current['peak_rss_mb']:>16.1f}{ratio:>14}")
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cases', nargs='+', choices=sorted(CASES), default=list(CASES))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='soubor s baseline (JSON)')
+    parser.add_argument('--save-baseline', action='store_true', help='uložit výsledky jako novou baseline')
+    parser.add_argument('--compare', action='store_true', help='porovnat s baseline a hlásit regrese')
+    parser.add_argument('--threshold', type=float, default=0.2, help='povolené zhoršení (0.2 = 20 %%)')
+    parser.add_argument('--output', help='uložit výsledky i do tohoto souboru')
+    args = parser.parse_args(argv)
+
+    results = {
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'repeat': args.repeat,
+        'cases': {},
+    }
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for name in args.cases:
+            results['cases'][name] = run_case(name, CASES[name], args.repeat, tmpdir)
+
+    baseline = None
+    if args.compare:
+        try:
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        except OSError:
+            print(f"❌ Baseline {args.baseline} neexistuje (vytvoř ji přes --save-baseline)")
+            return 2
+
+    print_table(results, baseline)
+
+    for path in filter(None, (args.output, args.baseline if args.save_baseline else None)):
+        with open(path, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Výsledky uloženy do {path}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ Regrese nad {args.threshold * 100:.0f} %:")
+            for line in regressions:
+                print(f"   {line}")
+            return 1
+        print(f"\n✅ Bez regresí nad {args.threshold * 100:.0f} % proti {args.baseline}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,236 @@
+"""
+Syntetická testovací data pro benchmarky
+Generuje .sav soubory s nastavitelným počtem respondentů a proměnných
+a .docx dotazníky se všemi typy otázek, které parser rozpoznává
+"""
+
+from typing import Dict, List
+
+import docx
+from docx.oxml import OxmlElement, parse_xml
+from docx.oxml.ns import nsdecls
+import numpy as np
+import pandas as pd
+import pyreadstat
+
+SCALE = ['Rozhodně ano', 'Spíše ano', 'Spíše ne', 'Rozhodně ne']
+QUESTION_METADATA = ['Nastavení otázky', 'Povinná']
+
+
+def write_synthetic_sav(path: str, n_rows: int = 10000, n_questions: int = 100,
+                        items_per_question: int = 10, seed: int = 0) -> str:
+    """
+    Zapíše .sav ve tvaru exportu z dotazníkového nástroje:
+    resstatus + pro každou otázku Q{n}__{i} (0/1 s labely Ne/Ano) a stringové Q{n}__jina.
+    """
+    rng = np.random.default_rng(seed)
+    columns = {'resstatus': rng.integers(1, 3, n_rows).astype('float64')}
+    column_labels = ['Stav respondenta']
+    value_labels = {'resstatus': {1.0: 'Nedokončeno', 2.0: 'Dokončeno'}}
+
+    for q in range(1, n_questions + 1):
+        for i in range(1, items_per_question + 1):
+            name = f'Q{q}__{i}'
+            columns[name] = rng.integers(1, 3, n_rows).astype('float64')
+            column_labels.append(f'Otázka {q} | Položka {i}')
+            value_labels[name] = {1.0: 'Ne', 2.0: 'Ano'}
+        columns[f'Q{q}__jina'] = np.full(n_rows, 'jiná odpověď', dtype=object)
+        column_labels.append(f'Otázka {q} | Jiná')
+
+    df = pd.DataFrame(columns)
+    pyreadstat.write_sav(df, path, column_labels=column_labels,
+                         variable_value_labels=value_labels)
+    return path
+
+
+def synthetic_questionnaire(n_blocks: int, n_items: int = 5) -> List[Dict]:
+    """
+    Sestaví specifikaci dotazníku. Každý blok obsahuje po jedné otázce typu
+    VÍCE MOŽNÝCH ODPOVĚDÍ, BATERIE, tři varianty FILTRACE (filtrované z MR otázky
+    téhož bloku) a jednu otázku s jednou odpovědí, kterou generátor ignoruje.
+    """
+    questions = []
+    for b in range(1, n_blocks + 1):
+        mr_code = f'M{b}'
+        questions.append({
+            'code': mr_code, 'type': 'VÍCE MOŽNÝCH ODPOVĚDÍ', 'parent': None,
+            'text': f'{mr_code}. Které značky z kategorie {b} znáte?',
+            'items': [f'Značka {b}-{i}' for i in range(1, n_items + 1)], 'scales': [],
+        })
+        questions.append({
+            'code': f'B{b}', 'type': 'BATERIE OTÁZEK - JEDNA MOŽNÁ ODPOVĚĎ', 'parent': None,
+            'text': f'B{b}. Do jaké míry souhlasíte s následujícími výroky?',
+            'items': [f'Výrok číslo {i} o produktech z kategorie {b}' for i in range(1, n_items + 1)],
+            'scales': list(SCALE),
+        })
+        questions.append({
+            'code': f'F{b}', 'type': 'FILTRACE ODPOVĚDÍ', 'parent': mr_code,
+            'text': f'F{b}. Které z těchto značek kupujete?',
+            'items': ['Žádnou z nich'], 'scales': [],
+        })
+        questions.append({
+            'code': f'FB{b}', 'type': 'FILTRACE ODPOVĚDÍ BATERIE - JEDNA MOŽNÁ ODPOVĚĎ', 'parent': mr_code,
+            'text': f'FB{b}. Jak jste se značkou spokojen/a?',
+            'items': ['Spokojenost'], 'scales': [],
+        })
+        questions.append({
+            'code': f'FM{b}', 'type': 'FILTRACE ODPOVĚDÍ BATERIE MULTIPLE', 'parent': mr_code,
+            'text': f'FM{b}. Co na značce oceňujete?',
+            'items': ['Cena', 'Kvalita', 'Dostupnost'], 'scales': [],
+        })
+        questions.append({
+            'code': f'S{b}', 'type': 'JEDNA MOŽNÁ ODPOVĚĎ', 'parent': None,
+            'text': f'S{b}. Kolikrát měsíčně nakupujete?',
+            'items': [], 'scales': [],
+        })
+    return questions
+
+
+def questionnaire_paragraphs(questions: List[Dict]) -> List[str]:
+    """Texty odstavců tak, jak je exportuje dotazníkový nástroj."""
+    paragraphs = ['Dotazník – syntetická data']
+    for q in questions:
+        paragraphs.append(q['text'])
+        paragraphs.extend(q['items'])
+        paragraphs.extend(q['scales'])
+        paragraphs.append(f"Vyberte typ otázky:: {q['type']}")
+        paragraphs.extend(QUESTION_METADATA)
+        if not q['items']:
+            paragraphs.extend(['Min. 0', 'Max. 99'])
+        paragraphs.append('')
+    return paragraphs
+
+
+def write_synthetic_docx(path: str, questions: List[Dict]) -> int:
+    """
+    Zapíše dotazník do .docx a vrátí počet odstavců.
+    Odstavce se vkládají přímo do XML (add_paragraph hledá sectPr pro každý odstavec znovu).
+    """
+    doc = docx.Document()
+    sect_pr = doc.element.body[-1]
+    paragraphs = questionnaire_paragraphs(questions)
+    for text in paragraphs:
+        p = OxmlElement('w:p')
+        if text:
+            r = OxmlElement('w:r')
+            t = OxmlElement('w:t')
+            t.text = text
+            r.append(t)
+            p.append(r)
+        sect_pr.addprevious(p)
+    doc.save(path)
+    return len(paragraphs)
+
+
+def matching_columns(questions: List[Dict]) -> Dict[str, str]:
+    """
+    Proměnné .sav, které odpovídají dotazníku z synthetic_questionnaire,
+    pojmenované jako v exportu nástroje: název -> 'mr' (0/1 Ne/Ano),
+    'string' (jiná odpověď) nebo 'scale' (1-4).
+    """
+    by_code = {q['code']: q for q in questions}
+    columns = {}
+    for q in questions:
+        code, qtype = q['code'], q['type']
+        parent = by_code.get(q['parent'])
+        if qtype == 'VÍCE MOŽNÝCH ODPOVĚDÍ':
+            for i in range(1, len(q['items']) + 1):
+                columns[f'Q{code}__{i}'] = 'mr'
+            columns[f'Q{code}__jina'] = 'string'
+        elif qtype.startswith('BATERIE'):
+            for i in range(1, len(q['items']) + 1):
+                columns[f'Q{code}__{i}'] = 'scale'
+        elif qtype == 'FILTRACE ODPOVĚDÍ':
+            for i in range(1, len(parent['items']) + 1):
+                columns[f'Q{code}__{parent["code"]}_{i}'] = 'mr'
+            columns[f'Q{code}__1'] = 'mr'
+        elif qtype == 'FILTRACE ODPOVĚDÍ BATERIE - JEDNA MOŽNÁ ODPOVĚĎ':
+            for i in range(1, len(parent['items']) + 1):
+                columns[f'Q{code}__{parent["code"]}_{i}'] = 'scale'
+        elif qtype == 'FILTRACE ODPOVĚDÍ BATERIE MULTIPLE':
+            for i in range(1, len(parent['items']) + 1):
+                for k in range(1, len(q['items']) + 1):
+                    columns[f'Q{code}__{parent["code"].upper()}_{i}column{k}'] = 'mr'
+        else:
+            columns[f'Q{code}'] = 'scale'
+    return columns
+
+
+def write_matching_sav(path: str, questions: List[Dict], n_rows: int = 1000,
+                       extra_columns: int = 0, seed: int = 0) -> int:
+    """
+    Zapíše .sav s proměnnými pro otázky dotazníku (viz matching_columns)
+    a extra_columns dalšími numerickými proměnnými, které žádné otázce
+    neodpovídají. Vrací počet proměnných.
+    """
+    rng = np.random.default_rng(seed)
+    columns = {'resstatus': rng.integers(1, 3, n_rows).astype('float64')}
+    column_labels = ['Stav respondenta']
+    value_labels = {'resstatus': {1.0: 'Nedokončeno', 2.0: 'Dokončeno'}}
+
+    for name, kind in matching_columns(questions).items():
+        if kind == 'string':
+            columns[name] = np.full(n_rows, 'jiná odpověď', dtype=object)
+        elif kind == 'mr':
+            columns[name] = rng.integers(0, 2, n_rows).astype('float64')
+            value_labels[name] = {0.0: 'Ne', 1.0: 'Ano'}
+        else:
+            columns[name] = rng.integers(1, len(SCALE) + 1, n_rows).astype('float64')
+            value_labels[name] = {float(i): label for i, label in enumerate(SCALE, 1)}
+        column_labels.append(name)
+    for i in range(1, extra_columns + 1):
+        columns[f'X{i}'] = rng.random(n_rows)
+        column_labels.append(f'Doplňková proměnná {i}')
+
+    pyreadstat.write_sav(pd.DataFrame(columns), path, column_labels=column_labels,
+                         variable_value_labels=value_labels)
+    return len(columns)
+
+
+# Okrajové případy OOXML, na kterých se ověřuje shoda proudového parseru s python-docx
+EDGE_CASE_XML = [
+    # hypertextový odkaz uprostřed otázky
+    '<w:p {ns}><w:r><w:t xml:space="preserve">E1. Klikněte </w:t></w:r>'
+    '<w:hyperlink r:id="rId99"><w:r><w:t>sem</w:t></w:r></w:hyperlink><w:r><w:t>?</w:t></w:r></w:p>',
+    # tabulátory, zalomení řádku/stránky, nedělitelný spojovník, cr, ptab
+    '<w:p {ns}><w:r><w:t>Položka</w:t><w:tab/><w:t>1</w:t><w:br/><w:t>druhý řádek</w:t>'
+    '<w:br w:type="page"/><w:t>X</w:t><w:noBreakHyphen/><w:cr/>'
+    '<w:ptab w:relativeTo="margin" w:alignment="left" w:leader="none"/><w:t>Y</w:t></w:r></w:p>',
+    # formátování odstavce i běhu, mezery na okrajích
+    '<w:p {ns}><w:pPr><w:rPr><w:b/></w:rPr></w:pPr><w:r><w:rPr><w:i/></w:rPr>'
+    '<w:t xml:space="preserve">   Značka s mezerami   </w:t></w:r><w:r><w:t/></w:r></w:p>',
+    # tabulka - python-docx do doc.paragraphs nezahrnuje
+    '<w:tbl {ns}><w:tr><w:tc><w:p><w:r><w:t>T1. Otázka v tabulce?</w:t></w:r></w:p></w:tc></w:tr></w:tbl>',
+    # content control na úrovni těla - také se nezahrnuje
+    '<w:sdt {ns}><w:sdtContent><w:p><w:r><w:t>C9. Otázka v content controlu?</w:t></w:r></w:p>'
+    '</w:sdtContent></w:sdt>',
+    # sledované změny a pole - běhy nejsou přímo v odstavci
+    '<w:p {ns}><w:r><w:t xml:space="preserve">Značka </w:t></w:r><w:ins w:id="1" w:author="a">'
+    '<w:r><w:t>vložená</w:t></w:r></w:ins><w:fldSimple w:instr="PAGE"><w:r><w:t>5</w:t></w:r>'
+    '</w:fldSimple></w:p>',
+    # odstavec jen z bílých znaků
+    '<w:p {ns}><w:r><w:t xml:space="preserve">   </w:t><w:tab/></w:r></w:p>',
+]
+
+
+def write_edge_case_docx(path: str, n_blocks: int = 3) -> int:
+    """Synteticky dotazník proložený okrajovými případy OOXML; vrací počet prvků těla."""
+    doc = docx.Document()
+    sect_pr = doc.element.body[-1]
+    ns = nsdecls('w', 'r')
+    count = 0
+    for i, text in enumerate(questionnaire_paragraphs(synthetic_questionnaire(n_blocks))):
+        p = OxmlElement('w:p')
+        if text:
+            r = OxmlElement('w:r')
+            t = OxmlElement('w:t')
+            t.text = text
+            r.append(t)
+            p.append(r)
+        sect_pr.addprevious(p)
+        count += 1
+        if i % 7 == 0:
+            sect_pr.addprevious(parse_xml(EDGE_CASE_XML[(i // 7) % len(EDGE_CASE_XML)].format(ns=ns)))
+            count += 1
+    doc.save(path)
+    return count
@@ -0,0 +1,202 @@
+"""
+Obsahově adresovaná cache pro rozparsované dotazníky, metadata .sav a hotové syntaxe
+
+Záznamy jsou v SQLite na disku, takže je sdílejí všechny gunicorn workery.
+Klíčem je SHA-256 obsahu vstupních souborů, velikost cache je omezená
+a při překročení se mažou nejdéle nepoužité záznamy (LRU).
+
+Hodnoty se ukládají jako pickle - kdo může zapisovat do adresáře cache,
+může ve službě spustit kód. Adresář proto musí patřit aktuálnímu uživateli
+a nesmí do něj zapisovat skupina ani ostatní; výchozí adresář v /tmp má
+v názvu UID a vytváří se s právy 0o700.
+"""
+
+import hashlib
+import os
+import pickle
+import sqlite3
+import stat
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+def file_digest(source) -> str:
+    """
+    SHA-256 obsahu souboru (čte se po blocích, soubor se nenačítá celý).
+    source je cesta nebo binární stream - ten se po výpočtu vrátí na původní pozici.
+    """
+    if hasattr(source, 'read'):
+        pos = source.tell()
+        source.seek(0)
+        digest = hashlib.file_digest(source, 'sha256').hexdigest()
+        source.seek(pos)
+        return digest
+    with open(source, 'rb') as f:
+        return hashlib.file_digest(f, 'sha256').hexdigest()
+
+
+def _source_version() -> str:
+    """
+    Verze kódu, který vytváří cachované hodnoty - změna parseru nebo generátoru
+    tak automaticky zneplatní staré záznamy.
+    """
+    digest = hashlib.sha256()
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name in ('backend_app.py', 'cache.py', 'docx_stream.py', 'question_rules.py'):
+        try:
+            with open(os.path.join(here, name), 'rb') as f:
+                digest.update(f.read())
+        except OSError:
+            pass
+    return digest.hexdigest()[:16]
+
+
+CACHE_VERSION = _source_version()
+
+
+def private_directory(path: str) -> str:
+    """
+    Vytvoří adresář s právy 0o700, nebo ověří existující: musí to být adresář
+    (ne symlink) aktuálního uživatele bez práva zápisu pro skupinu a ostatní.
+    Jinak PermissionError.
+    """
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode):
+        raise PermissionError(f'{path} není adresář')
+    if info.st_uid != os.getuid():
+        raise PermissionError(f'Adresář {path} patří jinému uživateli (UID {info.st_uid})')
+    if info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        raise PermissionError(f'Do adresáře {path} může zapisovat skupina nebo ostatní')
+    return path
+
+
+class ContentCache:
+    """Diskem zálohovaná LRU cache s počítadly zásahů a výpadků."""
+
+    def __init__(self, base_dir: str, max_bytes: int = 256 * 1024 * 1024,
+                 max_entry_bytes: int = 16 * 1024 * 1024):
+        self.base_dir = base_dir
+        self.max_bytes = max_bytes
+        # Větší hodnoty se neukládají (a proudová syntax se pro cache přestane sbírat)
+        self.max_entry_bytes = min(max_entry_bytes, max_bytes)
+        self.db_path = os.path.join(base_dir, 'cache.sqlite3')
+
+        os.makedirs(os.path.dirname(os.path.abspath(base_dir)), exist_ok=True)
+        private_directory(base_dir)
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS entries ('
+                ' namespace TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL,'
+                ' size INTEGER NOT NULL, last_used REAL NOT NULL,'
+                ' PRIMARY KEY (namespace, key))'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS stats ('
+                ' namespace TEXT PRIMARY KEY, hits INTEGER NOT NULL DEFAULT 0,'
+                ' misses INTEGER NOT NULL DEFAULT 0)'
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _count(self, conn: sqlite3.Connection, namespace: str, column: str):
+        conn.execute('INSERT OR IGNORE INTO stats (namespace) VALUES (?)', (namespace,))
+        conn.execute(f'UPDATE stats SET {column} = {column} + 1 WHERE namespace = ?', (namespace,))
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """Vrátí uloženou hodnotu, nebo None (a započítá výpadek)."""
+        key = f'{CACHE_VERSION}:{key}'
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT value FROM entries WHERE namespace = ? AND key = ?', (namespace, key)
+            ).fetchone()
+            if row is None:
+                self._count(conn, namespace, 'misses')
+                return None
+            conn.execute(
+                'UPDATE entries SET last_used = ? WHERE namespace = ? AND key = ?',
+                (time.time(), namespace, key)
+            )
+            self._count(conn, namespace, 'hits')
+        return pickle.loads(row[0])
+
+    def put(self, namespace: str, key: str, value: Any):
+        """Uloží hodnotu a případně uvolní místo smazáním nejdéle nepoužitých záznamů."""
+        key = f'{CACHE_VERSION}:{key}'
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.max_entry_bytes:
+            return
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO entries (namespace, key, value, size, last_used)'
+                ' VALUES (?, ?, ?, ?, ?)',
+                (namespace, key, blob, len(blob), time.time())
+            )
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection):
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for namespace, key, size in conn.execute(
+            'SELECT namespace, key, size FROM entries ORDER BY last_used'
+        ).fetchall():
+            conn.execute('DELETE FROM entries WHERE namespace = ? AND key = ?', (namespace, key))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self) -> Dict[str, Any]:
+        """Počty zásahů/výpadků po jmenných prostorech a obsazené místo."""
+        with self._connect() as conn:
+            namespaces = {
+                namespace: {'hits': hits, 'misses': misses}
+                for namespace, hits, misses in conn.execute('SELECT namespace, hits, misses FROM stats')
+            }
+            entries, size = conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries'
+            ).fetchone()
+        return {
+            'namespaces': namespaces,
+            'entries': entries,
+            'size_bytes': size,
+            'max_bytes': self.max_bytes,
+            'max_entry_bytes': self.max_entry_bytes,
+        }
+
+
+_cache = None
+_cache_disabled = False
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> Optional[ContentCache]:
+    """
+    Sdílená cache procesu; SPSS_CACHE=0 ji vypíná (vrací None). Adresář,
+    který neprojde kontrolou private_directory, cache vypne také (s varováním).
+    """
+    global _cache, _cache_disabled
+    if os.environ.get('SPSS_CACHE', '1') == '0':
+        return None
+    with _cache_lock:
+        if _cache is None and not _cache_disabled:
+            base_dir = os.environ.get('SPSS_CACHE_DIR') or os.path.join(
+                tempfile.gettempdir(), f'spss-syntax-cache-{os.getuid()}'
+            )
+            try:
+                _cache = ContentCache(
+                    base_dir,
+                    max_bytes=int(os.environ.get('SPSS_CACHE_MAX_MB', 256)) * 1024 * 1024,
+                    max_entry_bytes=int(os.environ.get('SPSS_CACHE_MAX_ENTRY_MB', 16)) * 1024 * 1024,
+                )
+            except PermissionError as e:
+                print(f"⚠️ Cache vypnuta: {e}")
+                _cache_disabled = True
+        return _cache
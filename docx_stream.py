@@ -0,0 +1,100 @@
+"""
+Proudové čtení odstavců z .docx bez python-docx
+
+Čte word/document.xml přímo ze zipu přes iterparse a vrací texty odstavců
+jeden po druhém. Text odstavce se skládá stejně jako Paragraph.text
+v python-docx: jen odstavce přímo v těle dokumentu (ne v tabulkách),
+jen běhy (w:r) přímo v odstavci nebo v hypertextovém odkazu.
+"""
+
+import posixpath
+import xml.etree.ElementTree as ET
+import zipfile
+from typing import IO, Iterator, Union
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+R_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+OFFICE_DOCUMENT_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument'
+
+BODY = W + 'body'
+P = W + 'p'
+R = W + 'r'
+HYPERLINK = W + 'hyperlink'
+T = W + 't'
+BR = W + 'br'
+BR_TYPE = W + 'type'
+
+# Prvky uvnitř běhu a jejich textový ekvivalent (w:t a w:br se řeší zvlášť)
+RUN_CONTENT = {
+    W + 'cr': '\n',
+    W + 'noBreakHyphen': '-',
+    W + 'ptab': '\t',
+    W + 'tab': '\t',
+}
+
+
+def main_document_part(zf: zipfile.ZipFile) -> str:
+    """Cesta k hlavnímu XML dokumentu podle _rels/.rels (obvykle word/document.xml)."""
+    try:
+        rels = ET.fromstring(zf.read('_rels/.rels'))
+    except KeyError:
+        return 'word/document.xml'
+    for rel in rels.iter(f'{{{R_NS}}}Relationship'):
+        if rel.get('Type') == OFFICE_DOCUMENT_REL:
+            return posixpath.normpath(rel.get('Target').lstrip('/'))
+    return 'word/document.xml'
+
+
+def iter_docx_paragraph_texts(source: Union[str, IO[bytes]]) -> Iterator[str]:
+    """
+    Vrací neprázdné (oříznuté) texty odstavců v těle dokumentu v pořadí dokumentu.
+    source je cesta nebo binární stream .docx souboru.
+    """
+    with zipfile.ZipFile(source) as zf:
+        with zf.open(main_document_part(zf)) as xml_stream:
+            # Zásobník tagů od kořene (w:document) k aktuálnímu prvku
+            stack = []
+            body = None
+            parts = []
+
+            for event, elem in ET.iterparse(xml_stream, events=('start', 'end')):
+                if event == 'start':
+                    stack.append(elem.tag)
+                    if elem.tag == BODY and len(stack) == 2:
+                        body = elem
+                    continue
+
+                depth = len(stack)
+                stack.pop()
+                if depth < 3 or stack[1] != BODY:
+                    continue
+
+                # Odstavec přímo v těle dokumentu
+                if depth == 3:
+                    if elem.tag == P:
+                        text = ''.join(parts).strip()
+                        if text:
+                            yield text
+                    parts.clear()
+                    # Zpracované prvky těla se z paměti uvolňují průběžně
+                    body.clear()
+                    continue
+
+                if stack[2] != P:
+                    continue
+
+                # Obsah běhu: body/p/r/* nebo body/p/hyperlink/r/*
+                if depth == 5 and stack[3] == R:
+                    pass
+                elif depth == 6 and stack[3] == HYPERLINK and stack[4] == R:
+                    pass
+                else:
+                    continue
+
+                if elem.tag == T:
+                    parts.append(elem.text or '')
+                elif elem.tag == BR:
+                    if elem.get(BR_TYPE, 'textWrapping') == 'textWrapping':
+                        parts.append('\n')
+                elif elem.tag in RUN_CONTENT:
+                    parts.append(RUN_CONTENT[elem.tag])
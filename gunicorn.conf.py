@@ -0,0 +1,36 @@
+"""
+Konfigurace gunicornu (gunicorn ji načte sám z pracovního adresáře)
+
+S preloadem (výchozí, SPSS_PRELOAD=0 ho vypne) master proces naimportuje
+aplikaci i knihovny pro čtení .sav a .docx jednou před forkem a workery je
+sdílejí copy-on-write: nový worker nastartuje hned a nic znovu neimportuje.
+Bez preloadu importuje každý worker jen Flask a těžké knihovny až při prvním
+generování.
+"""
+
+import gc
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+timeout = 120
+preload_app = os.environ.get('SPSS_PRELOAD', '1') != '0'
+
+
+def on_starting(server):
+    # Snímky metrik z minulého běhu patří workerům, které už neexistují
+    from metrics import clear, metrics_dir
+
+    clear(metrics_dir())
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    from backend_app import preload_parsing_stack
+
+    elapsed = preload_parsing_stack()
+    server.log.info('Knihovny pro parsování načteny před forkem (%.2f s)', elapsed)
+    # Objekty z preloadu přesune mimo sledování GC, aby je garbage collector
+    # ve workerech nepřepisoval a stránky paměti zůstaly sdílené
+    gc.freeze()
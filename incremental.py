@@ -0,0 +1,91 @@
+"""
+Inkrementální přegenerování syntaxe mezi vlnami dotazníku
+
+Vedle výstupního .sps se ukládá manifest (<výstup>.blocks.json) s bloky
+syntaxe po otázkách: klíč bloku (sekce, kód otázky, pořadí výskytu), otisk
+vstupů, ze kterých blok vznikl, a jeho řádky. Při dalším běhu generátor
+bloky se stejným otiskem převezme a znovu sestaví jen změněné otázky;
+změněné bloky se navíc zapíší jako kompaktní diff (<výstup>.diff) ke kontrole.
+"""
+
+import difflib
+import hashlib
+import json
+import os
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+
+def manifest_path_for(output_path: str) -> str:
+    return f'{output_path}.blocks.json'
+
+
+def diff_path_for(output_path: str) -> str:
+    return f'{output_path}.diff'
+
+
+def block_key(section: str, code: str, occurrence: int) -> str:
+    """Klíč bloku; pořadí výskytu rozliší duplicitní kódy otázek v téže sekci."""
+    return f'{section}:{code}:{occurrence}'
+
+
+def fingerprint(inputs) -> str:
+    """Otisk vstupů bloku (repr je pro seznamy, řetězce a čísla deterministický)."""
+    return hashlib.sha256(repr(inputs).encode('utf-8')).hexdigest()[:16]
+
+
+def load_manifest(path: str) -> Optional[Dict]:
+    """Manifest předchozího běhu, nebo None (neexistuje nebo je poškozený)."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(manifest, dict) or 'blocks' not in manifest:
+        return None
+    return manifest
+
+
+def save_manifest(path: str, version: str, blocks: List[Dict]):
+    """Atomicky zapíše manifest (při přerušení zůstane platný ten předchozí)."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        # json.dumps používá C encoder, json.dump do souboru ne
+        f.write(json.dumps({'version': version, 'blocks': blocks}, ensure_ascii=False))
+    os.replace(tmp_path, path)
+
+
+def diff_blocks(previous: List[Dict], current: List[Dict]) -> Tuple[str, Dict[str, List[str]]]:
+    """
+    Porovná bloky dvou běhů podle klíče. Vrací unified diff změněných bloků
+    a klíče rozdělené na added / changed / removed. Prázdný blok (otázka bez
+    proměnných v .sav) se počítá jako nepřítomný.
+    """
+    previous_lines = {block['key']: block['lines'] for block in previous}
+    current_keys = set()
+    changes = {'added': [], 'changed': [], 'removed': []}
+    diff = []
+
+    def add(kind, key, old, new):
+        changes[kind].append(key)
+        diff.extend(difflib.unified_diff(old, new, f'a/{key}', f'b/{key}', lineterm='', n=1))
+
+    for block in current:
+        key = block['key']
+        current_keys.add(key)
+        old = previous_lines.get(key, [])
+        new = block['lines']
+        if old == new:
+            continue
+        if not old:
+            add('added', key, old, new)
+        elif not new:
+            add('removed', key, old, new)
+        else:
+            add('changed', key, old, new)
+    for block in previous:
+        if block['key'] not in current_keys and block['lines']:
+            add('removed', block['key'], block['lines'], [])
+
+    return '\n'.join(diff) + ('\n' if diff else ''), changes
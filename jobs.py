@@ -0,0 +1,242 @@
+"""
+Fronta úloh pro asynchronní generování syntaxe
+
+Stav úloh je v SQLite a soubory v adresáři úlohy, takže stav i výsledek
+může vrátit kterýkoli gunicorn worker. Samotné úlohy běží v omezeném
+poolu vláken workeru, který je přijal.
+
+Čekající úlohy se spouštějí podle vážené férové fronty (start-time fair
+queueing): každá úloha dostane značku start + 1/váha klienta, takže klient
+s mnoha úlohami nepředběhne ostatní a klient s větší váhou dostane větší podíl.
+"""
+
+import heapq
+import itertools
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+
+class QueueFullError(Exception):
+    """Fronta je plná - klient to má zkusit znovu za retry_after sekund."""
+
+    def __init__(self, retry_after: int, reason: str = 'Fronta úloh je plná'):
+        super().__init__(f'{reason}, zkuste to znovu za {retry_after} s')
+        self.retry_after = retry_after
+
+
+class Job:
+    """Jedna úloha - adresář se vstupy/výstupem a zápis průběhu do SQLite."""
+
+    def __init__(self, queue: 'JobQueue', job_id: str):
+        self.queue = queue
+        self.id = job_id
+        self.dir = os.path.join(queue.base_dir, job_id)
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.dir, name)
+
+    def progress(self, stage: str, fraction: float):
+        """Callback pro SPSSSyntaxGenerator.run - zaznamená aktuální fázi."""
+        self.queue._update(self.id, stage=stage, progress=round(fraction, 3))
+
+
+class JobQueue:
+    """Omezený pool workerů s váženou férovou frontou pevné délky a stavem úloh v SQLite."""
+
+    def __init__(self, base_dir: str, workers: int = 2, max_queued: int = 4,
+                 retry_after: int = 10, ttl: int = 3600, max_per_client: int = None):
+        self.base_dir = base_dir
+        self.workers = workers
+        self.max_queued = max_queued
+        # Úloh jednoho klienta (běžících i čekajících) nejvýš tolik; výchozí polovina
+        # kapacity, aby jeden klient frontu nezaplnil a ostatní nedostávali jen 429
+        self.max_per_client = max_per_client or max(1, (workers + max_queued) // 2)
+        self.retry_after = retry_after
+        self.ttl = ttl
+        self.db_path = os.path.join(base_dir, 'jobs.sqlite3')
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='syntax-job')
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._client_in_flight: Dict[str, int] = {}
+        # Čekající úlohy: (finish_tag, pořadí, start_tag, job, target, klient)
+        self._pending = []
+        self._seq = itertools.count()
+        self._virtual_time = 0.0
+        self._last_finish: Dict[str, float] = {}
+
+        os.makedirs(base_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                ' id TEXT PRIMARY KEY, status TEXT NOT NULL, stage TEXT, progress REAL,'
+                ' output_name TEXT, error TEXT, created REAL NOT NULL, updated REAL NOT NULL,'
+                ' client TEXT, worker INTEGER, finish_tag REAL)'
+            )
+            # Databáze z verze bez férové fronty
+            columns = {row['name'] for row in conn.execute('PRAGMA table_info(jobs)')}
+            for column, kind in (('client', 'TEXT'), ('worker', 'INTEGER'), ('finish_tag', 'REAL')):
+                if column not in columns:
+                    conn.execute(f'ALTER TABLE jobs ADD COLUMN {column} {kind}')
+        # Úlohy workeru, který skončil před tímto startem
+        self.cleanup()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _update(self, job_id: str, **fields):
+        fields['updated'] = time.time()
+        columns = ', '.join(f'{name} = ?' for name in fields)
+        with self._connect() as conn:
+            conn.execute(f'UPDATE jobs SET {columns} WHERE id = ?', (*fields.values(), job_id))
+
+    def submit(self, target: Callable[[Job], Any], uploads: Dict[str, Any], output_name: str,
+               client: str = 'anonymous', weight: float = 1.0) -> Job:
+        """
+        Uloží nahrané soubory (objekty s metodou save(path)) do adresáře úlohy
+        a zařadí target(job) do férové fronty podle klienta a jeho váhy. Při plné
+        frontě nebo příliš mnoha úlohách klienta vyhodí QueueFullError.
+        """
+        with self._lock:
+            if self._in_flight >= self.workers + self.max_queued:
+                raise QueueFullError(self.retry_after)
+            if self._client_in_flight.get(client, 0) >= self.max_per_client:
+                raise QueueFullError(self.retry_after, f'Klient {client} má ve frontě příliš mnoho úloh')
+            self._in_flight += 1
+            self._client_in_flight[client] = self._client_in_flight.get(client, 0) + 1
+
+        try:
+            self.cleanup()
+            job = Job(self, uuid.uuid4().hex)
+            os.makedirs(job.dir)
+            for name, upload in uploads.items():
+                upload.save(job.path(name))
+
+            now = time.time()
+            with self._lock:
+                start = max(self._virtual_time, self._last_finish.get(client, 0.0))
+                finish = self._last_finish[client] = start + 1.0 / weight
+                with self._connect() as conn:
+                    conn.execute(
+                        'INSERT INTO jobs (id, status, stage, progress, output_name, created, updated,'
+                        ' client, worker, finish_tag) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                        (job.id, 'queued', None, 0.0, output_name, now, now, client, os.getpid(), finish)
+                    )
+                heapq.heappush(self._pending, (finish, next(self._seq), start, job, target, client))
+            # Každé volání _run_next spustí jednu čekající úlohu - tu s nejmenší značkou
+            self._executor.submit(self._run_next)
+        except Exception:
+            self._release(client)
+            raise
+        return job
+
+    def _release(self, client: str):
+        with self._lock:
+            self._in_flight -= 1
+            self._client_in_flight[client] -= 1
+            if not self._client_in_flight[client]:
+                del self._client_in_flight[client]
+
+    def _run_next(self):
+        with self._lock:
+            _, _, start, job, target, client = heapq.heappop(self._pending)
+            self._virtual_time = start
+            # Značky nečinných klientů, které už virtuální čas dohnal, nic neovlivní
+            for idle in [c for c, tag in self._last_finish.items() if tag <= start and c not in self._client_in_flight]:
+                del self._last_finish[idle]
+        try:
+            self._update(job.id, status='running')
+            target(job)
+            self._update(job.id, status='done', stage='done', progress=1.0)
+        except Exception as e:
+            print(f"❌ Úloha {job.id} selhala: {e}")
+            self._update(job.id, status='failed', error=str(e))
+        finally:
+            self._release(client)
+
+    def status(self, job_id: str) -> Optional[Dict]:
+        """Stav úlohy jako dict, nebo None pokud úloha neexistuje."""
+        with self._connect() as conn:
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+        status = dict(row)
+        if status['status'] == 'queued':
+            # Úloha čeká jen na úlohy stejného workeru s menší značkou férové fronty
+            with self._connect() as conn:
+                status['queue_position'] = conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND worker IS ? AND id != ?"
+                    " AND (finish_tag < ? OR (finish_tag = ? AND created < ?))",
+                    (status['worker'], job_id, status['finish_tag'], status['finish_tag'], status['created'])
+                ).fetchone()[0] + 1
+        return status
+
+    def get(self, job_id: str) -> Job:
+        return Job(self, job_id)
+
+    def cleanup(self):
+        """
+        Smaže dokončené i neúspěšné úlohy starší než ttl sekund. Čekající a běžící
+        úlohy jiného workeru, který už neběží (restart gunicornu) nebo se ttl sekund
+        neozval, označí jako neúspěšné a smaže jejich soubory - klient tak nečeká věčně.
+        """
+        now = time.time()
+        cutoff = now - self.ttl
+        with self._connect() as conn:
+            expired = [row['id'] for row in conn.execute(
+                "SELECT id FROM jobs WHERE status IN ('done', 'failed') AND updated < ?", (cutoff,)
+            )]
+            conn.executemany('DELETE FROM jobs WHERE id = ?', [(job_id,) for job_id in expired])
+            orphaned = [row['id'] for row in conn.execute(
+                "SELECT id, worker, updated FROM jobs WHERE status IN ('queued', 'running')"
+            ) if row['worker'] != os.getpid() and (row['updated'] < cutoff or not _worker_alive(row['worker']))]
+            conn.executemany(
+                "UPDATE jobs SET status = 'failed', error = ?, updated = ? WHERE id = ?",
+                [('Worker, který úlohu zpracovával, skončil; zadejte ji znovu', now, job_id) for job_id in orphaned],
+            )
+        for job_id in expired + orphaned:
+            shutil.rmtree(os.path.join(self.base_dir, job_id), ignore_errors=True)
+
+
+def _worker_alive(pid: Optional[int]) -> bool:
+    """Proces pid ještě běží (úlohy ze starší verze bez sloupce worker nemají pid)."""
+    if pid is None:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """
+    Sdílená fronta procesu, vytvořená až při prvním použití
+    (po forku gunicorn workeru, ne při importu modulu).
+    """
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue(
+                os.environ.get('SPSS_JOBS_DIR', os.path.join(tempfile.gettempdir(), 'spss-syntax-jobs')),
+                workers=int(os.environ.get('SPSS_JOB_WORKERS', 2)),
+                max_queued=int(os.environ.get('SPSS_JOB_QUEUE_SIZE', 4)),
+                retry_after=int(os.environ.get('SPSS_JOB_RETRY_AFTER', 10)),
+                ttl=int(os.environ.get('SPSS_JOB_TTL', 3600)),
+                max_per_client=int(os.environ.get('SPSS_JOB_PER_CLIENT', 0)) or None,
+            )
+        return _job_queue
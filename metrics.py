@@ -0,0 +1,196 @@
+"""
+Metriky ve formátu Prometheus (text exposition) pro /api/metrics
+
+Každý proces sbírá čítače a histogramy v paměti. Flask po každém požadavku
+zapíše snímek registru do sdíleného adresáře (soubor na PID) a /api/metrics
+snímky všech gunicorn workerů sečte - podobně jako multiprocess režim
+prometheus_client, ale bez další závislosti. Snímky ukončených workerů
+collect maže a gunicorn je při startu smaže všechny (clear), takže se
+nepřičítají ke stejným metrikám nových workerů.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+SIZE_BUCKETS = (1e4, 1e5, 1e6, 1e7, 5e7, 1e8, 5e8, 1e9)
+COUNT_BUCKETS = (10, 50, 100, 500, 1000, 5000, 10000, 50000)
+
+
+def _label_key(labels: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ''
+    escaped = (
+        '{}="{}"'.format(name, value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+class MetricsRegistry:
+    """Čítače a histogramy jednoho procesu."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._meta: Dict[str, Dict] = {}
+        self._counters: Dict[Tuple, float] = {}
+        # (název, labely) -> [počty v bucketech..., součet, počet]
+        self._histograms: Dict[Tuple, List[float]] = {}
+
+    def counter(self, name: str, help_text: str):
+        self._meta[name] = {'type': 'counter', 'help': help_text}
+
+    def histogram(self, name: str, help_text: str, buckets=LATENCY_BUCKETS):
+        self._meta[name] = {'type': 'histogram', 'help': help_text, 'buckets': list(buckets)}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        buckets = self._meta[name]['buckets']
+        key = (name, _label_key(labels))
+        with self._lock:
+            state = self._histograms.get(key)
+            if state is None:
+                state = self._histograms[key] = [0] * len(buckets) + [0.0, 0]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        """Změří dobu bloku do histogramu name (i když blok skončí výjimkou)."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0, **labels)
+
+    def snapshot(self) -> Dict:
+        """Stav registru jako JSON-serializovatelný dict."""
+        with self._lock:
+            return {
+                'meta': self._meta,
+                'counters': [[name, list(labels), value] for (name, labels), value in self._counters.items()],
+                'histograms': [[name, list(labels), list(state)] for (name, labels), state in self._histograms.items()],
+            }
+
+    def flush(self, directory: str):
+        """Atomicky zapíše snímek registru do directory/<pid>.json."""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{os.getpid()}.json')
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, path)
+
+
+def render(snapshots: List[Dict]) -> str:
+    """Sečte snímky (z více procesů) a vrátí text ve formátu Prometheus."""
+    meta = {}
+    counters: Dict[Tuple, float] = {}
+    histograms: Dict[Tuple, List[float]] = {}
+    for snap in snapshots:
+        meta.update(snap['meta'])
+        for name, labels, value in snap['counters']:
+            key = (name, tuple(tuple(pair) for pair in labels))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, state in snap['histograms']:
+            key = (name, tuple(tuple(pair) for pair in labels))
+            if key in histograms:
+                histograms[key] = [a + b for a, b in zip(histograms[key], state)]
+            else:
+                histograms[key] = list(state)
+
+    lines = []
+    for name in sorted(meta):
+        info = meta[name]
+        lines.append(f"# HELP {name} {info['help']}")
+        lines.append(f"# TYPE {name} {info['type']}")
+        if info['type'] == 'counter':
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f'{name}{_format_labels(labels)} {value}')
+        else:
+            for (metric, labels), state in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                for bound, count in zip(info['buckets'], state):
+                    lines.append(f'{name}_bucket{_format_labels(labels, (("le", f"{bound:g}"),))} {count}')
+                lines.append(f'{name}_bucket{_format_labels(labels, (("le", "+Inf"),))} {state[-1]}')
+                lines.append(f'{name}_sum{_format_labels(labels)} {state[-2]}')
+                lines.append(f'{name}_count{_format_labels(labels)} {state[-1]}')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_dir() -> str:
+    return os.environ.get('SPSS_METRICS_DIR', os.path.join(tempfile.gettempdir(), 'spss-syntax-metrics'))
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def clear(directory: str):
+    """Smaže všechny snímky (gunicorn on_starting - žádný worker ještě neběží)."""
+    if os.path.isdir(directory):
+        for name in os.listdir(directory):
+            if name.endswith(('.json', '.tmp')):
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError:
+                    pass
+
+
+def collect(directory: str) -> str:
+    """Načte snímky běžících procesů z directory a vrátí sloučený výstup; snímky ukončených smaže."""
+    snapshots = []
+    if os.path.isdir(directory):
+        for name in os.listdir(directory):
+            if not name.endswith('.json'):
+                continue
+            pid = name[:-len('.json')]
+            if pid.isdigit() and not _process_alive(int(pid)):
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError:
+                    pass
+                continue
+            try:
+                with open(os.path.join(directory, name)) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+    return render(snapshots)
+
+
+metrics = MetricsRegistry()
+
+metrics.histogram('spss_stage_seconds', 'Doba jednotlivých fází generování (load_data, parse_questionnaire, generate_*, send_response)')
+metrics.histogram('spss_request_seconds', 'Doba zpracování API požadavku')
+metrics.counter('spss_requests_total', 'Počet API požadavků podle endpointu a stavového kódu')
+metrics.counter('spss_admission_rejected_total', 'Odmítnuté požadavky podle důvodu (size, slots, queue)')
+metrics.histogram('spss_upload_bytes', 'Velikost nahraných souborů', SIZE_BUCKETS)
+metrics.histogram('spss_sav_columns', 'Počet proměnných v načteném .sav', COUNT_BUCKETS)
+metrics.histogram('spss_questionnaire_questions', 'Počet otázek v rozparsovaném dotazníku', COUNT_BUCKETS)
+metrics.histogram('spss_syntax_lines', 'Počet řádků vygenerované syntaxe', COUNT_BUCKETS)
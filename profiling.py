@@ -0,0 +1,209 @@
+"""
+Profilování pomalých generování na vyžádání
+
+Profil se pořídí jen u vybraných požadavků: administrátor pošle hlavičku
+X-SPSS-Profile: 1 (spolu s X-Admin-Token = SPSS_ADMIN_TOKEN), nebo se požadavek
+vylosuje s pravděpodobností SPSS_PROFILE_SAMPLE_RATE (0 = nikdy, výchozí).
+U ostatních požadavků se jen porovná hlavička a číslo, profiler neběží.
+
+Profil je statistický: vlákno na pozadí každých SPSS_PROFILE_INTERVAL_MS
+(výchozí 5 ms) přečte zásobník profilovaného vlákna. Výsledek se ukládá jako
+"collapsed stacks" (jeden řádek na zásobník: rámce oddělené ';' a počet
+vzorků), které přímo čtou flamegraph.pl, speedscope nebo inferno. Vedle je
+JSON s velikostí vstupů, počty otázek a proměnných. Uchovává se posledních
+SPSS_PROFILE_KEEP profilů v SPSS_PROFILE_DIR.
+"""
+
+import hmac
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+PROFILE_ID_RE = re.compile(r'[0-9a-f]{32}')
+
+# Důvod pořízení profilu
+TRIGGER_REQUEST = 'request'
+TRIGGER_SAMPLE = 'sample'
+
+
+def _frame_label(code) -> str:
+    """Rámec ve tvaru jako py-spy: funkce (soubor:řádek); ';' odděluje rámce, proto se nahrazuje."""
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'.replace(';', ':')
+
+
+class StackSampler:
+    """Vzorkuje zásobník jednoho vlákna z vlákna na pozadí; počty vzorků podle zásobníku."""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts: Dict[tuple, int] = {}
+        self.samples = 0
+        self.seconds = 0.0
+        self._stopped = threading.Event()
+        self._thread = None
+        self._t0 = None
+
+    def start(self):
+        self._t0 = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='spss-profiler', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        counts = self.counts
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(frame.f_code)
+                frame = frame.f_back
+            if stack:
+                key = tuple(stack)
+                counts[key] = counts.get(key, 0) + 1
+                self.samples += 1
+
+    def stop(self):
+        """Zastaví vzorkování; lze volat opakovaně."""
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._thread.join()
+        self.seconds = time.perf_counter() - self._t0
+
+    def folded(self) -> str:
+        """Collapsed stacks: kořen vlevo, na konci řádku počet vzorků."""
+        lines = (
+            ';'.join(_frame_label(code) for code in reversed(stack)) + f' {count}'
+            for stack, count in self.counts.items()
+        )
+        return '\n'.join(sorted(lines)) + '\n'
+
+
+class Capture:
+    """Jeden pořizovaný profil: vzorkovač a údaje o vstupech (details)."""
+
+    def __init__(self, trigger: str, endpoint: str, interval: float):
+        self.id = uuid.uuid4().hex
+        self.trigger = trigger
+        self.endpoint = endpoint
+        self.created = time.time()
+        self.details: Dict = {}
+        self.sampler = StackSampler(threading.get_ident(), interval)
+
+    def stop(self):
+        self.sampler.stop()
+
+
+class Profiler:
+    """Rozhoduje, které požadavky se profilují, a ukládá hotové profily."""
+
+    def __init__(self, directory: str, sample_rate: float = 0.0, interval: float = 0.005,
+                 keep: int = 50, admin_token: Optional[str] = None):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.keep = keep
+        self.admin_token = admin_token
+        self._lock = threading.Lock()
+
+    def is_admin(self, token: Optional[str]) -> bool:
+        """Token odpovídá SPSS_ADMIN_TOKEN (bez nastaveného tokenu nikdo není admin)."""
+        return bool(self.admin_token and token) and hmac.compare_digest(token, self.admin_token)
+
+    def trigger(self, requested: Optional[str], token: Optional[str]) -> Optional[str]:
+        """Důvod profilování požadavku (TRIGGER_REQUEST / TRIGGER_SAMPLE), nebo None."""
+        if requested and requested != '0' and self.is_admin(token):
+            return TRIGGER_REQUEST
+        if self.sample_rate and random.random() < self.sample_rate:
+            return TRIGGER_SAMPLE
+        return None
+
+    def start(self, trigger: str, endpoint: str) -> Capture:
+        """Spustí profilování aktuálního vlákna."""
+        capture = Capture(trigger, endpoint, self.interval)
+        capture.sampler.start()
+        return capture
+
+    def save(self, capture: Capture) -> Dict:
+        """Zastaví profil, uloží <id>.folded a <id>.json a smaže nejstarší profily nad limit."""
+        capture.stop()
+        info = {
+            'id': capture.id,
+            'trigger': capture.trigger,
+            'endpoint': capture.endpoint,
+            'created': capture.created,
+            'seconds': round(capture.sampler.seconds, 3),
+            'samples': capture.sampler.samples,
+            'interval_ms': capture.sampler.interval * 1000,
+            **capture.details,
+        }
+        os.makedirs(self.directory, exist_ok=True)
+        self._write(f'{capture.id}.folded', capture.sampler.folded())
+        # JSON až po .folded - profil v seznamu má vždy i data
+        self._write(f'{capture.id}.json', json.dumps(info, ensure_ascii=False, indent=2))
+        self._prune()
+        return info
+
+    def _write(self, name: str, content: str):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, os.path.join(self.directory, name))
+
+    def _prune(self):
+        with self._lock:
+            profiles = self.list()
+            for info in profiles[self.keep:]:
+                for ext in ('.json', '.folded'):
+                    try:
+                        os.remove(os.path.join(self.directory, info['id'] + ext))
+                    except OSError:
+                        pass
+
+    def list(self) -> List[Dict]:
+        """Uložené profily od nejnovějšího."""
+        profiles = []
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if not name.endswith('.json'):
+                    continue
+                try:
+                    with open(os.path.join(self.directory, name), encoding='utf-8') as f:
+                        profiles.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        profiles.sort(key=lambda info: info['created'], reverse=True)
+        return profiles
+
+    def folded_path(self, profile_id: str) -> Optional[str]:
+        """Cesta k collapsed stacks profilu, nebo None (neplatné nebo neexistující ID)."""
+        if not PROFILE_ID_RE.fullmatch(profile_id):
+            return None
+        path = os.path.join(self.directory, f'{profile_id}.folded')
+        return path if os.path.exists(path) else None
+
+
+_profiler = None
+_profiler_lock = threading.Lock()
+
+
+def get_profiler() -> Profiler:
+    """Sdílená instance procesu, vytvořená až při prvním použití."""
+    global _profiler
+    with _profiler_lock:
+        if _profiler is None:
+            _profiler = Profiler(
+                os.environ.get('SPSS_PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'spss-syntax-profiles')),
+                sample_rate=float(os.environ.get('SPSS_PROFILE_SAMPLE_RATE', 0)),
+                interval=float(os.environ.get('SPSS_PROFILE_INTERVAL_MS', 5)) / 1000,
+                keep=int(os.environ.get('SPSS_PROFILE_KEEP', 50)),
+                admin_token=os.environ.get('SPSS_ADMIN_TOKEN') or None,
+            )
+        return _profiler
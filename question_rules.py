@@ -0,0 +1,131 @@
+"""
+Pravidla pro rozpoznávání odstavců dotazníku
+
+Co je začátek otázky, značka typu, řádek s nastavením nebo bod stupnice
+baterie, je popsané daty (question_rules.json) a ne kódem. Nový typ otázky
+z jiného dotazníkového nástroje se přidá do "types" s kategorií, kterou už
+generátor umí zpracovat.
+
+Všechna klíčová slova se při načtení zkompilují do jediného regulárního
+výrazu, takže se každý odstavec klasifikuje jedním voláním match().
+
+Patří sem i "affirmative_labels" - slova (v libovolném jazyce), podle kterých
+se ve value labelech .sav pozná kód zaškrtnuté odpovědi pro MRSETS.
+"""
+
+import hashlib
+import json
+import os
+import re
+from typing import Dict, Optional
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'question_rules.json')
+
+# Kategorie otázek, pro které generátor vytváří syntax (klíče výsledku parse_questionnaire_from_docx)
+CATEGORIES = (
+    'multiple_response',
+    'batteries',
+    'filtered_multiple',
+    'filtered_batteries',
+    'filtered_batteries_multiple',
+)
+
+# Druhy odstavců vracené QuestionRules.classify (v pořadí priority)
+QUESTION = 'question'
+TYPE = 'type'
+METADATA = 'metadata'
+
+
+def _any_literal(words) -> str:
+    """Alternace doslovných řetězců."""
+    return '|'.join(re.escape(word) for word in words)
+
+
+class QuestionRules:
+    """Zkompilovaná pravidla klasifikace odstavců a otázek."""
+
+    def __init__(self, config: Dict):
+        unknown = set(config['types'].values()) - set(CATEGORIES)
+        if unknown:
+            raise ValueError(f"Neznámé kategorie otázek v pravidlech: {', '.join(sorted(unknown))}")
+
+        self.config = config
+        self.type_marker = config['type_marker']
+        # Typ otázky -> kategorie (klíč ve výsledku parsování)
+        self.types: Dict[str, str] = dict(config['types'])
+        self.skip_item_prefixes = tuple(config.get('skip_item_prefixes', ()))
+        self.scale_max_length = config.get('scale_max_length', 30)
+        self.scale_min_count, self.scale_max_count = config.get('scale_count', (2, 6))
+
+        # Jeden výraz pro celý odstavec; alternativy se zkoušejí v pořadí priority,
+        # lookahead (?=...) hledá klíčové slovo kdekoli v textu
+        alternatives = []
+        requires = config.get('question_requires')
+        question = f"(?={config['question_start']})"
+        if requires:
+            question += f'(?=(?s:.*?)(?:{_any_literal(requires)}))'
+        alternatives.append(f'{question}(?P<{QUESTION}>)')
+        alternatives.append(f'(?=(?s:.*?){re.escape(self.type_marker)})(?P<{TYPE}>)')
+        if config.get('metadata_keywords'):
+            alternatives.append(f"(?=(?s:.*?)(?:{_any_literal(config['metadata_keywords'])}))(?P<{METADATA}>)")
+        self._paragraph_re = re.compile('|'.join(alternatives))
+
+        scale_words = [word.lower() for word in config.get('scale_words', ())]
+        self._scale_re = re.compile(_any_literal(scale_words)) if scale_words else None
+
+        # Celá slova, aby např. "da" nechytalo "nedám"
+        affirmative = config.get('affirmative_labels', ())
+        self._affirmative_re = (
+            re.compile(rf'\b(?:{_any_literal(affirmative)})\b', re.IGNORECASE) if affirmative else None
+        )
+
+        self.fingerprint = hashlib.sha256(
+            json.dumps(config, sort_keys=True, ensure_ascii=False).encode('utf-8')
+        ).hexdigest()[:16]
+
+    @classmethod
+    def load(cls, path: str) -> 'QuestionRules':
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def classify(self, text: str) -> Optional[str]:
+        """QUESTION, TYPE, METADATA, nebo None pro obyčejný řádek (položku)."""
+        match = self._paragraph_re.match(text)
+        return match.lastgroup if match else None
+
+    def question_type(self, text: str) -> str:
+        """Typ otázky z odstavce se značkou typu."""
+        return text.replace(self.type_marker, '').strip()
+
+    def category(self, question_type: Optional[str]) -> Optional[str]:
+        return self.types.get(question_type)
+
+    def is_item(self, text: str) -> bool:
+        """Řádek se sbírá jako položka (obrázky a komentáře ne)."""
+        return not text.startswith(self.skip_item_prefixes)
+
+    def is_scale(self, item: str) -> bool:
+        """Krátký řádek se slovem stupnice (ano, spíše, rozhodně...)."""
+        return (len(item) < self.scale_max_length and self._scale_re is not None
+                and self._scale_re.search(item.lower()) is not None)
+
+    def scale_count_ok(self, count: int) -> bool:
+        return self.scale_min_count <= count <= self.scale_max_count
+
+    def is_affirmative(self, label: str) -> bool:
+        """Value label zaškrtnuté odpovědi ("Ano", "Yes", "Ja"...)."""
+        return self._affirmative_re is not None and self._affirmative_re.search(label) is not None
+
+
+_rules_by_path: Dict[str, QuestionRules] = {}
+
+
+def load_rules(path: str = None) -> QuestionRules:
+    """
+    Pravidla ze souboru path, jinak ze SPSS_QUESTION_RULES, jinak výchozí
+    question_rules.json. Každý soubor se načte a zkompiluje jen jednou.
+    """
+    path = path or os.environ.get('SPSS_QUESTION_RULES') or DEFAULT_RULES_PATH
+    if path not in _rules_by_path:
+        _rules_by_path[path] = QuestionRules.load(path)
+    return _rules_by_path[path]
@@ -0,0 +1,240 @@
+"""
+Popisky proměnných rovnou do nového .sav, bez spouštění syntaxe v SPSS
+
+Slovník (hlavička, proměnné, value labely, formáty...) nového souboru zapíše
+pyreadstat z jednořádkové šablony se stejnými proměnnými a novými popisky.
+Data případů se pak po blocích zkopírují z původního .sav beze změny - paměť
+tak neroste s velikostí souboru a data se nedekódují. Jde to, protože data
+.sav nezávisí na popiscích, jen na rozložení proměnných (typy a šířky), a to
+se po zápisu šablony ověří.
+
+pyreadstat neumí zapsat MRSETS, zarovnání ani vlastní atributy proměnných;
+MRSETS zůstávají v .sps, který se generuje vedle (a slouží i ke kontrole).
+"""
+
+import os
+import re
+import shutil
+import struct
+import sys
+import tempfile
+from typing import Dict, Iterable, Iterator, List
+
+CHUNK_BYTES = 1024 * 1024
+
+HEADER_SIZE = 176
+_NCASES_OFFSET = 80
+_BIAS_OFFSET = 84
+_COMPRESSION_OFFSET = 72
+
+# Komprese dat v hlavičce .sav
+COMPRESSION_NONE = 0
+COMPRESSION_BYTECODE = 1
+COMPRESSION_ZLIB = 2
+
+
+class SavDictionary:
+    """Hlavička a rozložení slovníku .sav - co je potřeba k přenesení dat."""
+
+    def __init__(self, header: bytes, byte_order: str, layout: List[int], data_offset: int):
+        self.header = header
+        self.byte_order = byte_order
+        # Typ každého záznamu proměnné (0 = číslo, n = string šířky n, -1 = pokračování)
+        self.layout = layout
+        self.data_offset = data_offset
+        self.compression = self._int32(_COMPRESSION_OFFSET)
+        self.ncases = self._int32(_NCASES_OFFSET)
+        self.bias = struct.unpack_from(byte_order + 'd', header, _BIAS_OFFSET)[0]
+
+    def _int32(self, offset: int) -> int:
+        return struct.unpack_from(self.byte_order + 'i', self.header, offset)[0]
+
+
+def read_dictionary(f) -> SavDictionary:
+    """Projde záznamy slovníku od začátku souboru f až po záznam 999 (začátek dat)."""
+    f.seek(0)
+    header = f.read(HEADER_SIZE)
+    if len(header) < HEADER_SIZE or header[:4] not in (b'$FL2', b'$FL3'):
+        raise ValueError('Soubor není SPSS .sav')
+    byte_order = '<' if struct.unpack_from('<i', header, 64)[0] in (2, 3) else '>'
+
+    def read(fmt: str):
+        size = struct.calcsize(byte_order + fmt)
+        data = f.read(size)
+        if len(data) < size:
+            raise ValueError('Slovník .sav je neúplný')
+        return struct.unpack(byte_order + fmt, data)
+
+    layout = []
+    while True:
+        (rec_type,) = read('i')
+        if rec_type == 2:
+            var_type, has_label, n_missing, _, _ = read('iiiii')
+            f.seek(8, os.SEEK_CUR)  # krátký název
+            layout.append(var_type)
+            if has_label:
+                (label_len,) = read('i')
+                f.seek((label_len + 3) // 4 * 4, os.SEEK_CUR)
+            f.seek(abs(n_missing) * 8, os.SEEK_CUR)
+        elif rec_type == 3:
+            (count,) = read('i')
+            for _ in range(count):
+                f.seek(8, os.SEEK_CUR)
+                (label_len,) = read('B')
+                f.seek((label_len + 8) // 8 * 8 - 1, os.SEEK_CUR)
+        elif rec_type == 4:
+            (count,) = read('i')
+            f.seek(count * 4, os.SEEK_CUR)
+        elif rec_type == 6:
+            (lines,) = read('i')
+            f.seek(lines * 80, os.SEEK_CUR)
+        elif rec_type == 7:
+            _, size, count = read('iii')
+            f.seek(size * count, os.SEEK_CUR)
+        elif rec_type == 999:
+            read('i')
+            return SavDictionary(header, byte_order, layout, f.tell())
+        else:
+            raise ValueError(f'Neznámý typ záznamu ve slovníku .sav: {rec_type}')
+
+
+def _string_width(meta, var: str) -> int:
+    """Šířka stringu podle formátu (A15); úložná šířka bývá zaokrouhlená na násobek 8."""
+    match = re.fullmatch(r'A(\d+)', meta.original_variable_types.get(var) or '')
+    return int(match.group(1)) if match else meta.variable_storage_width[var]
+
+
+def _template_frame(meta):
+    """Jeden řádek se stejnými proměnnými; stringy mají plnou šířku, aby pyreadstat zvolil stejné rozložení."""
+    import pandas as pd
+
+    data = {}
+    for var in meta.column_names:
+        if meta.readstat_variable_types[var] == 'string':
+            data[var] = ['x' * _string_width(meta, var)]
+        else:
+            data[var] = [0.0]
+    return pd.DataFrame(data, columns=list(meta.column_names))
+
+
+def _write_template(path: str, meta, column_labels: Dict[str, str], compression: int):
+    import pyreadstat
+
+    labels = dict(meta.column_names_to_labels)
+    labels.update(column_labels)
+    pyreadstat.write_sav(
+        _template_frame(meta), path,
+        file_label=meta.file_label or '',
+        column_labels=[labels.get(var) or '' for var in meta.column_names],
+        compress=compression == COMPRESSION_ZLIB,
+        row_compress=compression == COMPRESSION_BYTECODE,
+        note='\n'.join(meta.notes) or None,
+        variable_value_labels=meta.variable_value_labels or None,
+        missing_ranges=meta.missing_ranges or None,
+        variable_display_width=meta.variable_display_width or None,
+        variable_measure={var: m for var, m in meta.variable_measure.items() if m != 'unknown'} or None,
+        variable_format=meta.original_variable_types,
+    )
+
+
+def _copy_zlib_data(src, dst, source: SavDictionary, delta: int, chunk_size: int):
+    """
+    Data .zsav: zheader a ztrailer obsahují absolutní pozice v souboru,
+    posunou se o rozdíl délek slovníků; komprimované bloky se kopírují beze změny.
+    """
+    order = source.byte_order
+    src.seek(source.data_offset)
+    zheader_ofs, ztrailer_ofs, ztrailer_len = struct.unpack(order + 'qqq', src.read(24))
+    dst.write(struct.pack(order + 'qqq', zheader_ofs + delta, ztrailer_ofs + delta, ztrailer_len))
+
+    remaining = ztrailer_ofs - src.tell()
+    while remaining > 0:
+        chunk = src.read(min(chunk_size, remaining))
+        if not chunk:
+            raise ValueError('Komprimovaná data .sav jsou neúplná')
+        dst.write(chunk)
+        remaining -= len(chunk)
+
+    trailer = bytearray(src.read(ztrailer_len))
+    bias, zero, block_size, n_blocks = struct.unpack_from(order + 'qqii', trailer, 0)
+    for i in range(n_blocks):
+        offset = 24 + i * 24
+        uncompressed_ofs, compressed_ofs = struct.unpack_from(order + 'qq', trailer, offset)
+        struct.pack_into(order + 'qq', trailer, offset, uncompressed_ofs + delta, compressed_ofs + delta)
+    dst.write(trailer)
+    shutil.copyfileobj(src, dst, chunk_size)
+
+
+def write_labelled_sav(source_path: str, output_path: str, column_labels: Dict[str, str], meta=None,
+                       chunk_size: int = CHUNK_BYTES):
+    """
+    Zapíše output_path = source_path s popisky proměnných column_labels
+    (ostatní proměnné si ponechají původní popisek). meta jsou metadata
+    source_path z pyreadstat.read_sav(..., metadataonly=True, user_missing=True)
+    - bez user_missing by se ztratily chybějící hodnoty; bez meta se načtou.
+    """
+    import pyreadstat
+
+    if meta is None:
+        _, meta = pyreadstat.read_sav(source_path, metadataonly=True, user_missing=True)
+    if (meta.file_encoding or '').replace('-', '').upper() != 'UTF8':
+        raise ValueError(f'Přímý zápis .sav umí jen soubory v UTF-8 (tento je v {meta.file_encoding})')
+
+    if os.path.exists(output_path) and os.path.samefile(source_path, output_path):
+        raise ValueError('Výstupní .sav nesmí přepsat vstupní soubor')
+
+    directory = os.path.dirname(os.path.abspath(output_path))
+    with open(source_path, 'rb') as src:
+        source = read_dictionary(src)
+        if source.byte_order != ('<' if sys.byteorder == 'little' else '>'):
+            raise ValueError('Přímý zápis .sav neumí soubory s opačným pořadím bajtů')
+
+        fd, template_path = tempfile.mkstemp(dir=directory, suffix='.sav')
+        os.close(fd)
+        tmp_path = None
+        try:
+            _write_template(template_path, meta, column_labels, source.compression)
+            with open(template_path, 'rb') as tf:
+                template = read_dictionary(tf)
+                tf.seek(0)
+                dictionary = bytearray(tf.read(template.data_offset))
+            if template.layout != source.layout or template.compression != source.compression \
+                    or template.bias != source.bias:
+                raise ValueError('pyreadstat zapsal jiné rozložení proměnných než má původní .sav')
+
+            struct.pack_into(source.byte_order + 'i', dictionary, _NCASES_OFFSET, source.ncases)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as dst:
+                dst.write(dictionary)
+                if source.compression == COMPRESSION_ZLIB:
+                    _copy_zlib_data(src, dst, source, template.data_offset - source.data_offset, chunk_size)
+                else:
+                    src.seek(source.data_offset)
+                    shutil.copyfileobj(src, dst, chunk_size)
+            os.replace(tmp_path, output_path)
+            tmp_path = None
+        finally:
+            os.remove(template_path)
+            if tmp_path is not None:
+                os.remove(tmp_path)
+
+
+def collect_labels(lines: Iterable[str], labels: Dict[str, str]) -> Iterator[str]:
+    """
+    Propustí řádky syntaxe beze změny a popisky z řádků VAR LAB {proměnná} "{popisek}".
+    přitom uloží do labels - pozdější přepisuje dřívější jako v SPSS.
+    """
+    for line in lines:
+        if line.startswith('VAR LAB ') and line.endswith('".'):
+            var, sep, label = line[8:-2].partition(' "')
+            if var and sep:
+                labels[var] = label
+        yield line
+
+
+def labels_from_syntax(lines: Iterable[str]) -> Dict[str, str]:
+    """Popisky proměnných z hotové syntaxe (viz collect_labels)."""
+    labels = {}
+    for _ in collect_labels(lines, labels):
+        pass
+    return labels
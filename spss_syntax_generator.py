@@ -0,0 +1,186 @@
+"""
+Příkazová řádka pro SPSSSyntaxGenerator
+
+Zpracuje jednu dvojici .sav + .docx nebo celé stromy adresářů s dvojicemi,
+paralelně v několika procesech. Dvojice, jejichž výstup je novější než oba
+vstupy, se přeskočí (inkrementální přegenerování jako u make).
+
+    python -m spss_syntax_generator data.sav dotaznik.docx
+    python -m spss_syntax_generator studie/ -j 4 --output-dir vystupy/
+
+Párování v adresáři: jediný .docx platí pro všechny .sav v adresáři,
+jinak se .sav páruje s .docx se stejným názvem (bez přípony).
+
+S --incremental se vedle každého .sps ukládá manifest bloků po otázkách;
+další běh znovu sestaví jen změněné otázky a změny zapíše do <výstup>.sps.diff.
+
+S --sav se vedle každého .sps zapíše i kopie .sav s popisky proměnných
+ze syntaxe (<výstup>.sav), takže VAR LAB není potřeba spouštět v SPSS.
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from backend_app import OUTPUT_PREFIX, output_filename_for, sav_output_path_for
+from batch import generate_one
+
+
+def _pair_group(sav_paths: List[str], docx_paths: List[str]) -> Tuple[List[Tuple[str, str]], List[str]]:
+    """Spáruje .sav s .docx v rámci jedné skupiny; vrací (dvojice, nespárované .sav)."""
+    pairs = []
+    unmatched = []
+    by_stem = {os.path.splitext(os.path.basename(p))[0]: p for p in docx_paths}
+    for sav_path in sorted(sav_paths):
+        if len(docx_paths) == 1:
+            pairs.append((sav_path, docx_paths[0]))
+            continue
+        docx_path = by_stem.get(os.path.splitext(os.path.basename(sav_path))[0])
+        if docx_path:
+            pairs.append((sav_path, docx_path))
+        else:
+            unmatched.append(sav_path)
+    return pairs, unmatched
+
+
+def _split_by_extension(paths: List[str]) -> Tuple[List[str], List[str]]:
+    # generated_syntax_*.sav jsou výstupy --sav z předchozího běhu, ne vstupy
+    sav = [p for p in paths if p.lower().endswith('.sav') and not os.path.basename(p).startswith(OUTPUT_PREFIX)]
+    # ~$*.docx jsou zámkové soubory otevřeného Wordu
+    docx_files = [p for p in paths if p.lower().endswith('.docx') and not os.path.basename(p).startswith('~$')]
+    return sav, docx_files
+
+
+def discover_pairs(inputs: List[str]) -> Tuple[List[Tuple[str, str, str]], List[str]]:
+    """
+    Najde dvojice (.sav, .docx, kořen) v zadaných souborech a adresářových stromech.
+    Kořen slouží k zachování struktury podadresářů ve --output-dir.
+    """
+    pairs = []
+    unmatched = []
+
+    files = [p for p in inputs if os.path.isfile(p)]
+    if files:
+        sav, docx_files = _split_by_extension(files)
+        group_pairs, group_unmatched = _pair_group(sav, docx_files)
+        pairs.extend((s, d, os.path.dirname(os.path.abspath(s))) for s, d in group_pairs)
+        unmatched.extend(group_unmatched)
+
+    for root in (p for p in inputs if os.path.isdir(p)):
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            sav, docx_files = _split_by_extension([os.path.join(dirpath, f) for f in filenames])
+            group_pairs, group_unmatched = _pair_group(sav, docx_files)
+            pairs.extend((s, d, root) for s, d in group_pairs)
+            unmatched.extend(group_unmatched)
+
+    return pairs, unmatched
+
+
+def output_path_for(sav_path: str, root: str, output_dir: Optional[str]) -> str:
+    """Výstup vedle .sav, nebo ve stejné relativní cestě pod output_dir."""
+    name = output_filename_for(os.path.basename(sav_path))
+    if output_dir is None:
+        return os.path.join(os.path.dirname(sav_path), name)
+    rel_dir = os.path.relpath(os.path.dirname(os.path.abspath(sav_path)), os.path.abspath(root))
+    return os.path.normpath(os.path.join(output_dir, rel_dir, name))
+
+
+def is_up_to_date(output_path: str, *inputs: str) -> bool:
+    """Výstup existuje a je novější než všechny vstupy."""
+    try:
+        output_mtime = os.path.getmtime(output_path)
+    except OSError:
+        return False
+    return all(os.path.getmtime(p) <= output_mtime for p in inputs)
+
+
+def _run_pair(sav_path: str, docx_path: str, output_path: str, incremental: bool = False,
+              labelled_sav: bool = False) -> Dict:
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    return generate_one(sav_path, output_path, questionnaire_path=docx_path, incremental=incremental,
+                        sav_output_path=sav_output_path_for(output_path) if labelled_sav else None)
+
+
+def _describe_changes(changes: Dict) -> str:
+    if changes is None:
+        return ''
+    if changes['first_run']:
+        return f"; bloky: {changes['blocks']} (první běh)"
+    counts = ', '.join(f"{label} {len(changes[kind])}"
+                       for kind, label in (('added', 'přidáno'), ('changed', 'změněno'), ('removed', 'odebráno')))
+    diff = f", diff {changes['diff']}" if changes['diff'] else ''
+    return f"; bloky: {changes['rebuilt']}/{changes['blocks']} znovu, {counts}{diff}"
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='python -m spss_syntax_generator',
+        description='Generování SPSS syntaxe z .sav dat a .docx dotazníku',
+    )
+    parser.add_argument('inputs', nargs='+', help='.sav a .docx soubory nebo adresáře s nimi')
+    parser.add_argument('-o', '--output', help='výstupní .sps (jen pro jedinou dvojici)')
+    parser.add_argument('--output-dir', help='adresář pro výstupy (jinak vedle .sav)')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1, help='počet procesů')
+    parser.add_argument('-f', '--force', action='store_true', help='přegenerovat i aktuální výstupy')
+    parser.add_argument('--incremental', action='store_true',
+                        help='převzít nezměněné bloky z předchozího výstupu a zapsat diff změn')
+    parser.add_argument('--sav', action='store_true',
+                        help='zapsat vedle .sps i .sav s popisky proměnných (MRSETS zůstávají v .sps)')
+    args = parser.parse_args(argv)
+
+    pairs, unmatched = discover_pairs(args.inputs)
+    for sav_path in unmatched:
+        print(f"⚠️ Bez dotazníku: {sav_path}")
+    if not pairs:
+        print("❌ Nenalezena žádná dvojice .sav + .docx")
+        return 1
+    if args.output and len(pairs) != 1:
+        parser.error('--output lze použít jen pro jedinou dvojici')
+
+    tasks = []
+    skipped = 0
+    for sav_path, docx_path, root in pairs:
+        output_path = args.output or output_path_for(sav_path, root, args.output_dir)
+        if not args.force and is_up_to_date(output_path, sav_path, docx_path) and (
+                not args.sav or is_up_to_date(sav_output_path_for(output_path), sav_path, docx_path)):
+            skipped += 1
+            continue
+        tasks.append((sav_path, docx_path, output_path, args.incremental, args.sav))
+
+    print(f"📋 {len(pairs)} dvojic, {len(tasks)} ke zpracování, {skipped} aktuálních přeskočeno")
+    t0 = time.perf_counter()
+    input_bytes = sum(os.path.getsize(task[0]) + os.path.getsize(task[1]) for task in tasks)
+
+    if args.jobs <= 1 or len(tasks) <= 1:
+        summaries = [_run_pair(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=min(args.jobs, len(tasks)),
+            mp_context=multiprocessing.get_context('spawn'),
+        ) as pool:
+            summaries = list(pool.map(_run_pair, *zip(*tasks)))
+
+    failed = 0
+    for (sav_path, _, output_path, _, _), summary in zip(tasks, summaries):
+        if summary['status'] == 'ok':
+            labelled = f" + {summary['labelled_sav']}" if 'labelled_sav' in summary else ''
+            print(f"   ✓ {sav_path} -> {output_path}{labelled} ({summary['lines']} řádků, {summary['seconds']:.2f} s"
+                  f"{_describe_changes(summary.get('changes'))})")
+        else:
+            failed += 1
+            print(f"   ✗ {sav_path}: {summary['error']}")
+
+    elapsed = time.perf_counter() - t0
+    print(f"✅ Hotovo: {len(tasks) - failed} OK, {failed} chyb, {skipped} přeskočeno za {elapsed:.2f} s "
+          f"({len(tasks) / max(elapsed, 1e-9):.1f} dvojic/s, "
+          f"{input_bytes / 1024 / 1024 / max(elapsed, 1e-9):.1f} MB/s, {args.jobs} procesů)")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Moduly aplikace leží v kořeni repozitáře
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
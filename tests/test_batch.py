@@ -0,0 +1,49 @@
+"""Zip se .sav se před rozbalením kontroluje proti limitům rozbaleného obsahu."""
+
+import zipfile
+
+import pytest
+
+from admission import UploadTooLarge
+from batch import collect_sav_files
+
+MB = 1024 * 1024
+
+
+def _write_zip(path, members):
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for name, size in members:
+            zf.writestr(name, b'\0' * size)
+    return str(path)
+
+
+def test_members_within_limits_are_extracted(tmp_path):
+    zip_path = _write_zip(tmp_path / 'in.zip', [('a.sav', 10), ('dir/b.sav', 20), ('notes.txt', 5)])
+    (tmp_path / 'out').mkdir()
+    paths = collect_sav_files([zip_path], str(tmp_path / 'out'))
+    assert [p.rsplit('/', 1)[1] for p in paths] == ['0_a.sav', '1_b.sav']
+
+
+@pytest.mark.parametrize('env, members, expected', [
+    ({'SPSS_MAX_SAV_MB': '1'}, [('big.sav', 2 * MB)], {'limit': MB, 'max_members': None}),
+    ({'SPSS_MAX_ZIP_TOTAL_MB': '2'}, [(f'{i}.sav', MB) for i in range(3)], {'limit': 2 * MB, 'max_members': None}),
+    ({'SPSS_MAX_ZIP_MEMBERS': '2'}, [(f'{i}.sav', 10) for i in range(3)], {'max_members': 2}),
+])
+def test_limits_are_checked_before_extraction(tmp_path, monkeypatch, env, members, expected):
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    zip_path = _write_zip(tmp_path / 'in.zip', members)
+    (tmp_path / 'out').mkdir()
+    with pytest.raises(UploadTooLarge) as info:
+        collect_sav_files([zip_path], str(tmp_path / 'out'))
+    for name, value in expected.items():
+        assert getattr(info.value, name) == value
+    assert not list((tmp_path / 'out').iterdir())
+
+
+def test_limits_apply_across_zips(tmp_path, monkeypatch):
+    monkeypatch.setenv('SPSS_MAX_ZIP_MEMBERS', '3')
+    zips = [_write_zip(tmp_path / f'{i}.zip', [('a.sav', 10), ('b.sav', 10)]) for i in range(2)]
+    (tmp_path / 'out').mkdir()
+    with pytest.raises(UploadTooLarge):
+        collect_sav_files(zips, str(tmp_path / 'out'))
@@ -0,0 +1,59 @@
+"""Adresář cache s pickle hodnotami musí být soukromý."""
+
+import os
+
+import pytest
+
+from cache import ContentCache
+
+
+def test_new_directory_is_private(tmp_path):
+    cache = ContentCache(str(tmp_path / 'cache'))
+    assert os.stat(cache.base_dir).st_mode & 0o777 == 0o700
+    cache.put('syntax', 'k', 'VARIABLE LABELS')
+    assert cache.get('syntax', 'k') == 'VARIABLE LABELS'
+
+
+@pytest.mark.parametrize('mode', [0o770, 0o777, 0o1777])
+def test_group_or_other_writable_directory_is_refused(tmp_path, mode):
+    base_dir = tmp_path / 'shared'
+    base_dir.mkdir()
+    os.chmod(base_dir, mode)
+    with pytest.raises(PermissionError):
+        ContentCache(str(base_dir))
+
+
+def test_symlink_is_refused(tmp_path):
+    (tmp_path / 'real').mkdir(mode=0o700)
+    os.symlink(tmp_path / 'real', tmp_path / 'link')
+    with pytest.raises(PermissionError):
+        ContentCache(str(tmp_path / 'link'))
+
+
+def test_preparsed_questionnaire_is_not_cached(tmp_path):
+    from backend_app import SPSSSyntaxGenerator, parse_questionnaire_from_docx
+    from benchmarks.synthetic import synthetic_questionnaire, write_matching_sav, write_synthetic_docx
+
+    questions = synthetic_questionnaire(3)
+    docx_path, sav_path = str(tmp_path / 'q.docx'), str(tmp_path / 'data.sav')
+    write_synthetic_docx(docx_path, questions)
+    write_matching_sav(sav_path, questions, n_rows=10)
+    cache = ContentCache(str(tmp_path / 'cache'))
+
+    expected = SPSSSyntaxGenerator(sav_path, docx_path).build()
+    generator = SPSSSyntaxGenerator(sav_path, None, cache=cache,
+                                    questionnaire_data=parse_questionnaire_from_docx(docx_path))
+    assert generator.build() == expected
+    assert b''.join(generator.stream_syntax()).decode('utf-8-sig').replace('\r\n', '\n') == expected
+    assert cache.stats()['namespaces'].get('syntax') is None
+
+
+def test_streamed_syntax_over_entry_limit_is_not_collected():
+    from backend_app import SyntaxStream
+
+    lines = [f'VARIABLE LABELS Q{i} "otázka {i}".' for i in range(1000)]
+    small = SyntaxStream(iter(lines), collect=10 ** 6)
+    large = SyntaxStream(iter(lines), collect=1000)
+    assert b''.join(small) == b''.join(large)
+    assert small.text == '\n'.join(lines)
+    assert large.text is None and large._collected is None
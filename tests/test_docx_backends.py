@@ -0,0 +1,25 @@
+"""Proudový OOXML parser a python-docx dávají stejné odstavce i stejný výsledek parsování."""
+
+import docx
+import pytest
+
+from backend_app import iter_paragraph_texts, parse_questionnaire_from_docx
+from benchmarks.synthetic import write_edge_case_docx
+from docx_stream import iter_docx_paragraph_texts
+
+
+def _assert_parity(path: str):
+    texts_docx = list(iter_paragraph_texts(docx.Document(path)))
+    texts_stream = list(iter_docx_paragraph_texts(path))
+    assert texts_stream == texts_docx
+    assert parse_questionnaire_from_docx(path, backend='stream') == \
+        parse_questionnaire_from_docx(path, backend='python-docx')
+
+
+# Okrajové případy (EDGE_CASE_XML) se střídají každých 7 odstavců, všechny jsou tam už od 1 bloku
+@pytest.mark.parametrize('n_blocks', [1, 5, 20])
+def test_edge_case_corpus(tmp_path, n_blocks):
+    path = str(tmp_path / f'edge_{n_blocks}.docx')
+    write_edge_case_docx(path, n_blocks)
+    _assert_parity(path)
+
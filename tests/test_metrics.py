@@ -0,0 +1,33 @@
+"""/api/metrics sčítá jen snímky běžících procesů."""
+
+import json
+import os
+import subprocess
+import sys
+
+from metrics import MetricsRegistry, clear, collect
+
+
+def _dead_pid() -> int:
+    proc = subprocess.Popen([sys.executable, '-c', 'pass'])
+    proc.wait()
+    return proc.pid
+
+
+def test_snapshots_of_dead_workers_are_removed(tmp_path):
+    registry = MetricsRegistry()
+    registry.counter('spss_test_total', 'test')
+    registry.inc('spss_test_total')
+    registry.flush(str(tmp_path))
+    dead = tmp_path / f'{_dead_pid()}.json'
+    dead.write_text((tmp_path / f'{os.getpid()}.json').read_text())
+
+    assert 'spss_test_total 1' in collect(str(tmp_path)).splitlines()
+    assert not dead.exists()
+    assert json.loads((tmp_path / f'{os.getpid()}.json').read_text())
+
+
+def test_clear_removes_all_snapshots(tmp_path):
+    MetricsRegistry().flush(str(tmp_path))
+    clear(str(tmp_path))
+    assert os.listdir(tmp_path) == []
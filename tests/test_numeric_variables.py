@@ -0,0 +1,30 @@
+"""Numerické proměnné z metadat odpovídají dtype int64/float64 po plném načtení."""
+
+import pandas as pd
+import pyreadstat
+import pytest
+
+from backend_app import is_numeric_variable
+
+FORMATS = {
+    'f': 'F8.2', 'date': 'DATE11', 'adate': 'ADATE10', 'edate': 'EDATE10', 'sdate': 'SDATE10',
+    'datetime': 'DATETIME20', 'time': 'TIME8', 'dtime': 'DTIME11', 'pct': 'PCT8.2', 'dollar': 'DOLLAR8.2',
+}
+
+
+@pytest.fixture
+def sav(tmp_path):
+    path = str(tmp_path / 'formats.sav')
+    df = pd.DataFrame({name: [86400.0 * 14000, 86400.0 * 15000] for name in FORMATS})
+    df['text'] = ['a', 'b']
+    pyreadstat.write_sav(df, path, variable_format=FORMATS)
+    return path
+
+
+def test_metadata_matches_full_load_dtypes(sav):
+    df, _ = pyreadstat.read_sav(sav)
+    _, meta = pyreadstat.read_sav(sav, metadataonly=True)
+    from_dtypes = {name for name in df.columns if df[name].dtype.kind in 'if'}
+    from_meta = {name for name in meta.column_names if is_numeric_variable(meta, name)}
+    assert from_meta == from_dtypes
+    assert 'dtime' in from_meta and 'time' not in from_meta
@@ -0,0 +1,108 @@
+"""Přímý zápis popisků do .sav: data beze změny, nové popisky, chybové stavy."""
+
+import datetime
+import os
+
+import pandas as pd
+import pyreadstat
+import pytest
+
+from sav_output import labels_from_syntax, write_labelled_sav
+
+N_ROWS = 20000
+COMPRESSIONS = {
+    'none': {},
+    'bytecode': {'row_compress': True},
+    'zlib': {'compress': True},
+}
+
+
+def _source_frame() -> pd.DataFrame:
+    start = datetime.date(2024, 1, 1)
+    return pd.DataFrame({
+        'id': [float(i) for i in range(N_ROWS)],
+        'Q1': [float(i % 3 + 1) for i in range(N_ROWS)],
+        'kod': [f'k{i % 10}' for i in range(N_ROWS)],
+        # šířka 15 se ukládá zaokrouhlená na 16, formát zůstává A15
+        'jina': [f'odpověď {i % 97}'[:15] for i in range(N_ROWS)],
+        # velmi dlouhý string (víc segmentů po 255 znacích)
+        'poznamka': [('text %d ' % i) * 40 for i in range(N_ROWS)],
+        'datum': [start + datetime.timedelta(days=i % 365) for i in range(N_ROWS)],
+    })
+
+
+def _write_source(path: str, compression: str):
+    df = _source_frame()
+    pyreadstat.write_sav(
+        df, path,
+        column_labels=['ID', 'Původní Q1', 'Kód', 'Jiná', 'Poznámka', 'Datum'],
+        variable_value_labels={'Q1': {1.0: 'ne', 2.0: 'ano', 3.0: 'nevím'}},
+        missing_ranges={'Q1': [3.0]},
+        **COMPRESSIONS[compression],
+    )
+    return df
+
+
+@pytest.mark.parametrize('compression', sorted(COMPRESSIONS))
+def test_round_trip_keeps_data_and_applies_labels(tmp_path, compression):
+    source = str(tmp_path / 'data.sav')
+    output = str(tmp_path / 'labelled.sav')
+    _write_source(source, compression)
+
+    new_labels = {'Q1': 'Nový popisek Q1 ěščř', 'poznamka': 'Poznámka respondenta'}
+    write_labelled_sav(source, output, new_labels, chunk_size=4096)
+
+    df0, meta0 = pyreadstat.read_sav(source, user_missing=True)
+    df1, meta1 = pyreadstat.read_sav(output, user_missing=True)
+    pd.testing.assert_frame_equal(df0, df1)
+
+    expected = dict(meta0.column_names_to_labels)
+    expected.update(new_labels)
+    assert meta1.column_names_to_labels == expected
+    assert meta1.number_rows == N_ROWS
+    for attr in ('original_variable_types', 'variable_value_labels', 'missing_ranges', 'variable_measure'):
+        assert getattr(meta1, attr) == getattr(meta0, attr)
+    assert sorted(os.listdir(tmp_path)) == ['data.sav', 'labelled.sav']
+
+
+def test_non_utf8_source_is_rejected(tmp_path):
+    source = str(tmp_path / 'data.sav')
+    _write_source(source, 'none')
+    _, meta = pyreadstat.read_sav(source, metadataonly=True, user_missing=True)
+    meta.file_encoding = 'WINDOWS-1250'
+
+    with pytest.raises(ValueError, match='UTF-8'):
+        write_labelled_sav(source, str(tmp_path / 'out.sav'), {}, meta=meta)
+    assert not os.path.exists(tmp_path / 'out.sav')
+
+
+def test_layout_mismatch_is_rejected_without_leftovers(tmp_path):
+    source = str(tmp_path / 'data.sav')
+    _write_source(source, 'bytecode')
+    _, meta = pyreadstat.read_sav(source, metadataonly=True, user_missing=True)
+    # Metadata, která neodpovídají souboru - šablona by měla jiné rozložení
+    meta.original_variable_types['kod'] = 'A40'
+
+    with pytest.raises(ValueError, match='rozložení'):
+        write_labelled_sav(source, str(tmp_path / 'out.sav'), {'kod': 'Kód'}, meta=meta)
+    assert os.listdir(tmp_path) == ['data.sav']
+
+
+def test_output_must_not_overwrite_source(tmp_path):
+    source = str(tmp_path / 'data.sav')
+    _write_source(source, 'none')
+    before = os.path.getmtime(source), os.path.getsize(source)
+
+    with pytest.raises(ValueError, match='nesmí přepsat'):
+        write_labelled_sav(source, source, {'Q1': 'x'})
+    assert (os.path.getmtime(source), os.path.getsize(source)) == before
+
+
+def test_labels_from_syntax_later_line_wins():
+    lines = [
+        'VAR LAB Q1_1 "První".',
+        'VAR LAB Q1_2 "Text s "uvozovkami"".',
+        'FREQUENCIES Q1_1.',
+        'VAR LAB Q1_1 "Přepsaný".',
+    ]
+    assert labels_from_syntax(lines) == {'Q1_1': 'Přepsaný', 'Q1_2': 'Text s "uvozovkami"'}